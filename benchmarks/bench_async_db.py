@@ -0,0 +1,185 @@
+"""
+同步与异步数据库访问的并发负载测试
+
+在临时SQLite文件中写入测试数据，分别用两种方式提供同样的药物列表/更新接口：
+  - 同步：def路由 + Session（每个请求占用线程池中的一个线程，等待数据库时线程被阻塞）
+  - 异步：async路由 + AsyncSession（aiosqlite，等待数据库时让出事件循环）
+在进程内用httpx.AsyncClient按不同并发数发送请求（读写混合），输出吞吐量和延迟分位数
+
+用法:
+    python -m benchmarks.bench_async_db --medications 2000 --requests 2000 --concurrency 10 50 100 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.database import Base, get_async_db
+from src.models.medication import Medication
+from src.models.user import User
+from src.routes.medication_routes import router as medication_router
+from src.schemas.medication import serialize_medication_rows
+from src.services.medication_service import MEDICATION_LIST_COLUMNS, bump_cabinet_version
+from src.utils.responses import FastJSONResponse
+
+
+def build_database(path: str, medications: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="bench"))
+    start = date(2024, 1, 1)
+    db.execute(Medication.__table__.insert(), [
+        {
+            "name": f"药物{i}",
+            "production_date": start + timedelta(days=i % 365),
+            "shelf_life_days": 365 + i % 730,
+            "expiry_date": start + timedelta(days=i % 365 + 365 + i % 730),
+            "功效": "用于缓解轻至中度疼痛。" * 4,
+            "quantity": 10.0,
+            "unit": "片",
+            "user_id": 1,
+        } for i in range(medications)
+    ])
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+def build_sync_app(path: str) -> FastAPI:
+    """改造前的写法：同步路由 + Session（服务层只保留异步版本，这里直接写同样的查询）"""
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}, pool_size=20, max_overflow=20
+    )
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/api/medications/")
+    def read_medications(limit: int = 20, db: Session = Depends(get_db)):
+        rows = db.execute(
+            select(*MEDICATION_LIST_COLUMNS).where(Medication.user_id == 1).limit(limit)
+        ).all()
+        return FastJSONResponse(serialize_medication_rows(rows))
+
+    @app.put("/api/medications/{medication_id}")
+    def update_existing_medication(medication_id: int, medication_data: dict, db: Session = Depends(get_db)):
+        medication = db.execute(
+            select(Medication).where(Medication.id == medication_id, Medication.user_id == 1)
+        ).scalar_one()
+        for key, value in medication_data.items():
+            setattr(medication, key, value)
+        bump_cabinet_version(db, 1)
+        db.commit()
+        db.refresh(medication)
+        return {"id": medication.id}
+
+    app.state.engine = engine
+    return app
+
+
+def build_async_app(path: str) -> FastAPI:
+    """项目中的路由：async路由 + AsyncSession"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, pool_size=20, max_overflow=20
+    )
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(medication_router, prefix="/api/medications")
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.state.engine = engine
+    return app
+
+
+async def run_load(app: FastAPI, requests: int, concurrency: int, medications: int, write_ratio: float) -> dict:
+    rng = random.Random(42)
+    plan = [
+        rng.randrange(1, medications + 1) if rng.random() < write_ratio else None
+        for _ in range(requests)
+    ]
+    latencies = []
+    errors = 0
+    queue = iter(plan)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            for medication_id in queue:
+                start = time.perf_counter()
+                if medication_id is None:
+                    response = await client.get("/api/medications/", params={"limit": 20})
+                else:
+                    response = await client.put(f"/api/medications/{medication_id}", json={"quantity": 5.0})
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "errors": errors,
+    }
+
+
+async def run_all(apps: dict, args):
+    print(f"{'并发':>6} {'实现':>6} {'吞吐(req/s)':>12} {'p50(ms)':>10} {'p99(ms)':>10} {'错误':>6}")
+    try:
+        for concurrency in args.concurrency:
+            for name, app in apps.items():
+                result = await run_load(app, args.requests, concurrency, args.medications, args.write_ratio)
+                print(f"{concurrency:>6} {name:>6} {result['rps']:>12.0f} "
+                      f"{result['p50']:>10.1f} {result['p99']:>10.1f} {result['errors']:>6}")
+    finally:
+        apps["sync"].state.engine.dispose()
+        await apps["async"].state.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步与异步数据库访问的并发负载测试")
+    parser.add_argument("--medications", type=int, default=2000, help="药物数量")
+    parser.add_argument("--requests", type=int, default=2000, help="每个并发级别的请求数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100, 200], help="并发数")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="更新请求的比例")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_database(path, args.medications)
+        apps = {"sync": build_sync_app(path), "async": build_async_app(path)}
+
+        # 所有并发级别在同一个事件循环中运行（异步连接池中的连接绑定事件循环）
+        asyncio.run(run_all(apps, args))
+
+
+if __name__ == "__main__":
+    main()
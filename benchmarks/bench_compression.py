@@ -0,0 +1,87 @@
+"""
+响应压缩基准测试
+
+通过TestClient取得药物搜索接口和药物柜列表接口的真实响应体（中文说明文本），
+分别用不同的gzip级别和brotli质量压缩，输出压缩后字节数、压缩率和每个响应的CPU耗时，
+并给出在当前阈值下经过CompressionMiddleware的端到端结果。
+
+用法:
+    python -m benchmarks.bench_compression --cabinet-sizes 20 100 --repeat 200
+"""
+import argparse
+import logging
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_medication_list import build_app
+from src.middleware.compression import CompressionMiddleware, _BrotliCompressor, _GzipCompressor, brotli
+from src.utils.medication_search import catalog
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 5, 11)
+
+
+def compress_once(factory, body: bytes) -> bytes:
+    compressor = factory()
+    return compressor.compress(body, flush=False) + compressor.finish()
+
+
+def measure(factory, body: bytes, repeat: int):
+    """返回 (压缩后字节数, 每次压缩的CPU耗时（微秒）)"""
+    size = len(compress_once(factory, body))
+    start = time.process_time()
+    for _ in range(repeat):
+        compress_once(factory, body)
+    return size, (time.process_time() - start) / repeat * 1e6
+
+
+def report(name: str, body: bytes, repeat: int):
+    print(f"\n{name}: 原始 {len(body):,} 字节")
+    codecs = [(f"gzip-{level}", lambda level=level: _GzipCompressor(level)) for level in GZIP_LEVELS]
+    if brotli is not None:
+        codecs += [(f"br-{quality}", lambda quality=quality: _BrotliCompressor(quality)) for quality in BROTLI_QUALITIES]
+    for codec, factory in codecs:
+        size, cpu_us = measure(factory, body, repeat)
+        print(f"  {codec:<8} {size:>9,} 字节  压缩率 {size / len(body):6.1%}  CPU {cpu_us:9.1f} µs/响应")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应压缩基准测试")
+    parser.add_argument("--cabinet-sizes", type=int, nargs="+", default=[20, 100], help="药物柜列表每页条数")
+    parser.add_argument("--repeat", type=int, default=200, help="每项测量的重复次数")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    app = build_app(max(args.cabinet_sizes))
+    with TestClient(app) as client:
+        # 药物搜索：逐个取目录中的药物，统计单个响应的平均值
+        search_bodies = [
+            client.get(f"/api/medications/search/{name}").content for name in catalog.current.medications
+        ]
+        largest = max(search_bodies, key=len)
+        report(f"药物搜索（最大的单个响应，共{len(search_bodies)}种药物）", largest, args.repeat)
+
+        for size in args.cabinet_sizes:
+            body = client.get(f"/api/medications/?limit={size}").content
+            report(f"药物柜列表（{size}条）", body, args.repeat)
+
+        # 端到端：经过压缩中间件后的实际传输字节数
+        compressed_app = CompressionMiddleware(app)
+    with TestClient(compressed_app) as client:
+        print(f"\n端到端（阈值 {compressed_app.minimum_size} 字节，gzip-{compressed_app.gzip_level}，"
+              f"br-{compressed_app.brotli_quality}）:")
+        for encoding in compressed_app.encodings:
+            headers = {"Accept-Encoding": encoding}
+            search_wire = sum(
+                int(client.get(f"/api/medications/search/{name}", headers=headers).headers.get("content-length", 0))
+                for name in catalog.current.medications
+            )
+            list_response = client.get(f"/api/medications/?limit={max(args.cabinet_sizes)}", headers=headers)
+            print(f"  {encoding:<5} 搜索 {sum(map(len, search_bodies)):,} -> {search_wire:,} 字节, "
+                  f"药物柜列表 -> {list_response.headers['content-length']} 字节 "
+                  f"({list_response.headers.get('content-encoding', 'identity')})")
+
+
+if __name__ == "__main__":
+    main()
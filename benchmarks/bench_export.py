@@ -0,0 +1,79 @@
+"""
+流式导出内存基准测试
+
+在临时SQLite文件中写入不同数量的药物，逐块消费导出流，
+用tracemalloc记录导出过程中的Python内存峰值，验证峰值不随行数增长。
+
+用法:
+    python -m benchmarks.bench_export --sizes 10000 100000 --format csv --gzip
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base
+from src.models.medication import Medication
+from src.models.user import User
+from src.services.export_service import export_medications
+
+
+def build_session_factory(path: str, medications: int):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = SessionLocal()
+    db.add(User(id=1, username="bench"))
+    start = date(2024, 1, 1)
+    db.execute(Medication.__table__.insert(), [
+        {
+            "name": f"药物{i}",
+            "production_date": start + timedelta(days=i % 365),
+            "shelf_life_days": 365 + i % 730,
+            "expiry_date": start + timedelta(days=i % 365 + 365 + i % 730),
+            "功效": "解热镇痛",
+            "usage": "口服，一次1片，一日3次",
+            "quantity": 10.0,
+            "unit": "片",
+            "user_id": 1,
+        } for i in range(medications)
+    ])
+    db.commit()
+    db.close()
+    return SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式导出内存基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="药物数量")
+    parser.add_argument("--format", default="ndjson", choices=["ndjson", "csv"])
+    parser.add_argument("--gzip", action="store_true", help="启用gzip压缩")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            session_factory = build_session_factory(os.path.join(tmp, "export.db"), size)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            total = 0
+            for chunk in export_medications(
+                1, export_format=args.format, gzip=args.gzip, session_factory=session_factory
+            ):
+                total += len(chunk)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        print(f"{size:>9,} 行: 输出 {total / 1024 / 1024:8.2f} MiB, 耗时 {elapsed:6.2f} s, "
+              f"{size / elapsed:10,.0f} 行/秒, 内存峰值 {peak / 1024 / 1024:6.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+批量导入基准测试
+
+在临时SQLite文件中分别用两种方式导入同一批药物：
+  - 逐条创建：每行查询一次药品目录、计算过期日期、提交并刷新（POST /medications/ 的做法，
+    与路由一样调用 create_medication_async）
+  - 批量导入：import_medications，整批计算过期日期、一次目录查询、单个事务插入
+
+用法:
+    python -m benchmarks.bench_import --rows 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base
+from src.models.user import User
+from src.services.import_service import import_medications
+from src.services.medication_service import create_medication_async
+from src.utils.medication_search import catalog, search_medication_details
+
+
+def build_session(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    db.add(User(id=1, username="bench"))
+    db.commit()
+    return db
+
+
+def make_records(rows: int):
+    names = list(catalog.current.medications) + ["未知药物"]
+    return [
+        {
+            "name": names[i % len(names)],
+            "production_date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "shelf_life_days": str(365 + i % 730),
+            "quantity": "10",
+            "unit": "片",
+        } for i in range(rows)
+    ]
+
+
+async def create_one_by_one(path: str, records):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    async with session_factory() as db:
+        for record in records:
+            info = search_medication_details(record["name"]) or {}
+            await create_medication_async(
+                db=db,
+                name=record["name"],
+                production_date=datetime.strptime(record["production_date"], "%Y-%m-%d").date(),
+                shelf_life_days=int(record["shelf_life_days"]),
+                功效=info.get("功效"),
+                usage=info.get("用法"),
+                image_url=info.get("图片"),
+                quantity=float(record["quantity"]),
+                unit=record["unit"],
+                user_id=1
+            )
+    await engine.dispose()
+
+
+def one_by_one(db, records):
+    # 数据库已由build_session建好，逐条创建走异步会话
+    asyncio.run(create_one_by_one(db.get_bind().url.database, records))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入基准测试")
+    parser.add_argument("--rows", type=int, default=500, help="导入行数")
+    args = parser.parse_args()
+    logging.getLogger("src.utils.medication_search").setLevel(logging.ERROR)
+
+    records = make_records(args.rows)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func in (("逐条创建", one_by_one), ("批量导入", import_medications)):
+            db = build_session(os.path.join(tmp, f"{len(results)}.db"))
+            start = time.perf_counter()
+            func(db, records)
+            results[name] = time.perf_counter() - start
+            db.close()
+
+    for name, elapsed in results.items():
+        print(f"{name}: {elapsed * 1000:9.1f} ms, {args.rows / elapsed:10,.0f} 行/秒")
+    print(f"加速比: {results['逐条创建'] / results['批量导入']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+应用冷启动（导入耗时）基准测试
+
+在子进程中以 `python -X importtime -c "import src.main"` 导入应用，解析stderr中的导入耗时，
+输出总耗时、按顶层包汇总的耗时和本项目中最慢的模块；超过预算时以非零状态退出，可放在CI中防止启动变慢。
+`src.main.app` 在第一次访问时才创建，导入耗时不包含 create_app() 构建路由和中间件的时间。
+
+-X importtime 每行的格式为:
+    import time: self [us] | cumulative | imported package
+其中缩进表示嵌套层级，self为模块自身执行耗时（不含其导入的子模块）。
+
+用法:
+    python -m benchmarks.bench_import_time --runs 5 --budget-ms 2500 --project-budget-ms 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+PROJECT_PACKAGE = "src"
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """返回 [(模块名, self微秒, cumulative微秒)]"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头行
+        records.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return records
+
+
+def measure(module: str) -> List[Tuple[str, int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"导入 {module} 失败")
+    return parse_importtime(result.stderr)
+
+
+def summarize(records: List[Tuple[str, int, int]], module: str) -> Dict:
+    by_package: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in records:
+        by_package[name.split(".")[0]] += self_us
+    total_us = next((cumulative for name, _, cumulative in records if name == module), 0)
+    project = [(name, self_us) for name, self_us, _ in records
+               if name == PROJECT_PACKAGE or name.startswith(PROJECT_PACKAGE + ".")]
+    return {
+        "total_ms": total_us / 1000,
+        "project_ms": sum(self_us for _, self_us in project) / 1000,
+        "packages": {name: us / 1000 for name, us in by_package.items()},
+        "project_modules": {name: us / 1000 for name, us in project},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="应用冷启动（导入耗时）基准测试")
+    parser.add_argument("--module", default="src.main", help="要导入的模块")
+    parser.add_argument("--runs", type=int, default=5, help="测量次数（取中位数）")
+    parser.add_argument("--top", type=int, default=10, help="列出的包/模块数量")
+    parser.add_argument("--budget-ms", type=float, default=2500, help="总导入耗时预算（毫秒）")
+    parser.add_argument("--project-budget-ms", type=float, default=400,
+                        help="本项目模块自身导入耗时之和的预算（毫秒）")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    summaries = [summarize(measure(args.module), args.module) for _ in range(args.runs)]
+
+    def median_of(key: str, name: str = None) -> float:
+        if name is None:
+            return statistics.median(s[key] for s in summaries)
+        return statistics.median(s[key].get(name, 0.0) for s in summaries)
+
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "total_ms": median_of("total_ms"),
+        "project_ms": median_of("project_ms"),
+        "budget_ms": args.budget_ms,
+        "project_budget_ms": args.project_budget_ms,
+        "packages": dict(sorted(
+            ((name, median_of("packages", name)) for name in summaries[0]["packages"]),
+            key=lambda item: item[1], reverse=True
+        )[:args.top]),
+        "project_modules": dict(sorted(
+            ((name, median_of("project_modules", name)) for name in summaries[0]["project_modules"]),
+            key=lambda item: item[1], reverse=True
+        )[:args.top]),
+    }
+    over_budget = report["total_ms"] > args.budget_ms or report["project_ms"] > args.project_budget_ms
+
+    if args.json:
+        print(json.dumps({**report, "over_budget": over_budget}, ensure_ascii=False, indent=2))
+    else:
+        print(f"导入 {args.module}（{args.runs} 次中位数）")
+        print(f"  总耗时:       {report['total_ms']:8.1f} ms  (预算 {args.budget_ms:.0f} ms)")
+        print(f"  项目模块自身: {report['project_ms']:8.1f} ms  (预算 {args.project_budget_ms:.0f} ms)")
+        print("\n按顶层包汇总（自身耗时）:")
+        for name, ms in report["packages"].items():
+            print(f"  {name:<32} {ms:8.1f} ms")
+        print("\n最慢的项目模块（自身耗时）:")
+        for name, ms in report["project_modules"].items():
+            print(f"  {name:<32} {ms:8.1f} ms")
+        print("\n结果: " + ("超出预算" if over_budget else "在预算内"))
+
+    if over_budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
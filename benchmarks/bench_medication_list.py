@@ -0,0 +1,156 @@
+"""
+药物列表接口序列化基准测试
+
+在临时SQLite文件中（同步和异步会话共用）为同一用户写入若干药物，通过TestClient分别请求：
+  - 旧写法：查询ORM实例，逐个手工构造dict，再经过 response_model=List[dict] 校验和标准JSON编码
+  - 新写法：GET /api/medications/，只查询所需列，直接由元组序列化并用orjson编码
+  - 稀疏字段：GET /api/medications/?fields=id,name,expiry_date,is_expired（列表界面只需要这些字段）
+输出每种写法的平均耗时、每秒请求数和响应体大小。
+
+用法:
+    python -m benchmarks.bench_medication_list --medications 1000 --requests 200
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import List
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.database import Base, get_async_db, get_db
+from src.models.medication import Medication
+from src.models.user import User
+from src.routes.medication_routes import router as medication_router
+
+
+# 旧版本的列表接口实现，用于对比
+def legacy_read_medications(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    user_id: int = 1
+):
+    medications = db.query(Medication).filter(
+        Medication.user_id == user_id
+    ).offset(skip).limit(limit).all()
+    return [
+        {
+            "id": med.id,
+            "name": med.name,
+            "production_date": med.production_date.isoformat() if med.production_date else None,
+            "shelf_life_days": med.shelf_life_days,
+            "expiry_date": med.expiry_date.isoformat() if med.expiry_date else None,
+            "功效": med.功效,
+            "usage": med.usage,
+            "image_url": med.image_url,
+            "quantity": med.quantity,
+            "unit": med.unit,
+            "is_expired": med.is_expired,
+            "is_near_expiry": med.is_near_expiry
+        } for med in medications
+    ]
+
+
+def build_app(medications: int) -> FastAPI:
+    # 药物路由使用AsyncSession，旧写法使用同步Session，两者需要读同一个数据库文件
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = SessionLocal()
+    db.add(User(id=1, username="bench"))
+    start = date(2024, 1, 1)
+    db.add_all([
+        Medication(
+            name=f"药物{i}",
+            production_date=start + timedelta(days=i % 365),
+            shelf_life_days=365 + i % 730,
+            expiry_date=start + timedelta(days=i % 365 + 365 + i % 730),
+            功效="用于缓解轻至中度疼痛，如头痛、关节痛、偏头痛、牙痛、肌肉痛、神经痛、痛经。也用于普通感冒或流行性感冒引起的发热。" * 2,
+            usage="口服。成人一次1片，若持续疼痛或发热，可间隔4-6小时重复用药一次，24小时内不超过4次。" * 2,
+            image_url=f"https://example.com/{i}.png",
+            quantity=10.0,
+            unit="片",
+            user_id=1
+        ) for i in range(medications)
+    ])
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async_session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    # 关闭时释放aiosqlite连接（其工作线程不是守护线程，不释放时进程无法退出）
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await async_engine.dispose()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(medication_router, prefix="/api/medications")
+    app.add_api_route("/legacy/medications/", legacy_read_medications, response_model=List[dict])
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # 临时目录随应用对象一起保留，进程退出时删除
+    app.state.directory = directory
+    return app
+
+
+def bench(client: TestClient, url: str, count: int):
+    """返回 (平均耗时（毫秒）, 响应体字节数)"""
+    size = len(client.get(url).content)  # 预热
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.get(url)
+        response.raise_for_status()
+    return (time.perf_counter() - start) / count * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="药物列表接口序列化基准测试")
+    parser.add_argument("--medications", type=int, default=1000, help="药物数量（单页全部返回）")
+    parser.add_argument("--requests", type=int, default=200, help="每种写法的请求次数")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    app = build_app(args.medications)
+    query = f"?limit={args.medications}"
+    with TestClient(app) as client:
+        assert len(client.get("/api/medications/" + query).json()) == args.medications
+        results = {
+            "旧写法（ORM + dict + 标准JSON）": bench(client, "/legacy/medications/" + query, args.requests),
+            "新写法（列查询 + orjson）": bench(client, "/api/medications/" + query, args.requests),
+            "稀疏字段（fields=...）": bench(
+                client, "/api/medications/" + query + "&fields=id,name,expiry_date,is_expired", args.requests
+            ),
+        }
+
+    legacy_ms = results["旧写法（ORM + dict + 标准JSON）"][0]
+    for name, (ms, size) in results.items():
+        print(f"{name:<28} {ms:8.2f} ms/请求, {1000 / ms:8.1f} 请求/秒, "
+              f"响应 {size / 1024:8.1f} KiB, 加速比 {legacy_ms / ms:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
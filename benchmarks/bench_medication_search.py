@@ -0,0 +1,321 @@
+"""
+药品目录查询函数的微基准测试
+
+合成 1千 到 1百万 条目的药品目录和疾病推荐表（替换 medication_search 模块中的目录），
+对热路径上的函数运行命中/未命中/模糊匹配等工作负载，统计每秒操作数和目录每个条目占用的内存，
+与预算文件（benchmarks/budgets/medication_search.json）比较，低于预算时以非零状态退出，可放在CI中。
+默认只测到10万条目，1百万条目的dict目录约占1GB堆内存，需要时用 --sizes 显式指定。
+
+每个用例先预热，然后按 timeit.autorange 的方式加倍调用次数，直到单轮耗时超过 --min-time，
+取 --rounds 轮中最好的一轮（与 pytest-benchmark 的 min 相同，受调度噪声影响最小）。
+与目录大小无关的函数（infer_medication_type、validate_medication_name）只在最小的目录上运行。
+
+每秒操作数的绝对值随机器和负载变化很大（同一台机器上也会相差近一倍），
+预算记录的是相对速度：用例的每秒操作数除以同一次运行中参考循环（reference_loop）的每秒操作数。
+每一轮先运行参考循环再紧接着运行用例，两者处于相同的机器状态（CPU频率、其他进程的负载），取最好一轮的比值。
+预算中的相对速度是最低要求；性能改进后用 --update-budgets 按当前结果重写预算（相对速度乘以 --budget-margin）。
+
+--format compiled 把合成的目录编译为 src.utils.catalog_file 格式的文件并用mmap打开后测量，
+内存为打开目录后进程堆上增加的字节数（记录在页缓存中，不计入进程堆），另外输出每个条目的文件字节数。
+
+用法:
+    python -m benchmarks.bench_medication_search
+    python -m benchmarks.bench_medication_search --sizes 1000 10000 100000 1000000
+    python -m benchmarks.bench_medication_search --format compiled
+    python -m benchmarks.bench_medication_search --update-budgets
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+from src.utils import medication_search
+from src.utils.medication_search import (
+    format_medication_info,
+    get_recommended_medications_for_disease,
+    infer_medication_type,
+    search_medication_details,
+    validate_medication_name,
+)
+from src.utils.catalog import build_snapshot
+from src.utils.catalog_file import CompiledCatalog, compile_catalog
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), "budgets", "medication_search.json")
+# 默认的目录大小（CI中运行）
+DEFAULT_SIZES = [1000, 10000, 100000]
+# 药物名称的组成部分，使推测类型的关键词分布在不同位置
+PREFIXES = ["盐酸", "复方", "硫酸", "", "", ""]
+STEMS = ["布洛芬", "头孢克肟", "阿莫西林", "硝苯地平", "二甲双胍", "氯雷他定", "奥美拉唑", "氨溴索", "银杏叶", "维生素C", "感冒灵", "某某"]
+SUFFIXES = ["片", "胶囊", "缓释片", "颗粒", "口服液", "注射液"]
+
+
+def medication_name(i: int) -> str:
+    return f"{PREFIXES[i % len(PREFIXES)]}{STEMS[i % len(STEMS)]}{SUFFIXES[i % len(SUFFIXES)]}{i}"
+
+
+def synthesize_catalog(size: int, seed: int = 42) -> Tuple[Dict[str, dict], Dict[str, List[str]]]:
+    """合成药品目录（size个药物）和疾病推荐表（size/10种疾病，每种3-5个推荐药物）"""
+    rng = random.Random(seed)
+    medications = {}
+    for i in range(size):
+        name = medication_name(i)
+        medications[name] = {
+            "功效": f"{name}用于缓解轻至中度疼痛如头痛、关节痛、牙痛，也用于普通感冒引起的发热。",
+            "用法": f"口服。成人一次{1 + i % 3}片，一日{2 + i % 3}次，饭后服用。",
+            "图片": f"https://example.com/images/{i}.jpg",
+            "副作用": "偶见恶心、呕吐、胃部不适等胃肠道反应。",
+            "注意事项": "对本品过敏者禁用；孕妇及哺乳期妇女慎用。",
+        }
+    names = list(medications)
+    diseases = {
+        f"疾病{i}": [rng.choice(names) for _ in range(rng.randint(3, 5))]
+        for i in range(max(1, size // 10))
+    }
+    return medications, diseases
+
+
+@contextmanager
+def use_catalog(medications: Dict[str, dict], diseases: Dict[str, List[str]]):
+    """临时替换 medication_search 模块中的药品目录和疾病推荐表"""
+    saved = medication_search.catalog.swap(build_snapshot(medications, diseases))
+    try:
+        yield
+    finally:
+        medication_search.catalog.swap(saved)
+
+
+def cycle(function: Callable, inputs: list) -> Callable[[], object]:
+    """每次调用从预先生成的输入中轮流取一个（输入生成不计入耗时）"""
+    index = 0
+    count = len(inputs)
+
+    def call():
+        nonlocal index
+        index = (index + 1) % count
+        return function(inputs[index])
+    return call
+
+
+def measure_catalog_memory(size: int, seed: int) -> Tuple[Dict[str, dict], Dict[str, List[str]], float]:
+    """合成目录并返回每个药物条目占用的字节数（包含疾病推荐表，按药物条目数平摊）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        medications, diseases = synthesize_catalog(size, seed)
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return medications, diseases, allocated / size
+
+
+def open_compiled_catalog(medications: Dict[str, dict], directory: str) -> Tuple[CompiledCatalog, float, float]:
+    """编译目录并用mmap打开，返回 (目录, 每个条目占用的进程堆内存字节数, 每个条目的文件字节数)"""
+    path = os.path.join(directory, f"catalog-{len(medications)}.medcat")
+    compile_catalog(medications, path)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        catalog = CompiledCatalog(path)
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return catalog, allocated / len(medications), os.path.getsize(path) / len(medications)
+
+
+def workloads(medications: Dict[str, dict], diseases: Dict[str, List[str]], seed: int) -> Dict[str, Callable[[], object]]:
+    """{用例名: 无参调用}"""
+    rng = random.Random(seed)
+    names = list(medications)
+    disease_names = list(diseases)
+    # 模糊匹配：取名称末尾6个字符（如 "缓释片1234"），匹配的条目随机分布在目录中
+    fuzzy = [names[rng.randrange(len(names))][-6:] for _ in range(256)]
+    return {
+        "search_medication_details/hit": cycle(search_medication_details, [rng.choice(names) for _ in range(256)]),
+        "search_medication_details/fuzzy": cycle(search_medication_details, fuzzy),
+        "search_medication_details/miss": cycle(search_medication_details, [f"不存在的药物X{i}" for i in range(256)]),
+        "get_recommended_medications_for_disease/hit": cycle(
+            get_recommended_medications_for_disease, [rng.choice(disease_names) for _ in range(256)]
+        ),
+        "get_recommended_medications_for_disease/miss": cycle(
+            get_recommended_medications_for_disease, [f"不存在的疾病X{i}" for i in range(256)]
+        ),
+        "format_medication_info": cycle(
+            format_medication_info, [medications[rng.choice(names)] for _ in range(256)]
+        ),
+    }
+
+
+def size_independent_workloads(seed: int) -> Dict[str, Callable[[], object]]:
+    rng = random.Random(seed)
+    names = [medication_name(rng.randrange(10 ** 6)) for _ in range(256)]
+    invalid = ["x", "布洛芬<script>", "药" * 60, "", "阿司匹林 片"]
+    return {
+        "infer_medication_type": cycle(infer_medication_type, names),
+        "validate_medication_name/valid": cycle(validate_medication_name, names),
+        "validate_medication_name/invalid": cycle(validate_medication_name, invalid),
+    }
+
+
+# 参考循环的输入：与被测函数相同的字典查找和字符串操作，不依赖目录
+REFERENCE_KEYS = [medication_name(i) for i in range(64)]
+REFERENCE_TABLE = {name: {"功效": name} for name in REFERENCE_KEYS}
+
+
+def reference_loop() -> int:
+    """参考工作负载，用于把每秒操作数换算为与机器速度无关的相对速度"""
+    total = 0
+    for name in REFERENCE_KEYS:
+        entry = REFERENCE_TABLE.get(name)
+        if entry is not None and "片" in name:
+            total += len(f"{name}: {entry['功效']}")
+    return total
+
+
+def calibrate(call: Callable[[], object], min_time: float) -> int:
+    """预热后加倍调用次数，返回单轮耗时不少于 min_time 的调用次数"""
+    call()
+    number = 1
+    while True:
+        if time_round(call, number) >= min_time:
+            return number
+        number *= 2
+
+
+def time_round(call: Callable[[], object], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        call()
+    return time.perf_counter() - start
+
+
+def bench(call: Callable[[], object], min_time: float, rounds: int) -> Tuple[float, float]:
+    """返回 (每秒操作数, 相对速度)，都取最好的一轮
+
+    每一轮先运行参考循环再紧接着运行用例，两者处于相同的机器状态，相对速度取两者每秒操作数之比。
+    """
+    reference_number = calibrate(reference_loop, min_time)
+    number = calibrate(call, min_time)
+    best_ops = best_relative = 0.0
+    for _ in range(rounds):
+        reference_ops = reference_number / time_round(reference_loop, reference_number)
+        ops = number / time_round(call, number)
+        best_ops = max(best_ops, ops)
+        best_relative = max(best_relative, ops / reference_ops)
+    return best_ops, best_relative
+
+
+def load_budgets(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"min_relative_speed": {}, "max_bytes_per_entry": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check(relative: Dict[str, float], memory: Dict[str, float], budgets: dict) -> List[str]:
+    failures = []
+    for key, speed in relative.items():
+        budget = budgets["min_relative_speed"].get(key)
+        if budget is not None and speed < budget:
+            failures.append(f"{key}: 相对速度 {speed:.3g} 低于预算 {budget:.3g}")
+    for size, per_entry in memory.items():
+        budget = budgets["max_bytes_per_entry"].get(size)
+        if budget is not None and per_entry > budget:
+            failures.append(f"目录内存@{size}: {per_entry:,.0f} B/条目 超过预算 {budget:,.0f} B/条目")
+    return failures
+
+
+def update_budgets(path: str, budgets: dict, relative: Dict[str, float], memory: Dict[str, float], margin: float):
+    for key, speed in relative.items():
+        budgets["min_relative_speed"][key] = float(f"{speed * margin:.3g}")
+    for size, per_entry in memory.items():
+        budgets["max_bytes_per_entry"][size] = math.ceil(per_entry * (2 - margin))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(budgets, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="药品目录查询函数的微基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="目录条目数（默认最大10万，1百万条目的dict目录约占1GB内存）")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最短耗时（秒）")
+    parser.add_argument("--rounds", type=int, default=5, help="每个用例的轮数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--budgets", default=BUDGET_FILE, help="预算文件")
+    parser.add_argument("--update-budgets", action="store_true", help="按本次结果重写预算文件")
+    parser.add_argument("--budget-margin", type=float, default=0.5,
+                        help="更新预算时相对速度乘以的系数（内存预算乘以 2 - 系数）")
+    parser.add_argument("--format", choices=["dict", "compiled"], default="dict",
+                        help="目录格式：内存中的dict，或编译后用mmap打开的文件（用例名加 compiled: 前缀）")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    args = parser.parse_args()
+    # 未命中时模块会输出警告日志，测量的是查找本身
+    logging.getLogger(medication_search.__name__).setLevel(logging.ERROR)
+
+    results: Dict[str, float] = {}
+    relative: Dict[str, float] = {}
+    memory: Dict[str, float] = {}
+    file_sizes: Dict[str, float] = {}
+    prefix = "compiled:" if args.format == "compiled" else ""
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sorted(args.sizes):
+            medications, diseases, per_entry = measure_catalog_memory(size, args.seed)
+            catalog = medications
+            if args.format == "compiled":
+                catalog, per_entry, file_sizes[prefix + str(size)] = open_compiled_catalog(medications, tmp)
+            memory[prefix + str(size)] = per_entry
+            cases = {
+                f"{prefix}{name}@{size}": call
+                for name, call in workloads(medications, diseases, args.seed).items()
+            }
+            if size == min(args.sizes) and args.format == "dict":
+                cases.update(size_independent_workloads(args.seed))
+            del medications
+            gc.collect()
+            with use_catalog(catalog, diseases):
+                for key, call in cases.items():
+                    results[key], relative[key] = bench(call, args.min_time, args.rounds)
+            del catalog, diseases, cases
+            gc.collect()
+
+    budgets = load_budgets(args.budgets)
+    failures = check(relative, memory, budgets)
+
+    if args.json:
+        print(json.dumps({"ops_per_sec": results, "relative_speed": relative, "bytes_per_entry": memory,
+                          "file_bytes_per_entry": file_sizes, "failures": failures},
+                         ensure_ascii=False, indent=2))
+    else:
+        print(f"{'用例':<52} {'ops/s':>14} {'相对速度':>12} {'预算':>12}")
+        for key, ops in results.items():
+            budget = budgets["min_relative_speed"].get(key)
+            print(f"{key:<52} {ops:>14,.0f} {relative[key]:>12.4g} {budget if budget is not None else '-':>12}")
+        print(f"\n{'目录条目数':<52} {'B/条目':>14} {'预算':>14}")
+        for size, per_entry in memory.items():
+            budget = budgets["max_bytes_per_entry"].get(size)
+            print(f"{size:<52} {per_entry:>14,.0f} {budget if budget is not None else '-':>14}")
+        if file_sizes:
+            print(f"\n{'目录条目数':<52} {'文件B/条目':>14}")
+            for size, per_entry in file_sizes.items():
+                print(f"{size:<52} {per_entry:>14,.0f}")
+
+    if args.update_budgets:
+        update_budgets(args.budgets, budgets, relative, memory, args.budget_margin)
+        print(f"\n预算已更新: {args.budgets}")
+    elif failures:
+        if not args.json:
+            print("\n" + "\n".join(failures))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+中间件单层开销基准测试
+
+在进程内直接调用ASGI应用，分别测量每一层中间件带来的额外耗时（微秒），
+并与基于 BaseHTTPMiddleware 的 call_next 写法对比，
+同时按 5k req/s 的目标负载换算每层占用的CPU比例。
+
+用法:
+    python -m benchmarks.bench_middleware --requests 20000 --rate 5000
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.middleware.auth_middleware import (
+    AuthMiddleware,
+    ErrorHandlingMiddleware,
+    LoggingMiddleware,
+    RateLimiterMiddleware,
+    generate_token,
+)
+
+BODY = b'{"name": "\xe5\xb8\x83\xe6\xb4\x9b\xe8\x8a\xac", "production_date": "2024-01-01", "shelf_life_days": 730}'
+
+
+# 最简单的下游应用：读取完整请求体后返回200
+async def endpoint(scope, receive, send):
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+# call_next 写法的直通中间件，用于对比 BaseHTTPMiddleware 的固有开销
+class PassThroughHTTPMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def build_scope(token: str):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/medications/",
+        "raw_path": b"/api/medications/",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/json"),
+            (b"authorization", f"Bearer {token}".encode()),
+        ],
+        "client": ("10.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+async def run(app, scope, count: int) -> float:
+    """顺序发送 count 个请求，返回平均每个请求的耗时（微秒）"""
+    request_message = {"type": "http.request", "body": BODY, "more_body": False}
+    disconnect_message = {"type": "http.disconnect"}
+
+    async def call_once():
+        # 请求体只发送一次；之后的receive在响应发送完毕后返回断开连接，
+        # 与真实服务器的行为一致（BaseHTTPMiddleware会监听断开事件）
+        body_sent = False
+        response_complete = asyncio.Event()
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return request_message
+            await response_complete.wait()
+            return disconnect_message
+
+        async def send(message):
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete.set()
+
+        await app(dict(scope), receive, send)
+
+    # 预热
+    for _ in range(min(count, 1000)):
+        await call_once()
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await call_once()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def main_async(args):
+    token = generate_token(1)
+    scope = build_scope(token)
+
+    layers = {
+        "AuthMiddleware": lambda app: AuthMiddleware(app),
+        "ErrorHandlingMiddleware": lambda app: ErrorHandlingMiddleware(app),
+        "LoggingMiddleware": lambda app: LoggingMiddleware(app),
+        "RateLimiterMiddleware": lambda app: RateLimiterMiddleware(app, max_requests=10 ** 9, time_window=60),
+        "BaseHTTPMiddleware(call_next)": lambda app: PassThroughHTTPMiddleware(app),
+    }
+
+    baseline = await run(endpoint, scope, args.requests)
+    print(f"{'中间件':<32}{'单请求耗时(us)':>16}{'单层开销(us)':>16}{f'{args.rate} req/s CPU占用':>20}")
+    print(f"{'(无中间件)':<32}{baseline:>16.2f}{0:>16.2f}{0:>19.2%}")
+
+    for name, wrap in layers.items():
+        elapsed = await run(wrap(endpoint), scope, args.requests)
+        overhead = elapsed - baseline
+        cpu_share = overhead * args.rate / 1e6
+        print(f"{name:<32}{elapsed:>16.2f}{overhead:>16.2f}{cpu_share:>19.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中间件单层开销基准测试")
+    parser.add_argument("--requests", type=int, default=20000, help="每层测量的请求数")
+    parser.add_argument("--rate", type=int, default=5000, help="换算CPU占用时的目标请求速率")
+    args = parser.parse_args()
+
+    # 基准测试只关心中间件本身的开销，关闭日志输出
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
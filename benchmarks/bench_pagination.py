@@ -0,0 +1,102 @@
+"""
+偏移分页与游标分页基准测试
+
+在内存SQLite中为同一用户写入大量药物，分别测量第1页和第N页的查询耗时：
+  - 偏移分页：get_medication_rows_async(skip=..., limit=...)，耗时随页码线性增长
+  - 游标分页：get_medication_page_async(cursor=..., limit=...)，任意页耗时与第一页相同
+
+用法:
+    python -m benchmarks.bench_pagination --medications 200000 --page 1000 --limit 100
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database import Base
+from src.models.medication import Medication
+from src.models.user import User
+from src.services.medication_service import get_medication_page_async, get_medication_rows_async
+
+
+async def build_session(medications: int):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)()
+
+    db.add(User(id=1, username="bench"))
+    start = date(2024, 1, 1)
+    await db.execute(Medication.__table__.insert(), [
+        {
+            "name": f"药物{i}",
+            "production_date": start + timedelta(days=i % 365),
+            "shelf_life_days": 365 + i % 730,
+            "expiry_date": start + timedelta(days=i % 365 + 365 + i % 730),
+            "quantity": 10.0,
+            "unit": "片",
+            "user_id": 1,
+        } for i in range(medications)
+    ])
+    await db.commit()
+    return engine, db
+
+
+async def timed(func, repeat: int) -> float:
+    """返回平均耗时（毫秒）"""
+    await func()  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def run(args) -> dict:
+    engine, db = await build_session(args.medications)
+    try:
+        # 逐页翻到目标页，取得该页的游标
+        cursor = ""
+        for _ in range(args.page - 1):
+            _, cursor = await get_medication_page_async(db, cursor=cursor, limit=args.limit)
+
+        keyset_rows, _ = await get_medication_page_async(db, cursor=cursor, limit=args.limit)
+        assert len(keyset_rows) == args.limit
+
+        skip = (args.page - 1) * args.limit
+        return {
+            "偏移分页 第1页": await timed(
+                lambda: get_medication_rows_async(db, skip=0, limit=args.limit), args.repeat),
+            f"偏移分页 第{args.page}页": await timed(
+                lambda: get_medication_rows_async(db, skip=skip, limit=args.limit), args.repeat),
+            "游标分页 第1页": await timed(
+                lambda: get_medication_page_async(db, cursor="", limit=args.limit), args.repeat),
+            f"游标分页 第{args.page}页": await timed(
+                lambda: get_medication_page_async(db, cursor=cursor, limit=args.limit), args.repeat),
+        }
+    finally:
+        await db.close()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="偏移分页与游标分页基准测试")
+    parser.add_argument("--medications", type=int, default=200000, help="药物数量")
+    parser.add_argument("--page", type=int, default=1000, help="对比的页码")
+    parser.add_argument("--limit", type=int, default=100, help="每页条数")
+    parser.add_argument("--repeat", type=int, default=50, help="每项测量的重复次数")
+    args = parser.parse_args()
+
+    if args.page * args.limit > args.medications:
+        parser.error("页码超出数据范围")
+
+    results = asyncio.run(run(args))
+
+    for name, ms in results.items():
+        print(f"{name:<16} {ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
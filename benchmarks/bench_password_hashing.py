@@ -0,0 +1,80 @@
+"""
+登录密码校验吞吐量基准测试
+
+分别测量单进程内的scrypt校验速度（即每核登录吞吐量）和通过密码哈希进程池并发校验的总吞吐量，
+并给出进程池繁忙时被拒绝（503）的请求数。
+
+用法:
+    python -m benchmarks.bench_password_hashing --logins 200 --workers 4
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+
+from src.services.password_service import (
+    PasswordHasher,
+    PasswordHasherBusy,
+    hash_password,
+    verify_password,
+)
+
+
+def bench_single_core(hashed: str, count: int) -> float:
+    """在当前进程中顺序校验，返回每秒校验次数"""
+    start = time.perf_counter()
+    for _ in range(count):
+        verify_password("correct horse", hashed)
+    return count / (time.perf_counter() - start)
+
+
+async def bench_pool(hashed: str, count: int, workers: int, max_pending: int):
+    """通过进程池并发校验，返回 (每秒成功次数, 被拒绝次数)"""
+    hasher = PasswordHasher(max_workers=workers, max_pending=max_pending)
+    # 预热，启动所有工作进程
+    await asyncio.gather(*[hasher.verify("correct horse", hashed) for _ in range(workers)])
+
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        while True:
+            try:
+                return await hasher.verify("correct horse", hashed)
+            except PasswordHasherBusy:
+                # 客户端收到503后稍后重试
+                rejected += 1
+                await asyncio.sleep(0.005)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(count)])
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    return count / elapsed, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录密码校验吞吐量基准测试")
+    parser.add_argument("--logins", type=int, default=200, help="登录次数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="进程池大小")
+    parser.add_argument("--max-pending", type=int, default=0, help="进程池同时处理的最大任务数，0表示进程数的4倍")
+    args = parser.parse_args()
+
+    hashed = hash_password("correct horse")
+    legacy = hashlib.sha256(b"correct horse").hexdigest()
+
+    legacy_ops = bench_single_core(legacy, args.logins * 100)
+    single_ops = bench_single_core(hashed, args.logins)
+    pool_ops, rejected = asyncio.run(
+        bench_pool(hashed, args.logins, args.workers, args.max_pending or args.workers * 4)
+    )
+
+    print(f"SHA256（旧格式）单核:       {legacy_ops:12,.0f} 次/秒")
+    print(f"scrypt 单核:                {single_ops:12,.1f} 次/秒")
+    print(f"scrypt 进程池({args.workers}进程):      {pool_ops:12,.1f} 次/秒, "
+          f"每核 {pool_ops / args.workers:,.1f} 次/秒, 503拒绝 {rejected} 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+接口SQL语句数检查
+
+在临时SQLite文件中写入测试数据，逐个调用接口并统计执行的SQL语句数，
+超过预算（QUERY_BUDGETS）或出现重复形状的语句（疑似N+1）时报告并以非零状态退出。
+/api/medications/disease/测试病 使用数据库中的疾病推荐记录，推荐药物数量由 --recommendations 指定，
+语句数不应随推荐药物数量增加。
+
+用法:
+    python -m benchmarks.bench_query_counts --recommendations 20
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base, get_db, get_async_db
+from src.main import create_app
+from src.models.disease import Disease, MedicationRecommendation
+from src.models.medication import Medication
+from src.models.reminder import Reminder
+from src.models.user import User
+from src.utils.sql_instrumentation import assert_max_queries, instrument_engine
+
+# 每个接口允许执行的最大SQL语句数
+QUERY_BUDGETS = {
+    "/api/medications/": 2,
+    "/api/medications/?cursor=": 2,
+    "/api/medications/?fields=id,name": 2,
+    "/api/medications/1": 2,
+    "/api/medications/disease/感冒": 1,
+    "/api/medications/disease/测试病": 3,
+    "/api/diseases/": 1,
+    "/api/diseases/1": 2,
+    "/api/users/": 1,
+    "/api/reminders/user/1": 1,
+    "/api/reminders/user/1?cursor=": 1,
+}
+
+
+def build_database(path: str, recommendations: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="bench"))
+    start = date(2026, 1, 1)
+    names = [f"药物{i}" for i in range(recommendations)] + ["布洛芬", "对乙酰氨基酚"]
+    for i, name in enumerate(names):
+        db.add(Medication(
+            id=i + 1, name=name, production_date=start, shelf_life_days=730,
+            expiry_date=start + timedelta(days=730), quantity=10.0, unit="片", user_id=1
+        ))
+        db.add(Reminder(
+            user_id=1, medication_id=i + 1, reminder_type="usage",
+            reminder_time=datetime(2026, 11, 1, 8) + timedelta(hours=i), sent=False
+        ))
+    disease = Disease(id=1, name="测试病", description="只存在于数据库中的疾病")
+    db.add(disease)
+    db.add_all(
+        MedicationRecommendation(disease_id=1, medication_name=name, recommendation_strength=3)
+        for name in names[:recommendations]
+    )
+    db.commit()
+    db.close()
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口SQL语句数检查")
+    parser.add_argument("--recommendations", type=int, default=20, help="数据库中疾病的推荐药物数量")
+    args = parser.parse_args()
+    # 测试数据中的药物不在药品目录中，不输出查不到药物的警告
+    logging.getLogger("src.utils.medication_search").setLevel(logging.ERROR)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = build_database(path, args.recommendations)
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        instrument_engine(engine)
+        instrument_engine(async_engine.sync_engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        async_session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        async def override_get_async_db():
+            async with async_session_factory() as db:
+                yield db
+
+        app = create_app()
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        client = TestClient(app)
+
+        print(f"{'接口':<40} {'语句数':>6} {'预算':>6}  重复语句")
+        for url, budget in QUERY_BUDGETS.items():
+            try:
+                with assert_max_queries(budget) as stats:
+                    response = client.get(url)
+                status = "ok"
+            except AssertionError as e:
+                status = "超出预算"
+                failures.append(f"{url}: {e}")
+            assert response.status_code == 200, (url, response.status_code)
+            repeated = stats.repeated(threshold=2)
+            if repeated:
+                failures.append(f"{url}: 重复语句 {repeated}")
+            print(f"{url:<40} {stats.count:>6} {budget:>6}  {max(repeated.values()) if repeated else '-'} {status}")
+
+        client.close()
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
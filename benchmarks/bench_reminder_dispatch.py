@@ -0,0 +1,213 @@
+"""
+提醒发送吞吐量基准测试
+
+在临时SQLite文件中写入 --reminders 条同一时刻到期的提醒（模拟早上8点的集中用药提醒），
+用可配置延迟、抖动和失败率的模拟通知适配器替换短信/微信适配器，运行一次 check_and_send_reminders，输出：
+  - 端到端吞吐量：每秒成功发送的提醒数（以及折算的每分钟提醒数）
+  - 数据库写放大：每条成功发送的提醒对应的SQL语句数（按语句类型）和事务提交次数
+  - 发送延迟分布：从提醒时间到调用通知适配器的时间（p50/p95/p99/最大值）
+
+check_and_send_reminders 逐条串行发送，模拟适配器的延迟会直接限制吞吐量（约 1 / 延迟）；
+默认延迟为0，测量的是数据库和消息渲染本身的开销。
+
+用法:
+    python -m benchmarks.bench_reminder_dispatch --reminders 100000 --users 1000
+    python -m benchmarks.bench_reminder_dispatch --reminders 2000 --latency-ms 20 --jitter-ms 10 --failure-rate 0.05
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+
+from src.adapters.notification_adapters import NotificationAdapter
+from src.database import Base
+from src.models.medication import Medication
+from src.models.reminder import Reminder
+from src.models.user import User
+from src.services.reminder_service import check_and_send_reminders
+from src.utils.sql_instrumentation import capture_queries, instrument_engine
+
+from benchmarks.bench_scenarios import percentile
+
+
+class FakeNotificationAdapter(NotificationAdapter):
+    """模拟通知适配器：每次发送等待 latency ± jitter 秒，按 failure_rate 的概率返回失败，并记录发送时间"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        # 每次调用的 time.perf_counter()
+        self.send_times: List[float] = []
+        self.failures = 0
+
+    def send_message(self, recipient: str, message: str) -> bool:
+        self.send_times.append(time.perf_counter())
+        delay = self.latency + self.rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.rng.random() < self.failure_rate:
+            self.failures += 1
+            return False
+        return True
+
+    def send_verification_code(self, recipient: str, code: str) -> bool:
+        return self.send_message(recipient, code)
+
+
+def build_database(path: str, reminders: int, users: int, wechat_ratio: float, seed: int):
+    """每个用户都验证了手机号，wechat_ratio 比例的用户同时验证了微信（同一条提醒发两个渠道）"""
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    medications_per_user = 5
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {
+                "id": user_id,
+                "username": f"user{user_id}",
+                "phone_number": f"138{user_id:08d}",
+                "phone_verified": True,
+                "wechat_openid": f"openid-{user_id}",
+                "wechat_verified": rng.random() < wechat_ratio,
+            } for user_id in range(1, users + 1)
+        ])
+        conn.execute(Medication.__table__.insert(), [
+            {
+                "id": medication_id,
+                "name": f"药物{medication_id}",
+                "production_date": date(2026, 1, 1),
+                "shelf_life_days": 730,
+                "expiry_date": date(2028, 1, 1),
+                "user_id": (medication_id - 1) // medications_per_user + 1,
+            } for medication_id in range(1, users * medications_per_user + 1)
+        ])
+        placeholder = datetime(2000, 1, 1)
+        batch = []
+        for _ in range(reminders):
+            medication_id = rng.randint(1, users * medications_per_user)
+            batch.append({
+                "user_id": (medication_id - 1) // medications_per_user + 1,
+                "medication_id": medication_id,
+                "reminder_type": "expiry" if rng.random() < 0.2 else "usage",
+                "reminder_time": placeholder,
+                "sent": False,
+            })
+            if len(batch) == 10000:
+                conn.execute(Reminder.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(Reminder.__table__.insert(), batch)
+    return engine
+
+
+def statement_kind(shape: str) -> str:
+    return shape.split(" ", 1)[0].upper()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提醒发送吞吐量基准测试")
+    parser.add_argument("--reminders", type=int, default=100000, help="到期提醒数")
+    parser.add_argument("--users", type=int, default=1000, help="用户数")
+    parser.add_argument("--wechat-ratio", type=float, default=0.3, help="同时验证了微信的用户比例")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="模拟适配器每次发送的延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="延迟的随机抖动范围（毫秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="模拟适配器的发送失败率")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("src.sql.slow").setLevel(logging.ERROR)
+
+    sms = FakeNotificationAdapter(args.latency_ms / 1000, args.jitter_ms / 1000, args.failure_rate, args.seed)
+    wechat = FakeNotificationAdapter(args.latency_ms / 1000, args.jitter_ms / 1000, args.failure_rate, args.seed + 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = build_database(path, args.reminders, args.users, args.wechat_ratio, args.seed)
+        instrument_engine(engine)
+        commits = 0
+
+        def count_commit(conn):
+            nonlocal commits
+            commits += 1
+
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        # 写入完成后再把提醒时间设为当前时间，延迟从这一刻算起（包含扫描开始时查询到期提醒的时间）
+        due_at = datetime.now()
+        with engine.begin() as conn:
+            conn.execute(update(Reminder).values(reminder_time=due_at))
+        due_at_counter = time.perf_counter()
+
+        event.listen(engine, "commit", count_commit)
+        db = session_factory()
+        try:
+            with capture_queries() as stats:
+                start = time.perf_counter()
+                result = check_and_send_reminders(db, sms_adapter=sms, wechat_adapter=wechat)
+                elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+            event.remove(engine, "commit", count_commit)
+            engine.dispose()
+
+    delivered = result["total_reminders_to_send"] - result["failed_reminders"]
+    kinds = Counter()
+    for shape, count in stats.shapes.items():
+        kinds[statement_kind(shape)] += count
+    # 每条提醒第一次调用适配器的时间（同一用户同时发送短信和微信时，微信在短信之后）
+    lags = sorted((send_time - due_at_counter) * 1000 for send_time in sms.send_times)
+
+    report = {
+        "reminders": result["total_reminders_to_send"],
+        "delivered": delivered,
+        "failed": result["failed_reminders"],
+        "sms_sent": result["sms_reminders_sent"],
+        "wechat_sent": result["wechat_reminders_sent"],
+        "sms_estimate": result["sms_estimate"],
+        "sms_segments": result["sms_segments"],
+        "elapsed_s": round(elapsed, 3),
+        "deliveries_per_sec": round(delivered / elapsed, 1),
+        "deliveries_per_min": round(delivered / elapsed * 60),
+        "statements": stats.count,
+        "statements_by_kind": dict(kinds),
+        "statements_per_delivery": round(stats.count / max(delivered, 1), 2),
+        "commits": commits,
+        "commits_per_delivery": round(commits / max(delivered, 1), 2),
+        "lag_ms": {
+            "p50": round(percentile(lags, 50), 1),
+            "p95": round(percentile(lags, 95), 1),
+            "p99": round(percentile(lags, 99), 1),
+            "max": round(lags[-1], 1) if lags else 0.0,
+        },
+    }
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"提醒: {report['reminders']}  成功: {delivered}  失败: {report['failed']}  "
+          f"(短信 {report['sms_sent']}, 微信 {report['wechat_sent']})")
+    estimate = report["sms_estimate"]
+    print(f"短信预估: {estimate['messages']} 条消息 {estimate['segments']} 段 费用 {estimate['cost']}  "
+          f"实际发送 {report['sms_segments']} 段")
+    print(f"耗时: {elapsed:.2f} s  吞吐量: {report['deliveries_per_sec']:.0f} 条/秒 "
+          f"({report['deliveries_per_min']} 条/分钟)")
+    print(f"SQL语句: {stats.count} ({', '.join(f'{kind} {count}' for kind, count in kinds.most_common())})  "
+          f"每条成功提醒 {report['statements_per_delivery']} 条语句、{report['commits_per_delivery']} 次提交")
+    lag = report["lag_ms"]
+    print(f"发送延迟(ms): p50 {lag['p50']:.1f}  p95 {lag['p95']:.1f}  p99 {lag['p99']:.1f}  最大 {lag['max']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
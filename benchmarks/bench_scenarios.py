@@ -0,0 +1,271 @@
+"""
+端到端场景负载测试
+
+用 benchmarks.datagen 在临时SQLite文件中生成家庭药箱数据，在进程内通过ASGI直接驱动完整应用（create_app，
+包含所有中间件），按场景并发发送请求，输出吞吐量和延迟分位数（p50/p95/p99），结果保存为JSON便于对比：
+  - cabinet_list: 随机用户的药物柜列表 GET /api/medications/
+  - disease_recommendation: 按疾病推荐药物（药品目录中的疾病和只存在于数据库中的合成疾病各半）
+  - search: 药品目录搜索（精确命中、模糊命中、未命中）
+  - reminder_sweep: 提醒发送扫描 check_and_send_reminders（每轮前把提醒重置为未发送），
+    延迟为每轮扫描的耗时，吞吐量为每秒处理的提醒数
+
+用法:
+    python -m benchmarks.bench_scenarios --users 200 --medications-per-user 50 --requests 2000 --concurrency 50
+    python -m benchmarks.bench_scenarios --compare benchmarks/results/scenarios-20260101-120000.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import httpx
+from sqlalchemy import create_engine, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import get_async_db, get_db
+from src.main import configure_logging, create_app, init_db
+from src.models.reminder import Reminder
+from src.services.reminder_service import check_and_send_reminders
+from src.utils.medication_search import catalog
+
+from benchmarks.datagen import generate_household_data
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近秩法分位数，sorted_values 须已排序"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], elapsed: float, operations: int, errors: int) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "operations": operations,
+        "throughput": round(operations / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "errors": errors,
+    }
+
+
+# 各HTTP场景的请求生成函数，返回 (URL, 视为成功的状态码)
+def cabinet_list_request(rng: random.Random, users: int):
+    return f"/api/medications/?user_id={rng.randint(1, users)}&limit=20", (200,)
+
+
+def disease_recommendation_request(rng: random.Random, users: int):
+    if rng.random() < 0.5:
+        disease = rng.choice(list(catalog.current.recommendations))
+    else:
+        disease = f"疾病{rng.randrange(50)}"
+    return f"/api/medications/disease/{disease}?user_id={rng.randint(1, users)}", (200,)
+
+
+def search_request(rng: random.Random, users: int):
+    roll = rng.random()
+    if roll < 0.6:
+        name = rng.choice(list(catalog.current.medications))
+    elif roll < 0.8:
+        name = rng.choice(list(catalog.current.medications))[:2]
+    else:
+        name = f"不存在的药物{rng.randrange(1000)}"
+    return f"/api/medications/search/{name}", (200, 404)
+
+
+HTTP_SCENARIOS: Dict[str, Callable] = {
+    "cabinet_list": cabinet_list_request,
+    "disease_recommendation": disease_recommendation_request,
+    "search": search_request,
+}
+
+
+async def run_http_scenario(client: httpx.AsyncClient, make_request: Callable, args) -> Dict[str, float]:
+    rng = random.Random(args.seed)
+    plan = iter([make_request(rng, args.users) for _ in range(args.requests)])
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for url, expected in plan:
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code not in expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return summarize(latencies, time.perf_counter() - start, args.requests, errors)
+
+
+def run_reminder_sweep(session_factory, rounds: int, due_reminders: int) -> Dict[str, float]:
+    latencies = []
+    errors = 0
+    processed = 0
+    elapsed = 0.0
+    for _ in range(rounds):
+        db = session_factory()
+        try:
+            db.execute(update(Reminder).values(sent=False, message=None))
+            db.commit()
+            start = time.perf_counter()
+            try:
+                result = check_and_send_reminders(db)
+                processed += result["total_reminders_to_send"]
+            except Exception as e:
+                errors += 1
+                logging.getLogger(__name__).error(f"提醒扫描失败: {e!r}")
+            duration = time.perf_counter() - start
+        finally:
+            db.close()
+        elapsed += duration
+        latencies.append(duration * 1000)
+    summary = summarize(latencies, elapsed, processed, errors)
+    summary["due_reminders"] = due_reminders
+    return summary
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(scenarios: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]] = None):
+    header = f"{'场景':<24} {'吞吐量':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'错误':>6}"
+    if baseline:
+        header += f" {'吞吐变化':>10} {'p95变化':>10}"
+    print(header)
+    for name, result in scenarios.items():
+        line = (f"{name:<24} {result['throughput']:>10.1f} {result['p50_ms']:>10.2f} "
+                f"{result['p95_ms']:>10.2f} {result['p99_ms']:>10.2f} {result['errors']:>6}")
+        previous = (baseline or {}).get(name)
+        if previous and previous["throughput"] and previous["p95_ms"]:
+            throughput_change = result["throughput"] / previous["throughput"] - 1
+            p95_change = result["p95_ms"] / previous["p95_ms"] - 1
+            line += f" {throughput_change:>+10.1%} {p95_change:>+10.1%}"
+        print(line)
+
+
+async def run_http_scenarios(app, names: List[str], args) -> Dict[str, Dict[str, float]]:
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in names:
+            results[name] = await run_http_scenario(client, HTTP_SCENARIOS[name], args)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端场景负载测试")
+    parser.add_argument("--users", type=int, default=200, help="用户数")
+    parser.add_argument("--medications-per-user", type=int, default=50, help="每个用户的药物数")
+    parser.add_argument("--due-ratio", type=float, default=0.05, help="落在发送时间窗口内的提醒比例")
+    parser.add_argument("--requests", type=int, default=2000, help="每个HTTP场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发数")
+    parser.add_argument("--sweep-rounds", type=int, default=5, help="提醒扫描的轮数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子（数据和请求序列）")
+    parser.add_argument("--scenarios", nargs="+", default=[*HTTP_SCENARIOS, "reminder_sweep"],
+                        choices=[*HTTP_SCENARIOS, "reminder_sweep"], help="要运行的场景")
+    parser.add_argument("--output", help="结果JSON文件，默认写入 benchmarks/results/scenarios-<时间>.json")
+    parser.add_argument("--compare", help="与之前的结果JSON对比吞吐量和p95")
+    args = parser.parse_args()
+
+    # 先按 LOG_LEVEL 配置日志（create_app中再次调用不会覆盖），压测时不输出每个请求的INFO日志
+    configure_logging()
+    logging.getLogger().setLevel(logging.WARNING)
+    # 合成药物不在药品目录中、模拟通知会逐条打印日志，压测时只保留错误
+    for name in ("src.utils.medication_search", "src.adapters.notification_adapters", "src.sql.slow"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        counts = generate_household_data(
+            f"sqlite:///{path}", users=args.users, medications_per_user=args.medications_per_user,
+            due_ratio=args.due_ratio, seed=args.seed
+        )
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        init_db(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        async_session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        async def override_get_async_db():
+            async with async_session_factory() as db:
+                yield db
+
+        app = create_app()
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+
+        http_names = [name for name in args.scenarios if name in HTTP_SCENARIOS]
+
+        async def run_all():
+            try:
+                return await run_http_scenarios(app, http_names, args)
+            finally:
+                await async_engine.dispose()
+
+        scenarios = asyncio.run(run_all())
+        if "reminder_sweep" in args.scenarios:
+            scenarios["reminder_sweep"] = run_reminder_sweep(
+                session_factory, args.sweep_rounds, counts["due_reminders"]
+            )
+        engine.dispose()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "data": counts,
+        "scenarios": scenarios,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["scenarios"]
+    print_results(scenarios, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"scenarios-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+令牌验证吞吐量基准测试
+
+在令牌存储中预先写入大量条目，然后测量 validate_token 的吞吐量（与请求鉴权走同一路径）：
+  - signed：校验HMAC签名和过期时间，再到已注销令牌ID（拒绝列表）中查找，存储中保存 --tokens 个已注销令牌ID
+  - session：到存储中查找随机令牌，存储中保存 --tokens 个会话
+验证的令牌中约90%有效，其余为已注销（signed）或不存在（session）的令牌。
+
+用法:
+    python -m benchmarks.bench_token_store --tokens 1000000 --lookups 200000
+"""
+import argparse
+import logging
+import os
+import random
+import secrets
+import tempfile
+import time
+
+from src.config import settings
+from src.middleware import auth_middleware
+from src.middleware.auth_middleware import generate_token, revoke_token, validate_token
+from src.middleware.token_store import MemoryTokenStore, SQLiteTokenStore
+
+# 每种令牌准备的数量，验证时从中随机抽取
+POOL_SIZE = 10000
+
+
+# 向令牌存储批量写入条目，返回写入的令牌列表
+def fill_store(store, count: int, nbytes: int):
+    expiry = time.time() + 3600
+    tokens = [secrets.token_urlsafe(nbytes) for _ in range(count)]
+
+    if isinstance(store, SQLiteTokenStore):
+        # 逐条提交过慢，基准测试直接批量写入
+        conn = store._connection()
+        conn.executemany(
+            "INSERT INTO tokens (token, user_id, expiry) VALUES (?, ?, ?)",
+            ((token, i, expiry) for i, token in enumerate(tokens))
+        )
+        conn.commit()
+    else:
+        for i, token in enumerate(tokens):
+            store.put(token, i, expiry)
+
+    return tokens
+
+
+# 写入存储并准备 (有效令牌, 无效令牌)
+def prepare(store, mode: str, count: int):
+    if mode == "session":
+        valid = fill_store(store, count, 32)[:POOL_SIZE]
+        invalid = [secrets.token_urlsafe(32) for _ in range(POOL_SIZE)]
+        return valid, invalid
+
+    # 拒绝列表中的条目是令牌ID（generate_token中为12字节随机值）
+    fill_store(store, count, 12)
+    valid = [generate_token(i % 1000 + 1) for i in range(POOL_SIZE)]
+    invalid = [generate_token(i % 1000 + 1) for i in range(POOL_SIZE // 10)]
+    for token in invalid:
+        revoke_token(token)
+    return valid, invalid
+
+
+# 测量验证吞吐量（次/秒）
+def measure(valid, invalid, lookups: int, hit_ratio: float = 0.9) -> float:
+    rng = random.Random(42)
+    sample = [
+        rng.choice(valid) if rng.random() < hit_ratio else rng.choice(invalid)
+        for _ in range(lookups)
+    ]
+    assert validate_token(valid[0]) is not None and validate_token(invalid[0]) is None
+
+    start = time.perf_counter()
+    for token in sample:
+        validate_token(token)
+    elapsed = time.perf_counter() - start
+    return lookups / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="令牌验证吞吐量基准测试")
+    parser.add_argument("--tokens", type=int, default=1_000_000, help="存储中的条目数量")
+    parser.add_argument("--lookups", type=int, default=200_000, help="验证次数")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "all"], default="all")
+    parser.add_argument("--mode", choices=["signed", "session", "all"], default="all")
+    args = parser.parse_args()
+
+    # 只测量验证本身，不输出每次验证的日志；使用临时密钥，不生成密钥文件
+    logging.getLogger(auth_middleware.__name__).setLevel(logging.ERROR)
+    settings.TOKEN_SECRET_KEYS = {settings.TOKEN_ACTIVE_KEY_ID: secrets.token_urlsafe(48)}
+    auth_middleware.signing_keys.cache_clear()
+
+    backends = ["memory", "sqlite"] if args.backend == "all" else [args.backend]
+    modes = ["signed", "session"] if args.mode == "all" else [args.mode]
+
+    for backend in backends:
+        for mode in modes:
+            with tempfile.TemporaryDirectory() as tmp:
+                if backend == "memory":
+                    store = MemoryTokenStore(eviction_interval=0)
+                else:
+                    store = SQLiteTokenStore(os.path.join(tmp, "tokens.db"), eviction_interval=0)
+                settings.TOKEN_MODE = mode
+                auth_middleware.TOKEN_STORE = store
+
+                start = time.perf_counter()
+                valid, invalid = prepare(store, mode, args.tokens)
+                fill_time = time.perf_counter() - start
+
+                ops = measure(valid, invalid, args.lookups)
+                print(f"{backend:>8} {mode:>8}: {len(store):>9} 个条目, 写入耗时 {fill_time:7.2f}s, "
+                      f"验证吞吐量 {ops:12,.0f} 次/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+家庭药箱测试数据生成器
+
+按固定随机种子生成可复现的数据（同样的参数和参考日期总是生成同样的行）：
+  - users 个用户，部分绑定并验证了手机号/微信
+  - 每个用户 medications_per_user 种药物，名称取自药品目录、推荐药物和合成名称；
+    过期日期分布：约10%已过期，约10%在 EXPIRY_REMINDER_DAYS 天内过期，其余在1-3年后过期
+  - 药品目录中的疾病和 diseases 个合成疾病（每个带若干推荐药物）
+  - 每种药物 reminders_per_medication 条用药提醒，其中 due_ratio 比例落在提醒发送的时间窗口内（参考时间前后5分钟）
+
+用法（生成一个可以直接用于本地调试的数据库文件）:
+    python -m benchmarks.datagen --users 100 --medications-per-user 50 --output household.db
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine
+
+from src.config import settings
+from src.database import Base
+from src.models.disease import Disease, MedicationRecommendation
+from src.models.medication import Medication
+from src.models.reminder import Reminder
+from src.models.user import User
+from src.utils.medication_search import catalog
+
+UNITS = ["片", "粒", "袋", "瓶", "支"]
+SHELF_LIVES = [365, 540, 730, 1095]
+INSERT_BATCH_SIZE = 5000
+
+
+# 药品目录和推荐表中出现的药物名称，用户药物柜中约一半药物取自这里（推荐接口能找到可用药物）
+def known_names(snapshot) -> List[str]:
+    return sorted(
+        set(snapshot.medications)
+        | {name for names in snapshot.recommendations.values() for name in names}
+    )
+
+
+def _expiry_date(rng: random.Random, today: date) -> date:
+    roll = rng.random()
+    if roll < 0.1:
+        return today - timedelta(days=rng.randint(1, 365))
+    if roll < 0.2:
+        return today + timedelta(days=rng.randint(0, settings.EXPIRY_REMINDER_DAYS))
+    return today + timedelta(days=rng.randint(365, 3 * 365))
+
+
+def _insert(conn, table, rows):
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        conn.execute(table.insert(), rows[start:start + INSERT_BATCH_SIZE])
+
+
+def generate_household_data(
+    database_url: str,
+    users: int = 100,
+    medications_per_user: int = 50,
+    diseases: int = 50,
+    recommendations_per_disease: int = 5,
+    reminders_per_medication: int = 1,
+    due_ratio: float = 0.05,
+    seed: int = 42,
+    now: Optional[datetime] = None
+) -> Dict[str, int]:
+    """写入测试数据（会先建表），返回各表写入的行数。now 为参考时间，默认当前时间"""
+    rng = random.Random(seed)
+    now = (now or datetime.now()).replace(microsecond=0)
+    today = now.date()
+    window = timedelta(minutes=5)
+    snapshot = catalog.current
+    names_in_catalog = known_names(snapshot)
+
+    user_rows = []
+    for user_id in range(1, users + 1):
+        phone = rng.random() < 0.7
+        wechat = rng.random() < 0.4
+        user_rows.append({
+            "id": user_id,
+            "username": f"user{user_id}",
+            "phone_number": f"138{user_id:08d}" if phone else None,
+            "wechat_openid": f"openid-{user_id}" if wechat else None,
+            "phone_verified": phone and rng.random() < 0.9,
+            "wechat_verified": wechat and rng.random() < 0.9,
+        })
+
+    medication_rows = []
+    reminder_rows = []
+    for user_id in range(1, users + 1):
+        for _ in range(medications_per_user):
+            medication_id = len(medication_rows) + 1
+            if rng.random() < 0.5:
+                name = rng.choice(names_in_catalog)
+            else:
+                name = f"药物{rng.randrange(10 * medications_per_user)}"
+            shelf_life = rng.choice(SHELF_LIVES)
+            expiry = _expiry_date(rng, today)
+            info = snapshot.medications.get(name, {})
+            medication_rows.append({
+                "id": medication_id,
+                "name": name,
+                "production_date": expiry - timedelta(days=shelf_life),
+                "shelf_life_days": shelf_life,
+                "expiry_date": expiry,
+                "功效": info.get("功效"),
+                "usage": info.get("用法"),
+                "quantity": float(rng.randint(1, 60)),
+                "unit": rng.choice(UNITS),
+                "user_id": user_id,
+            })
+            for _ in range(reminders_per_medication):
+                if rng.random() < due_ratio:
+                    reminder_time = now + timedelta(seconds=rng.randint(-window.seconds, window.seconds))
+                else:
+                    reminder_time = now + timedelta(minutes=rng.randint(10, 30 * 24 * 60))
+                reminder_rows.append({
+                    "user_id": user_id,
+                    "medication_id": medication_id,
+                    "reminder_type": "expiry" if rng.random() < 0.2 else "usage",
+                    "reminder_time": reminder_time,
+                    "sent": False,
+                })
+
+    disease_rows = []
+    recommendation_rows = []
+    for name, medication_names in snapshot.recommendations.items():
+        disease_id = len(disease_rows) + 1
+        disease_rows.append({"id": disease_id, "name": name, "description": f"{name}（药品目录）"})
+        recommendation_rows.extend(
+            {"disease_id": disease_id, "medication_name": medication_name, "recommendation_strength": 3}
+            for medication_name in medication_names
+        )
+    # 合成疾病只存在于数据库中，推荐接口需要查询推荐表
+    for i in range(diseases):
+        disease_id = len(disease_rows) + 1
+        disease_rows.append({"id": disease_id, "name": f"疾病{i}", "description": f"合成疾病{i}"})
+        names = rng.sample(names_in_catalog, min(2, len(names_in_catalog)))
+        names += [f"药物{rng.randrange(10 * medications_per_user)}"
+                  for _ in range(recommendations_per_disease - len(names))]
+        recommendation_rows.extend(
+            {"disease_id": disease_id, "medication_name": medication_name,
+             "recommendation_strength": rng.randint(1, 5)}
+            for medication_name in dict.fromkeys(names)
+        )
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        _insert(conn, User.__table__, user_rows)
+        _insert(conn, Medication.__table__, medication_rows)
+        _insert(conn, Reminder.__table__, reminder_rows)
+        _insert(conn, Disease.__table__, disease_rows)
+        _insert(conn, MedicationRecommendation.__table__, recommendation_rows)
+    engine.dispose()
+
+    return {
+        "users": len(user_rows),
+        "medications": len(medication_rows),
+        "reminders": len(reminder_rows),
+        "due_reminders": sum(abs(row["reminder_time"] - now) <= window for row in reminder_rows),
+        "diseases": len(disease_rows),
+        "recommendations": len(recommendation_rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成家庭药箱测试数据")
+    parser.add_argument("--users", type=int, default=100, help="用户数")
+    parser.add_argument("--medications-per-user", type=int, default=50, help="每个用户的药物数")
+    parser.add_argument("--diseases", type=int, default=50, help="合成疾病数")
+    parser.add_argument("--reminders-per-medication", type=int, default=1, help="每种药物的提醒数")
+    parser.add_argument("--due-ratio", type=float, default=0.05, help="落在发送时间窗口内的提醒比例")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", required=True, help="输出的SQLite数据库文件（应为不存在的新文件）")
+    args = parser.parse_args()
+
+    counts = generate_household_data(
+        f"sqlite:///{args.output}",
+        users=args.users,
+        medications_per_user=args.medications_per_user,
+        diseases=args.diseases,
+        reminders_per_medication=args.reminders_per_medication,
+        due_ratio=args.due_ratio,
+        seed=args.seed,
+    )
+    print(", ".join(f"{table}: {count}" for table, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any
-import requests
 import logging
 
+from ..utils.message_templates import render_message
+from ..config import settings
+
 # 设置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # 通知适配器接口
@@ -33,7 +34,8 @@ class SMSAdapter(NotificationAdapter):
             # 目前只是模拟发送
             logger.info(f"[SMS] 向 {recipient} 发送消息: {message}")
             
-            # 模拟API调用
+            # 模拟API调用（requests等第三方SDK在函数内导入，不拖慢应用启动）
+            # import requests
             # response = requests.post(
             #     self.api_url,
             #     headers={"Authorization": f"Bearer {self.api_key}"},
@@ -48,7 +50,7 @@ class SMSAdapter(NotificationAdapter):
     
     def send_verification_code(self, recipient: str, code: str) -> bool:
         """发送验证码"""
-        message = f"您的验证码是：{code}，有效期5分钟，请不要泄露给他人。"
+        message = render_message("verification_code", settings.MESSAGE_LOCALE, "sms", code=code)
         return self.send_message(recipient, message)
 
 # 微信通知适配器
@@ -74,6 +76,7 @@ class WeChatAdapter(NotificationAdapter):
             logger.info("获取微信access_token")
             
             # 模拟API调用
+            # import requests
             # response = requests.get(
             #     f"{self.api_url}/token",
             #     params={
@@ -106,6 +109,7 @@ class WeChatAdapter(NotificationAdapter):
             logger.info(f"[WeChat] 向 {recipient} 发送消息: {message}")
             
             # 模拟API调用
+            # import requests
             # response = requests.post(
             #     f"{self.api_url}/message/custom/send",
             #     params={"access_token": access_token},
@@ -124,7 +128,7 @@ class WeChatAdapter(NotificationAdapter):
     
     def send_verification_code(self, recipient: str, code: str) -> bool:
         """发送验证码"""
-        message = f"您的验证码是：{code}，有效期5分钟，请不要泄露给他人。"
+        message = render_message("verification_code", settings.MESSAGE_LOCALE, "wechat", code=code)
         return self.send_message(recipient, message)
 
 # 邮件通知适配器（扩展功能）
@@ -165,7 +169,7 @@ class EmailAdapter(NotificationAdapter):
     
     def send_verification_code(self, recipient: str, code: str) -> bool:
         """发送验证码"""
-        message = f"您的验证码是：{code}，有效期5分钟，请不要泄露给他人。"
+        message = render_message("verification_code", settings.MESSAGE_LOCALE, "email", code=code)
         return self.send_message(recipient, message)
 
 # 通知管理器 - 用于管理多个通知适配器
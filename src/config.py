@@ -1,20 +1,78 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict, Optional
 
 class Settings(BaseSettings):
     HOST: str = '0.0.0.0'
     PORT: int = 8000
     DEBUG: bool = True
+    LOG_LEVEL: str = "INFO"
     # CORS配置
     CORS_ORIGINS: List[str] = ["*"]
     
+    # 认证令牌配置
+    # 签名密钥 {密钥ID: 密钥}，轮换密钥时新增一项并切换TOKEN_ACTIVE_KEY_ID，旧令牌在过期前仍可验证
+    # 为空时使用 TOKEN_SECRET_KEY_PATH 中本次部署生成的随机密钥（文件不存在时生成）
+    TOKEN_SECRET_KEYS: Dict[str, str] = {}
+    TOKEN_ACTIVE_KEY_ID: str = "k1"
+    TOKEN_SECRET_KEY_PATH: str = "./token_secret.key"
+    TOKEN_EXPIRY_HOURS: int = 24
+    TOKEN_MODE: str = "signed"  # signed: 自包含签名令牌; session: 服务端会话令牌
+    TOKEN_STORE_BACKEND: str = "memory"  # memory 或 sqlite（多worker共享，多worker部署时必须使用）
+    TOKEN_STORE_PATH: str = "./tokens.db"
+    TOKEN_EVICTION_INTERVAL: int = 60  # 后台清理过期令牌的间隔（秒）
+    
+    # 密码哈希配置（scrypt）
+    PASSWORD_SCRYPT_N: int = 2 ** 14  # CPU/内存开销参数
+    PASSWORD_SCRYPT_R: int = 8
+    PASSWORD_SCRYPT_P: int = 1
+    PASSWORD_HASH_WORKERS: int = 0  # 哈希进程数，0表示使用CPU核数
+    PASSWORD_HASH_MAX_PENDING: int = 0  # 同时处理的最大任务数，0表示进程数的4倍
+    
+    # 速率限制配置
+    RATE_LIMIT_BACKEND: str = "memory"  # memory 或 sqlite（多worker共享）
+    RATE_LIMIT_PATH: str = "./rate_limits.db"
+    RATE_LIMIT_MAX_KEYS: int = 100000  # 内存模式下保存的限流键数量上限（只淘汰已恢复额度的键，一个时间窗口内的活跃键多于上限时会暂时超出）
+    
+    # 已认证用户缓存配置
+    USER_CACHE_TTL: int = 30  # 缓存有效期（秒）
+    USER_CACHE_SIZE: int = 10000
+    
+    # 响应压缩配置（br需要安装brotli，未安装时只使用gzip）
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # 小于该字节数的响应不压缩
+    COMPRESSION_GZIP_LEVEL: int = 6  # gzip压缩级别（1-9）
+    COMPRESSION_BROTLI_QUALITY: int = 4  # brotli压缩质量（0-11），4在中文列表响应上体积和CPU开销较均衡
+    
+    # 指标配置（Prometheus格式，GET /metrics）
+    METRICS_ENABLED: bool = True
+    
+    # SQL监控配置
+    SLOW_QUERY_MS: float = 100  # 超过该耗时（毫秒）的语句写入慢查询日志
+    SLOW_QUERY_EXPLAIN: bool = True  # 慢查询日志是否附带EXPLAIN输出
+    N_PLUS_ONE_THRESHOLD: int = 5  # 同一请求中相同形状的语句执行次数达到该值时判定为N+1查询
+    
+    # 管理员与性能剖析配置
+    RESERVED_USERNAMES: List[str] = ["admin", "administrator", "root", "system"]  # 不允许注册或改用的用户名（不区分大小写）
+    PROFILING_ENABLED: bool = False  # 是否启用单请求剖析中间件（只对管理员生效）
+    PROFILE_HEADER: str = "X-Debug-Profile"  # 管理员请求携带该请求头时，用cProfile剖析这一个请求
+    PROFILE_HISTORY_SIZE: int = 20  # 保存最近多少次单请求剖析结果
+    PROFILER_MAX_SECONDS: float = 60  # 采样剖析的最长时间（秒）
+    
+    # 数据导出配置
+    EXPORT_BATCH_SIZE: int = 500  # 每批从数据库读取并发送的行数
+    EXPORT_GZIP_LEVEL: int = 6  # gzip压缩级别（1-9）
+    IMPORT_MAX_ROWS: int = 5000  # 单次批量导入的最大行数
+    IMPORT_MAX_BYTES: int = 10 * 1024 * 1024  # 单次批量导入的请求体最大字节数（接收时计数）
+    
     # 提醒配置
     EXPIRY_REMINDER_DAYS: int = 30  # 过期前30天开始提醒
+    MESSAGE_LOCALE: str = "zh_CN"  # 通知消息模板语言
     
     # 短信配置
     SMS_ENABLED: bool = False
     SMS_API_KEY: str = "your_api_key"
     SMS_API_SECRET: str = "your_api_secret"
+    SMS_COST_PER_SEGMENT: float = 0.045  # 每条短信（70字分段）费用
     
     # 微信配置
     WECHAT_ENABLED: bool = False
@@ -23,6 +81,7 @@ class Settings(BaseSettings):
     
     # 药物信息API
     MEDICATION_API_URL: str = "https://api.medication-info.com/v1"
+    MEDICATION_CATALOG_PATH: Optional[str] = None  # 编译后的药品目录文件（python -m src.utils.catalog_file 生成），为空时使用内置数据
     MEDICATION_API_KEY: str = "your_medication_api_key"
 
 # 实例化配置
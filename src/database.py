@@ -1,19 +1,38 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 
 # 数据库路径
 SQLALCHEMY_DATABASE_URL = "sqlite:///./medication.db"
+# 异步访问同一个数据库（aiosqlite驱动）
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./medication.db"
 
 # 创建引擎
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 
+# 创建异步引擎
+# 异步路由等待数据库（包括等待SQLite锁）时不占用线程池中的线程，
+# 并发上限由连接池大小决定；使用连接池复用aiosqlite连接（每个连接有一个后台线程）
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=20,
+    max_overflow=20
+)
+
 # 创建会话本地类
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步会话类；提交后不使对象过期，避免在异步上下文中隐式触发延迟加载
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # 声明基类
 Base = declarative_base()
 
@@ -23,4 +42,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# 异步数据库会话依赖
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,50 +1,134 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+import logging
+
+from fastapi import FastAPI
+from sqlalchemy import inspect, text
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from starlette.concurrency import run_in_threadpool
 
-from .database import SessionLocal, engine
+from .database import Base, async_engine, engine
 from .models.medication import Medication
 from .models.disease import Disease
 from .models.user import User
 from .models.reminder import Reminder
+from .models.cabinet_version import CabinetVersion
 from .routes.main_router import main_router
+from .middleware.compression import CompressionMiddleware
+from .middleware.metrics import MetricsMiddleware, metrics_endpoint
+from .middleware.profiling import RequestProfilerMiddleware
+from .middleware.auth_middleware import check_token_settings
+from .utils.sql_instrumentation import instrument_engine
+from .services.password_service import password_hasher
 from .config import settings
 
-# 创建数据库表
-Medication.metadata.create_all(bind=engine)
-Disease.metadata.create_all(bind=engine)
-User.metadata.create_all(bind=engine)
-Reminder.metadata.create_all(bind=engine)
-
-# 初始化FastAPI应用
-app = FastAPI(title="Medication Management System", description="药物管理系统", version="1.0.0")
-
-# 配置CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 数据库依赖
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-# 挂载主路由
-app.include_router(main_router, prefix="/api")
-
-# 根路径
-@app.get("/")
-async def root():
-    return {"message": "Welcome to Medication Management System"}
+logger = logging.getLogger(__name__)
+
+# 已完成建表检查的数据库（每个进程对每个数据库只检查一次）
+_initialized_databases = set()
+
+# 配置日志（只在应用入口配置一次，各模块只获取logger）
+def configure_logging():
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+# 为已存在的表补建模型中新增的列（create_all不会修改已存在的表）
+# 只支持可为空、没有服务端默认值的列，其他结构变更需要手工迁移
+def add_missing_columns(bind=engine):
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                logger.info(f"已为表 {table.name} 添加列 {column.name}")
+
+# 创建数据库表，为已存在的表补建新增的列和索引（create_all只在建表时创建列和索引）
+def init_db(bind=engine):
+    key = str(bind.url)
+    if key in _initialized_databases:
+        return
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+    for table in (Medication.__table__, Reminder.__table__):
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    _initialized_databases.add(key)
+    logger.info("数据库表检查完成")
+
+# 应用生命周期：启动时建表，关闭时释放连接池和密码哈希进程池
+# 建表放在启动阶段而不是模块导入时，导入应用（测试、脚本、多worker的主进程）不会触碰数据库
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_token_settings()
+    await run_in_threadpool(init_db)
+    yield
+    await async_engine.dispose()
+    password_hasher.shutdown()
+
+# 创建FastAPI应用
+def create_app() -> FastAPI:
+    configure_logging()
+
+    app = FastAPI(
+        title="Medication Management System",
+        description="药物管理系统",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # 配置CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Profile-Id"],
+    )
+
+    # 单请求剖析（先添加，在压缩内层，报告不包含压缩耗时）
+    if settings.PROFILING_ENABLED:
+        app.add_middleware(RequestProfilerMiddleware)
+
+    # 响应压缩（后添加的中间件在外层）
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware)
+
+    # SQL执行监控（慢查询日志；按请求统计和N+1检测由MetricsMiddleware完成）
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
+    # 请求指标（放在最外层，耗时包含压缩）
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
+    # 挂载主路由
+    app.include_router(main_router, prefix="/api")
+
+    # 根路径
+    @app.get("/")
+    async def root():
+        return {"message": "Welcome to Medication Management System"}
+
+    return app
+
+# 应用实例在第一次访问 src.main.app 时创建（uvicorn加载 "src.main:app" 或 from src.main import app），
+# 只导入模块（基准测试、脚本调用create_app）时不构建路由和中间件
+def __getattr__(name: str):
+    if name == "app":
+        app = create_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(create_app(), host="0.0.0.0", port=8000)
@@ -1,71 +1,185 @@
-from fastapi import Request, HTTPException, Depends
+from fastapi import HTTPException, Depends
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from typing import Optional, Callable
+from typing import Optional, Callable, Dict, Tuple
 import time
 import logging
+import hmac
+import hashlib
+import base64
+import secrets
+import re
+import math
+import os
+from functools import lru_cache
+
+from starlette.concurrency import run_in_threadpool
 
 from ..database import get_db
+from ..config import settings
+from .token_store import create_token_store
+from .rate_limiter import create_rate_limiter
+from .route_policy import RoutePolicy
 from ..models.user import User
-from ..services.user_service import get_user
+from ..services.user_service import get_cached_user
 
 # 设置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # 创建HTTP Bearer安全方案
 bearer_scheme = HTTPBearer()
 
-# 模拟的令牌存储（实际应用中应该使用数据库或Redis存储令牌）
-# 格式: {token: {user_id: int, expiry: float}}
-TOKENS = {}
+# 令牌模式（TOKEN_MODE）:
+# - signed: 令牌格式为 "<密钥ID>.<用户ID>.<过期时间戳>.<令牌ID>.<签名>"，签名为对前四段内容的HMAC-SHA256，
+#   令牌自包含，验证时不依赖共享状态；令牌存储中只保存尚未过期的已注销令牌ID
+# - session: 令牌为随机字符串，令牌存储中保存 {令牌: (用户ID, 过期时间)}
+# 令牌存储使用sqlite后端时，所有worker进程共享同一份数据
+TOKEN_STORE = create_token_store(
+    settings.TOKEN_STORE_BACKEND,
+    settings.TOKEN_STORE_PATH,
+    eviction_interval=settings.TOKEN_EVICTION_INTERVAL
+)
+
+# 读取密钥文件，文件不存在时生成随机密钥
+# 先写临时文件再用硬链接创建目标文件（已存在时失败），多个worker同时启动时只有一个生成的密钥生效
+def _load_or_create_key_file(path: str) -> str:
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_urlsafe(48))
+        try:
+            os.link(tmp_path, path)
+            logger.info(f"已生成令牌签名密钥: {path}")
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(path, encoding="ascii") as f:
+        secret = f.read().strip()
+    if not secret:
+        raise RuntimeError(f"令牌签名密钥文件为空: {path}")
+    return secret
+
+# 令牌签名密钥 {密钥ID: 密钥}（第一次使用时加载）
+# 没有配置 TOKEN_SECRET_KEYS 时使用本次部署的随机密钥，源码中没有可用于伪造令牌的默认密钥
+@lru_cache(maxsize=None)
+def signing_keys() -> Dict[str, str]:
+    keys = dict(settings.TOKEN_SECRET_KEYS)
+    if not keys:
+        keys[settings.TOKEN_ACTIVE_KEY_ID] = _load_or_create_key_file(settings.TOKEN_SECRET_KEY_PATH)
+    if settings.TOKEN_ACTIVE_KEY_ID not in keys:
+        raise RuntimeError(f"TOKEN_SECRET_KEYS 中没有当前密钥 {settings.TOKEN_ACTIVE_KEY_ID}")
+    return keys
+
+# 启动时检查令牌配置，配置错误时拒绝启动
+# memory令牌存储只在单个进程中有效：多worker时注销的令牌在其他worker上仍可使用（session模式下登录也会失效），
+# 能从 WEB_CONCURRENCY（uvicorn --workers 的默认值）判断出多worker部署时要求使用sqlite后端
+def check_token_settings():
+    signing_keys()
+    workers = int(os.environ.get("WEB_CONCURRENCY") or 1)
+    if workers > 1 and settings.TOKEN_STORE_BACKEND == "memory":
+        raise RuntimeError("多worker部署时令牌存储必须使用sqlite后端（TOKEN_STORE_BACKEND=sqlite）")
+
+# 计算令牌签名
+def _sign(key_id: str, payload: str) -> Optional[str]:
+    secret = signing_keys().get(key_id)
+    if secret is None:
+        return None
+    digest = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+# 解析并校验令牌签名，返回 (用户ID, 过期时间, 令牌ID)
+def _decode_token(token: str) -> Optional[Tuple[int, float, str]]:
+    try:
+        payload, signature = token.rsplit(".", 1)
+        key_id, user_id, expiry, token_id = payload.split(".")
+    except ValueError:
+        return None
+    
+    expected = _sign(key_id, payload)
+    if expected is None or not hmac.compare_digest(expected, signature):
+        return None
+    
+    try:
+        return int(user_id), float(expiry), token_id
+    except ValueError:
+        return None
 
 # 生成认证令牌
-def generate_token(user_id: int, expiry_hours: int = 24) -> str:
+def generate_token(user_id: int, expiry_hours: int = None) -> str:
     """生成认证令牌"""
-    import uuid
-    import hashlib
-    
-    # 生成唯一令牌
-    token = str(uuid.uuid4())
-    # 为了安全，可以进一步处理令牌
-    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    if expiry_hours is None:
+        expiry_hours = settings.TOKEN_EXPIRY_HOURS
     
     # 计算令牌过期时间
-    expiry = time.time() + (expiry_hours * 3600)
-    
-    # 存储令牌信息
-    TOKENS[token_hash] = {"user_id": user_id, "expiry": expiry}
+    expiry = int(time.time() + (expiry_hours * 3600))
     
     logger.info(f"为用户 {user_id} 生成令牌")
-    return token_hash
+    
+    if settings.TOKEN_MODE == "session":
+        token = secrets.token_urlsafe(32)
+        TOKEN_STORE.put(token, user_id, expiry)
+        return token
+    
+    # 令牌ID用于注销，使用随机值保证唯一
+    token_id = secrets.token_urlsafe(12)
+    key_id = settings.TOKEN_ACTIVE_KEY_ID
+    payload = f"{key_id}.{user_id}.{expiry}.{token_id}"
+    return f"{payload}.{_sign(key_id, payload)}"
 
 # 验证令牌
 def validate_token(token: str) -> Optional[int]:
     """验证令牌并返回用户ID"""
-    # 检查令牌是否存在
-    if token not in TOKENS:
+    if settings.TOKEN_MODE == "session":
+        # 令牌存储只返回未过期的令牌
+        entry = TOKEN_STORE.get(token)
+        if entry is None:
+            logger.warning("无效或过期的令牌")
+            return None
+        logger.info(f"令牌验证成功，用户ID: {entry[0]}")
+        return entry[0]
+    
+    decoded = _decode_token(token)
+    if decoded is None:
         logger.warning("无效的令牌")
         return None
     
-    token_info = TOKENS[token]
-    current_time = time.time()
+    user_id, expiry, token_id = decoded
     
     # 检查令牌是否过期
-    if token_info["expiry"] < current_time:
-        # 删除过期令牌
-        del TOKENS[token]
+    if expiry < time.time():
         logger.warning("令牌已过期")
         return None
     
-    logger.info(f"令牌验证成功，用户ID: {token_info['user_id']}")
-    return token_info["user_id"]
+    # 检查令牌是否已被注销
+    if token_id in TOKEN_STORE:
+        logger.warning("令牌已注销")
+        return None
+    
+    logger.info(f"令牌验证成功，用户ID: {user_id}")
+    return user_id
+
+# 在异步代码中验证令牌：令牌存储会阻塞时（sqlite后端）放到线程池中执行，不阻塞事件循环
+async def validate_token_async(token: str) -> Optional[int]:
+    if TOKEN_STORE.blocking:
+        return await run_in_threadpool(validate_token, token)
+    return validate_token(token)
 
 # 注销令牌
 def revoke_token(token: str) -> bool:
     """注销令牌"""
-    if token in TOKENS:
-        del TOKENS[token]
+    if settings.TOKEN_MODE == "session":
+        revoked = TOKEN_STORE.delete(token)
+    else:
+        decoded = _decode_token(token)
+        revoked = decoded is not None and decoded[1] >= time.time()
+        if revoked:
+            # 已注销的令牌ID只需保存到令牌原本的过期时间
+            TOKEN_STORE.put(decoded[2], decoded[0], decoded[1])
+    
+    if revoked:
         logger.info("令牌已注销")
         return True
     
@@ -88,7 +202,8 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"}
         )
     
-    user = get_user(db, user_id)
+    # 稳态下由缓存提供用户信息，不查询users表
+    user = get_cached_user(db, user_id)
     
     if not user:
         raise HTTPException(
@@ -98,37 +213,44 @@ def get_current_user(
     
     return user
 
-# 认证中间件类
+# 从ASGI请求头中读取指定头部（名称需为小写字节串）
+def _get_header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+# 认证中间件类（纯ASGI实现，只检查scope和请求头，不读取请求体）
 class AuthMiddleware:
-    def __init__(self, app):
+    def __init__(self, app, policy: RoutePolicy = None):
         self.app = app
+        # 路由认证策略表，未指定时在第一个请求时根据应用路由构建一次
+        self.policy = policy
     
-    async def __call__(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # 记录请求开始时间
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # 获取请求路径
-        path = request.url.path
+        path = scope["path"]
         
-        # 列出不需要认证的路径
-        excluded_paths = [
-            "/", "/docs", "/redoc", "/openapi.json",
-            "/api/auth/login", "/api/auth/register",
-            # 其他公开API路径...
-        ]
+        if self.policy is None:
+            # 不经过Starlette直接调用时scope中没有app，使用默认策略（只有 PUBLIC_ROUTES 之外的路径需要认证）
+            app = scope.get("app")
+            self.policy = RoutePolicy.from_app(app) if app is not None else RoutePolicy.from_public_routes()
         
         # 检查是否需要认证
-        requires_auth = True
-        for excluded_path in excluded_paths:
-            if path.startswith(excluded_path):
-                requires_auth = False
-                break
+        requires_auth = self.policy.requires_auth(path)
         
         # 如果需要认证，验证令牌
         if requires_auth:
             try:
                 # 从请求头中获取Authorization
-                auth_header = request.headers.get("Authorization")
+                auth_header = _get_header(scope, b"authorization")
                 
                 if not auth_header or not auth_header.startswith("Bearer "):
                     raise HTTPException(
@@ -139,7 +261,7 @@ class AuthMiddleware:
                 
                 # 提取令牌
                 token = auth_header[len("Bearer "):]
-                user_id = validate_token(token)
+                user_id = await validate_token_async(token)
                 
                 if not user_id:
                     raise HTTPException(
@@ -148,103 +270,143 @@ class AuthMiddleware:
                         headers={"WWW-Authenticate": "Bearer"}
                     )
                 
-                # 将用户ID添加到请求状态中
-                request.state.user_id = user_id
+                # 将用户ID添加到请求状态中（request.state.user_id）
+                scope.setdefault("state", {})["user_id"] = user_id
                 
             except HTTPException as e:
                 # 处理认证异常
                 logger.warning(f"认证失败: {str(e.detail)}")
-                response = Response(
-                    content=json.dumps({"detail": e.detail}),
+                response = JSONResponse(
                     status_code=e.status_code,
+                    content={"detail": e.detail},
                     headers={"WWW-Authenticate": "Bearer"}
                 )
-                response.headers["Content-Type"] = "application/json"
-                return response
+                await response(scope, receive, send)
+                return
             except Exception as e:
                 # 处理其他异常
                 logger.error(f"认证过程中发生错误: {str(e)}")
-                response = Response(
-                    content=json.dumps({"detail": "认证过程中发生错误"}),
-                    status_code=500
+                response = JSONResponse(
+                    status_code=500,
+                    content={"detail": "认证过程中发生错误"}
                 )
-                response.headers["Content-Type"] = "application/json"
-                return response
+                await response(scope, receive, send)
+                return
         
         # 处理请求
-        response = await call_next(request)
+        await self.app(scope, receive, send)
         
         # 记录请求处理时间
-        process_time = time.time() - start_time
+        process_time = time.perf_counter() - start_time
         logger.info(f"请求路径: {path}, 处理时间: {process_time:.4f}秒")
-        
-        return response
 
-# 错误处理中间件
+# 错误处理中间件（纯ASGI实现）
 class ErrorHandlingMiddleware:
     def __init__(self, app):
         self.app = app
     
-    async def __call__(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response_started = False
+        
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
         try:
             # 处理请求
-            response = await call_next(request)
-            return response
-        except HTTPException as e:
-            # 处理HTTP异常
-            logger.warning(f"HTTP异常: {e.status_code} - {e.detail}")
-            # 在实际应用中，应该返回统一的错误响应格式
-            return JSONResponse(
-                status_code=e.status_code,
-                content={"detail": e.detail}
-            )
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            # 处理其他异常
-            logger.error(f"服务器错误: {str(e)}")
-            # 在实际应用中，应该返回统一的错误响应格式，并记录详细错误信息
-            return JSONResponse(
-                status_code=500,
-                content={"detail": "服务器内部错误"}
-            )
+            # 响应已经开始发送时无法再返回错误响应，只能继续抛出
+            if response_started:
+                raise
+            
+            if isinstance(e, HTTPException):
+                # 处理HTTP异常
+                logger.warning(f"HTTP异常: {e.status_code} - {e.detail}")
+                # 在实际应用中，应该返回统一的错误响应格式
+                response = JSONResponse(
+                    status_code=e.status_code,
+                    content={"detail": e.detail}
+                )
+            else:
+                # 处理其他异常
+                logger.error(f"服务器错误: {str(e)}")
+                # 在实际应用中，应该返回统一的错误响应格式，并记录详细错误信息
+                response = JSONResponse(
+                    status_code=500,
+                    content={"detail": "服务器内部错误"}
+                )
+            await response(scope, receive, send)
 
-# 日志中间件
+# 日志中记录的请求体最大字节数
+LOG_BODY_SAMPLE_BYTES = 1024
+
+# 请求体中需要脱敏的字段
+_SENSITIVE_JSON_PATTERN = re.compile(
+    r'("(?:password|credit_card)"\s*:\s*)"(?:[^"\\]|\\.)*("|$)'
+)
+_SENSITIVE_FORM_PATTERN = re.compile(r'((?:^|&)(?:password|credit_card)=)[^&]*')
+
+# 日志中间件（纯ASGI实现）
 class LoggingMiddleware:
-    def __init__(self, app):
+    def __init__(self, app, sample_bytes: int = LOG_BODY_SAMPLE_BYTES):
         self.app = app
+        self.sample_bytes = sample_bytes
     
-    async def __call__(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # 记录请求信息
-        logger.info(f"请求方法: {request.method}, 请求路径: {request.url.path}")
+        method = scope["method"]
+        logger.info(f"请求方法: {method}, 请求路径: {scope['path']}")
         
-        # 如果是POST或PUT请求，记录请求体
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                if body:
-                    # 尝试解析JSON
-                    try:
-                        import json
-                        body_json = json.loads(body)
-                        # 过滤敏感信息
-                        if isinstance(body_json, dict):
-                            if "password" in body_json:
-                                body_json["password"] = "[REDACTED]"
-                            if "credit_card" in body_json:
-                                body_json["credit_card"] = "[REDACTED]"
-                        logger.info(f"请求体: {json.dumps(body_json)}")
-                    except:
-                        # 如果不是有效的JSON，记录原始内容的前100个字符
-                        logger.info(f"请求体: {body[:100]}...")
-            except Exception as e:
-                logger.warning(f"无法读取请求体: {str(e)}")
+        receive_wrapper = receive
         
-        # 处理请求
-        response = await call_next(request)
+        # 如果是POST或PUT请求，在下游读取请求体时抽样记录前几百字节，不额外缓冲整个请求体
+        if method in ("POST", "PUT", "PATCH"):
+            sample = bytearray()
+            logged = False
+            sample_bytes = self.sample_bytes
+            
+            async def receive_wrapper():
+                nonlocal logged
+                message = await receive()
+                if not logged and message["type"] == "http.request":
+                    body = message.get("body", b"")
+                    if len(sample) < sample_bytes:
+                        sample.extend(body[:sample_bytes - len(sample)])
+                    if not message.get("more_body", False) or len(sample) >= sample_bytes:
+                        logged = True
+                        self._log_body(bytes(sample))
+                return message
         
-        # 记录响应信息
-        logger.info(f"响应状态码: {response.status_code}")
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # 记录响应信息
+                logger.info(f"响应状态码: {message['status']}")
+            await send(message)
         
-        return response
+        # 处理请求
+        await self.app(scope, receive_wrapper, send_wrapper)
+    
+    def _log_body(self, sample: bytes):
+        """记录脱敏后的请求体样本"""
+        if not sample:
+            return
+        # 过滤敏感信息（样本可能被截断，不依赖完整的JSON解析）
+        text = sample.decode("utf-8", errors="replace")
+        text = _SENSITIVE_JSON_PATTERN.sub(r'\1"[REDACTED]"', text)
+        text = _SENSITIVE_FORM_PATTERN.sub(r'\1[REDACTED]', text)
+        suffix = "..." if len(sample) >= self.sample_bytes else ""
+        logger.info(f"请求体: {text}{suffix}")
 
 # CORS中间件配置函数
 def setup_cors_middleware(app):
@@ -268,46 +430,61 @@ def setup_cors_middleware(app):
         allow_headers=["*"],
     )
 
-# 速率限制中间件
+# 速率限制中间件（纯ASGI实现）
+# key_by="user" 时按已认证用户限流（需要把AuthMiddleware放在外层），未认证的请求仍按IP限流
 class RateLimiterMiddleware:
-    def __init__(self, app, max_requests: int = 100, time_window: int = 60):
+    def __init__(
+        self,
+        app,
+        max_requests: int = 100,
+        time_window: int = 60,
+        key_by: str = "ip",
+        backend: str = None,
+        max_keys: int = None
+    ):
         self.app = app
         self.max_requests = max_requests  # 时间窗口内的最大请求数
         self.time_window = time_window  # 时间窗口（秒）
-        self.requests = {}
+        self.key_by = key_by
+        self.limiter = create_rate_limiter(
+            max_requests,
+            time_window,
+            backend=backend or settings.RATE_LIMIT_BACKEND,
+            path=settings.RATE_LIMIT_PATH,
+            max_keys=max_keys or settings.RATE_LIMIT_MAX_KEYS
+        )
     
-    async def __call__(self, request: Request, call_next):
-        # 获取客户端IP地址
-        client_ip = request.client.host
-        
-        # 获取当前时间戳
-        current_time = time.time()
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # 清理过期的请求记录
-        if client_ip in self.requests:
-            self.requests[client_ip] = [
-                timestamp for timestamp in self.requests[client_ip]
-                if current_time - timestamp < self.time_window
-            ]
+        # 确定限流键：已认证用户使用用户ID，否则使用客户端IP地址
+        user_id = scope.get("state", {}).get("user_id") if self.key_by == "user" else None
+        if user_id is not None:
+            key = f"user:{user_id}"
         else:
-            self.requests[client_ip] = []
+            client = scope.get("client")
+            key = f"ip:{client[0] if client else 'unknown'}"
         
-        # 检查请求数是否超过限制
-        if len(self.requests[client_ip]) >= self.max_requests:
-            logger.warning(f"IP地址 {client_ip} 请求过于频繁")
+        # 检查请求数是否超过限制（sqlite后端在线程池中执行，等待锁时不阻塞事件循环）
+        if self.limiter.blocking:
+            allowed, retry_after = await run_in_threadpool(self.limiter.hit, key)
+        else:
+            allowed, retry_after = self.limiter.hit(key)
+        if not allowed:
+            logger.warning(f"{key} 请求过于频繁")
             # 在实际应用中，应该返回统一的错误响应格式
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=429,
-                content={"detail": "请求过于频繁，请稍后再试"}
+                content={"detail": "请求过于频繁，请稍后再试"},
+                headers={"Retry-After": str(math.ceil(retry_after))}
             )
-        
-        # 记录请求时间
-        self.requests[client_ip].append(current_time)
+            await response(scope, receive, send)
+            return
         
         # 处理请求
-        response = await call_next(request)
-        
-        return response
+        await self.app(scope, receive, send)
 
 # 初始化所有中间件
 def setup_middlewares(app):
@@ -327,7 +504,3 @@ def setup_middlewares(app):
     # 注意：认证中间件通常不通过app.add_middleware添加，而是通过依赖项或路由守卫实现
     
     logger.info("所有中间件已设置完成")
-
-# 导入需要的模块
-from fastapi.responses import Response, JSONResponse
-import json
\ No newline at end of file
@@ -0,0 +1,249 @@
+from typing import List, Optional, Tuple
+import zlib
+
+from ..config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只支持gzip
+    brotli = None
+
+# 可压缩的响应类型（药物说明等中文文本在UTF-8下每个字占3字节，压缩收益明显）
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+# 解析Accept-Encoding，返回客户端可接受的编码 {编码: q值}
+def _parse_accept_encoding(header: str) -> dict:
+    accepted = {}
+    for item in header.split(","):
+        parts = item.strip().split(";")
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+# 流式压缩器：逐块压缩，每块结束时刷新，使流式响应的数据能及时到达客户端
+class _GzipCompressor:
+    def __init__(self, level: int):
+        # wbits=31 生成带gzip头和校验的流
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        out = self._compressor.process(data)
+        return out + self._compressor.flush() if flush else out
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+# 响应压缩中间件（纯ASGI实现）
+# - 根据Accept-Encoding协商br或gzip（q值相同时优先br）
+# - 一次性发送的响应体小于minimum_size时不压缩
+# - 流式响应（StreamingResponse）逐块压缩并刷新，不缓冲整个响应体
+# - 已经设置Content-Encoding的响应（如导出接口的gzip流）原样发送
+# - 可压缩类型的响应（包括未压缩的和304）都带 Vary: Accept-Encoding
+# - 压缩后的响应ETag加编码后缀（"abc" -> "abc-br"），客户端带回时转发给应用前去掉后缀，304返回客户端缓存的那个ETag
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = None,
+        gzip_level: int = None,
+        brotli_quality: int = None
+    ):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def _negotiate(self, scope) -> Optional[str]:
+        header = None
+        for key, value in scope.get("headers", ()):
+            if key == b"accept-encoding":
+                header = value.decode("latin-1")
+                break
+        if not header:
+            return None
+
+        accepted = _parse_accept_encoding(header)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def _compressor(self, encoding: str):
+        if encoding == "br":
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._negotiate(scope)
+        # 客户端带回的按编码区分的ETag，转发给应用前去掉编码后缀，应用按原始ETag判断是否返回304
+        client_tags = ()
+        if encoding is not None:
+            scope, client_tags = _strip_if_none_match(scope, encoding)
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # 304与200携带相同形式的ETag和Vary
+                    passthrough = True
+                    await send({**message, "headers": _not_modified_headers(message["headers"], encoding, client_tags)})
+                    return
+                if not _is_compressible(message):
+                    passthrough = True
+                    await send(message)
+                    return
+                if encoding is None:
+                    # 可压缩的响应都带Vary，共享缓存不会把未压缩的响应发给可以接受压缩的客户端（反之亦然）
+                    passthrough = True
+                    await send({**message, "headers": _add_vary(list(message["headers"]))})
+                    return
+                # 暂存响应头，收到第一块响应体后再决定是否压缩
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    # 响应体太小，压缩收益抵不过开销
+                    passthrough = True
+                    await send({**start_message, "headers": _add_vary(list(start_message["headers"]))})
+                    await send(message)
+                    return
+
+                compressor = self._compressor(encoding)
+                headers = _compressed_headers(start_message["headers"], encoding)
+                if not more_body:
+                    # 一次性发送的响应体整体压缩，可以给出准确的Content-Length
+                    compressed = compressor.compress(body, flush=False) + compressor.finish()
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start_message, "headers": headers})
+
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+def _is_compressible(start_message) -> bool:
+    if start_message["status"] in (204, 304) or start_message["status"] < 200:
+        return False
+    content_type = b""
+    for key, value in start_message.get("headers", ()):
+        key = key.lower()
+        if key == b"content-encoding":
+            return False
+        if key == b"content-type":
+            content_type = value
+    content_type = content_type.decode("latin-1").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+# 压缩后的表示使用自己的强ETag：在原ETag的引号内加编码后缀，如 "abc" -> "abc-br"
+def _encoded_etag(etag: bytes, encoding: str) -> bytes:
+    if not etag.endswith(b'"'):
+        return etag
+    return etag[:-1] + b"-" + encoding.encode() + b'"'
+
+# 去掉If-None-Match中当前编码的ETag后缀，返回 (新scope, 客户端发送的ETag列表)
+def _strip_if_none_match(scope, encoding: str):
+    suffix = b"-" + encoding.encode() + b'"'
+    headers = []
+    client_tags = []
+    for key, value in scope.get("headers", ()):
+        if key == b"if-none-match":
+            tags = [tag.strip() for tag in value.split(b",")]
+            client_tags.extend(tags)
+            value = b", ".join(tag[:-len(suffix)] + b'"' if tag.endswith(suffix) else tag for tag in tags)
+        headers.append((key, value))
+    if not client_tags:
+        return scope, ()
+    return {**scope, "headers": headers}, client_tags
+
+def _add_vary(headers) -> List[Tuple[bytes, bytes]]:
+    """添加或合并 Vary: Accept-Encoding"""
+    result = []
+    vary = None
+    for key, value in headers:
+        if key.lower() == b"vary":
+            vary = value
+            continue
+        result.append((key, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+        vary = vary + b", Accept-Encoding"
+    result.append((b"vary", vary))
+    return result
+
+def _not_modified_headers(headers, encoding: Optional[str], client_tags) -> List[Tuple[bytes, bytes]]:
+    """304响应：客户端缓存的是压缩后的表示时，返回该表示的ETag（与当时200响应中的相同）"""
+    result = []
+    for key, value in headers:
+        if key.lower() == b"etag" and encoding is not None:
+            encoded = _encoded_etag(value, encoding)
+            if encoded in client_tags or b"W/" + encoded in client_tags:
+                value = encoded
+        result.append((key, value))
+    return _add_vary(result)
+
+def _compressed_headers(headers, encoding: str) -> List[Tuple[bytes, bytes]]:
+    """去掉原来的Content-Length，添加Content-Encoding和Vary；ETag加上编码后缀（每种编码的字节不同，各自使用强ETag）"""
+    result = []
+    for key, value in headers:
+        lower = key.lower()
+        if lower == b"content-length":
+            continue
+        if lower == b"etag":
+            value = _encoded_etag(value, encoding)
+        result.append((key, value))
+    result.append((b"content-encoding", encoding.encode()))
+    return _add_vary(result)
@@ -0,0 +1,87 @@
+import time
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from ..utils.metrics import (
+    registry,
+    http_requests_total,
+    http_request_duration_seconds,
+    http_request_db_queries,
+    http_request_db_duration_seconds,
+    db_n_plus_one_total
+)
+from ..utils.sql_instrumentation import QueryStats, current_query_stats, report_n_plus_one
+from ..utils.conditional import conditional_stats
+from ..services.user_service import user_cache
+
+# 请求指标中间件（纯ASGI实现）
+# 按路由模板（如 /api/medications/{medication_id}）而不是实际路径记录，避免标签数量无限增长；
+# 没有匹配到路由的请求统一记为 unmatched
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        # 当前请求的SQL统计，由数据库引擎的事件监听器累加
+        query_stats = QueryStats()
+        token = current_query_stats.set(query_stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests_total.inc(method, route, str(status_code))
+            http_request_duration_seconds.observe(time.perf_counter() - start, method, route)
+            http_request_db_queries.observe(query_stats.count, route)
+            http_request_db_duration_seconds.observe(query_stats.total_time, route)
+            if report_n_plus_one(query_stats, route):
+                db_n_plus_one_total.inc(route)
+
+# 缓存命中统计：用户缓存和ETag条件请求（304即缓存命中）
+def _cache_counts():
+    counts = {("user",): (user_cache.hits, user_cache.misses)}
+    for route, stats in conditional_stats.stats().items():
+        counts[(f"etag:{route}",)] = (stats["not_modified"], stats["requests"] - stats["not_modified"])
+    return counts
+
+registry.callback(
+    "cache_hits_total", "缓存命中次数", ("cache",),
+    lambda: {labels: hits for labels, (hits, _) in _cache_counts().items()},
+    type="counter"
+)
+registry.callback(
+    "cache_misses_total", "缓存未命中次数", ("cache",),
+    lambda: {labels: misses for labels, (_, misses) in _cache_counts().items()},
+    type="counter"
+)
+registry.callback(
+    "cache_hit_ratio", "缓存命中率", ("cache",),
+    lambda: {
+        labels: hits / (hits + misses) if hits + misses else 0.0
+        for labels, (hits, misses) in _cache_counts().items()
+    }
+)
+registry.callback(
+    "cache_entries", "缓存条目数", ("cache",),
+    lambda: {("user",): len(user_cache)}
+)
+
+# /metrics 接口，返回Prometheus文本格式
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,72 @@
+import cProfile
+
+from starlette.concurrency import run_in_threadpool
+
+from ..database import SessionLocal
+from ..services.user_service import get_cached_user, is_admin
+from ..utils.profiling import profile_store
+from .auth_middleware import validate_token
+from ..config import settings
+
+# 令牌是否属于管理员（在线程池中执行，会查询用户缓存/数据库）
+def _is_admin_token(token: str) -> bool:
+    user_id = validate_token(token)
+    if not user_id:
+        return False
+    db = SessionLocal()
+    try:
+        return is_admin(get_cached_user(db, user_id))
+    finally:
+        db.close()
+
+# 单请求剖析中间件（纯ASGI实现）
+# 管理员请求携带 PROFILE_HEADER 请求头时，用cProfile剖析这一个请求，
+# 响应头 X-Profile-Id 返回剖析ID，报告通过 /api/admin/profile/requests/{id} 查看。
+# 限制：
+# - cProfile只跟踪事件循环线程，同步（def）路由在线程池中执行的部分不在报告中，需要用采样剖析
+# - 请求等待期间事件循环执行的其他请求也会计入报告
+# - 同一时间只剖析一个请求，其余带请求头的请求正常处理、不剖析
+class RequestProfilerMiddleware:
+    def __init__(self, app, header: str = None):
+        self.app = app
+        self.header = (header or settings.PROFILE_HEADER).lower().encode("latin-1")
+        self._active = False
+
+    async def _should_profile(self, scope) -> bool:
+        if self._active:
+            return False
+        headers = dict(scope["headers"])
+        if self.header not in headers:
+            return False
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        return await run_in_threadpool(_is_admin_token, token)
+
+    async def __call__(self, scope, receive, send):
+        # 检查管理员身份期间可能已有其他请求开始剖析，所以再检查一次
+        if scope["type"] != "http" or not await self._should_profile(scope) or self._active:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = profile_store.new_id()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile_id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.disable()
+            self._active = False
+            query = scope.get("query_string", b"").decode("latin-1")
+            description = f"{scope['method']} {scope['path']}" + (f"?{query}" if query else "")
+            profile_store.add(profile_id, description, profile)
@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Tuple
+import sqlite3
+import threading
+import time
+
+# 速率限制器接口
+# 使用GCRA（通用信元速率算法）：每个键只保存一个"理论到达时间"(TAT)，
+# 每次请求的计算量为O(1)，与时间窗口内允许的请求数无关
+class RateLimiter(ABC):
+    # hit是否会阻塞（磁盘I/O、等待锁），阻塞的限流器在异步代码中需要放到线程池中调用
+    blocking = False
+
+    def __init__(self, max_requests: int, time_window: float):
+        self.max_requests = max_requests  # 时间窗口内的最大请求数
+        self.time_window = time_window  # 时间窗口（秒）
+        # 两次请求之间的平均间隔
+        self.emission_interval = time_window / max_requests
+
+    def _evaluate(self, tat: float, now: float) -> Tuple[bool, float, float]:
+        """
+        根据当前TAT判断请求是否允许
+        返回 (是否允许, 新的TAT, 需要等待的秒数)
+        """
+        new_tat = max(tat, now) + self.emission_interval
+        # 允许的突发量为整个时间窗口内的请求数
+        excess = new_tat - now - self.time_window
+        if excess > 0:
+            return False, tat, excess
+        return True, new_tat, 0.0
+
+    @abstractmethod
+    def hit(self, key: str) -> Tuple[bool, float]:
+        """记录一次请求，返回 (是否允许, 需要等待的秒数)"""
+        pass
+
+# 内存速率限制器 - 按最近使用顺序保存有限数量的键，已恢复全部额度的空闲键会被淘汰
+class MemoryRateLimiter(RateLimiter):
+    def __init__(self, max_requests: int, time_window: float, max_keys: int = 100000):
+        super().__init__(max_requests, time_window)
+        self.max_keys = max_keys
+        # {键: TAT}
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tats = self._tats
+            allowed, new_tat, retry_after = self._evaluate(tats.get(key, now), now)
+            tats[key] = new_tat
+            tats.move_to_end(key)
+            # 超出容量时淘汰最久未访问的键，但只淘汰TAT已经过去（已恢复全部额度）的键，
+            # 淘汰不会让仍被限流的客户端重新获得额度。最久未访问的键TAT还没过去时，
+            # 说明所有键都在最近一个时间窗口内访问过，此时允许暂时超出容量
+            while len(tats) > self.max_keys:
+                oldest = next(iter(tats))
+                if tats[oldest] > now:
+                    break
+                del tats[oldest]
+        return allowed, retry_after
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+# SQLite速率限制器 - 多个worker进程共享同一份限流状态
+class SQLiteRateLimiter(RateLimiter):
+    # 每处理多少次请求清理一次已恢复全部额度的键
+    PURGE_EVERY = 1000
+    blocking = True
+
+    def __init__(self, max_requests: int, time_window: float, path: str):
+        super().__init__(max_requests, time_window)
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, tat REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 手动管理事务，使用BEGIN IMMEDIATE保证读取-更新的原子性
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str) -> Tuple[bool, float]:
+        # 多个进程之间需要统一的时钟，这里使用墙上时间
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            allowed, new_tat, retry_after = self._evaluate(row[0] if row else now, now)
+            if allowed:
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)",
+                    (key, new_tat)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._hits += 1
+        if self._hits % self.PURGE_EVERY == 0:
+            self.purge(now)
+        return allowed, retry_after
+
+    def purge(self, now: float = None) -> int:
+        """删除TAT已经过去的键，这些键已恢复全部额度"""
+        now = now if now is not None else time.time()
+        cursor = self._connection().execute("DELETE FROM rate_limits WHERE tat < ?", (now,))
+        return cursor.rowcount
+
+# 根据配置创建速率限制器
+def create_rate_limiter(
+    max_requests: int,
+    time_window: float,
+    backend: str = "memory",
+    path: str = None,
+    max_keys: int = 100000
+) -> RateLimiter:
+    if backend == "memory":
+        return MemoryRateLimiter(max_requests, time_window, max_keys=max_keys)
+    if backend == "sqlite":
+        return SQLiteRateLimiter(max_requests, time_window, path)
+    raise ValueError(f"不支持的速率限制存储类型: {backend}")
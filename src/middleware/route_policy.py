@@ -0,0 +1,123 @@
+from typing import Iterable, List, Optional
+
+# 不需要认证的路由（路径模板，与路由定义中的写法一致）
+PUBLIC_ROUTES = {
+    "/",
+    "/api/",
+    "/api/health",
+    "/api/api-docs",
+    "/api/about",
+    "/api/auth/login",
+    "/api/auth/register",
+    # Prometheus抓取接口（不含用户数据，生产环境应在网络层限制访问来源）
+    "/metrics",
+}
+
+# 路由前缀树节点
+class _Node:
+    __slots__ = ("children", "param", "requires_auth", "prefix_requires_auth")
+
+    def __init__(self):
+        # 固定路径段 {路径段: 子节点}
+        self.children = {}
+        # 路径参数段（如 {medication_id}）对应的子节点
+        self.param = None
+        # 路由恰好在此结束时的认证要求
+        self.requires_auth = None
+        # 以此为前缀的所有路径的认证要求（如 {file_path:path} 或挂载的子应用）
+        self.prefix_requires_auth = None
+
+# 路由认证策略表
+# 启动时根据应用的路由构建一棵按路径段索引的前缀树，
+# 每次请求只需按路径段逐级查找，耗时与路径长度成正比，与路由数量无关
+class RoutePolicy:
+    def __init__(self, default_requires_auth: bool = True):
+        # 未知路径默认需要认证
+        self.default_requires_auth = default_requires_auth
+        self._root = _Node()
+
+    @staticmethod
+    def _split(path: str) -> List[str]:
+        return path[1:].split("/") if path.startswith("/") else path.split("/")
+
+    def add(self, template: str, requires_auth: bool, prefix: bool = False):
+        """添加路由模板的认证要求，prefix为True时对该前缀下的所有路径生效"""
+        node = self._root
+        for segment in self._split(template):
+            if segment.startswith("{") and segment.endswith("}"):
+                # 路径类型的参数可以匹配任意多层路径，相当于前缀规则
+                if segment.endswith(":path}"):
+                    prefix = True
+                    break
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = _Node()
+                node = child
+
+        if prefix:
+            node.prefix_requires_auth = requires_auth
+        else:
+            node.requires_auth = requires_auth
+
+    def requires_auth(self, path: str) -> bool:
+        """判断请求路径是否需要认证"""
+        result = self._match(self._root, self._split(path), 0, None)
+        return self.default_requires_auth if result is None else result
+
+    def _match(self, node: _Node, segments: List[str], index: int, inherited: Optional[bool]) -> Optional[bool]:
+        if node.prefix_requires_auth is not None:
+            inherited = node.prefix_requires_auth
+
+        if index == len(segments):
+            return node.requires_auth if node.requires_auth is not None else inherited
+
+        # 固定路径段优先于路径参数，与路由匹配的规则一致
+        segment = segments[index]
+        child = node.children.get(segment)
+        if child is not None:
+            result = self._match(child, segments, index + 1, inherited)
+            if result is not None:
+                return result
+
+        if node.param is not None and segment:
+            result = self._match(node.param, segments, index + 1, inherited)
+            if result is not None:
+                return result
+
+        return inherited
+
+    @classmethod
+    def from_routes(cls, routes: Iterable, public_routes: Iterable[str] = PUBLIC_ROUTES) -> "RoutePolicy":
+        """根据路由列表构建策略表，public_routes之外的路由都需要认证"""
+        public_routes = set(public_routes)
+        policy = cls()
+        for route in routes:
+            path = getattr(route, "path", None)
+            if path is None:
+                continue
+            # 挂载的子应用（Mount）按前缀处理
+            is_mount = hasattr(route, "routes") and not hasattr(route, "endpoint")
+            policy.add(path or "/", path not in public_routes, prefix=is_mount)
+        return policy
+
+    @classmethod
+    def from_public_routes(cls, public_routes: Iterable[str] = PUBLIC_ROUTES) -> "RoutePolicy":
+        """不知道应用路由时使用：public_routes公开，其他路径都需要认证"""
+        policy = cls()
+        for path in public_routes:
+            policy.add(path, False)
+        return policy
+
+    @classmethod
+    def from_app(cls, app, public_routes: Iterable[str] = PUBLIC_ROUTES) -> "RoutePolicy":
+        """根据FastAPI应用构建策略表，API文档相关路由默认公开"""
+        public_routes = set(public_routes)
+        for attr in ("openapi_url", "docs_url", "redoc_url", "swagger_ui_oauth2_redirect_url"):
+            url = getattr(app, attr, None)
+            if url:
+                public_routes.add(url)
+        return cls.from_routes(app.routes, public_routes)
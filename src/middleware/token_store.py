@@ -0,0 +1,181 @@
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 令牌存储接口
+class TokenStore(ABC):
+    # 操作是否会阻塞（磁盘I/O、等待锁），阻塞的存储在异步代码中需要放到线程池中调用
+    blocking = False
+
+    def __init__(self, eviction_interval: float = 60):
+        self._eviction_interval = eviction_interval
+        self._eviction_thread = None
+        self._eviction_lock = threading.Lock()
+
+    @abstractmethod
+    def put(self, token: str, user_id: int, expiry: float):
+        """保存令牌，expiry为过期时间戳"""
+        pass
+
+    @abstractmethod
+    def get(self, token: str) -> Optional[Tuple[int, float]]:
+        """获取未过期令牌的 (用户ID, 过期时间)，不存在或已过期时返回None"""
+        pass
+
+    @abstractmethod
+    def delete(self, token: str) -> bool:
+        """删除令牌"""
+        pass
+
+    @abstractmethod
+    def purge_expired(self, now: float = None) -> int:
+        """清理已过期的令牌，返回清理数量"""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def __contains__(self, token: str) -> bool:
+        return self.get(token) is not None
+
+    def _ensure_eviction_thread(self):
+        """首次写入时启动后台清理线程"""
+        if self._eviction_thread is not None or not self._eviction_interval:
+            return
+        with self._eviction_lock:
+            if self._eviction_thread is not None:
+                return
+            self._eviction_thread = threading.Thread(
+                target=self._eviction_loop, name="token-eviction", daemon=True
+            )
+            self._eviction_thread.start()
+
+    def _eviction_loop(self):
+        while True:
+            time.sleep(self._eviction_interval)
+            try:
+                purged = self.purge_expired()
+                if purged:
+                    logger.info(f"已清理 {purged} 个过期令牌")
+            except Exception as e:
+                logger.error(f"清理过期令牌时发生错误: {str(e)}")
+
+# 内存令牌存储 - 使用最小堆按过期时间淘汰
+class MemoryTokenStore(TokenStore):
+    def __init__(self, eviction_interval: float = 60):
+        super().__init__(eviction_interval)
+        # {令牌: (用户ID, 过期时间)}
+        self._tokens = {}
+        # (过期时间, 令牌) 最小堆，堆顶即最早过期的令牌
+        self._expiry_heap = []
+        self._lock = threading.Lock()
+
+    def put(self, token: str, user_id: int, expiry: float):
+        with self._lock:
+            self._tokens[token] = (user_id, expiry)
+            heapq.heappush(self._expiry_heap, (expiry, token))
+        self._ensure_eviction_thread()
+
+    def get(self, token: str) -> Optional[Tuple[int, float]]:
+        entry = self._tokens.get(token)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry
+
+    def delete(self, token: str) -> bool:
+        # 堆中残留的条目会在过期时被跳过
+        with self._lock:
+            return self._tokens.pop(token, None) is not None
+
+    def purge_expired(self, now: float = None) -> int:
+        now = now if now is not None else time.time()
+        purged = 0
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] < now:
+                expiry, token = heapq.heappop(heap)
+                entry = self._tokens.get(token)
+                # 令牌可能已被删除或以新的过期时间重新保存
+                if entry is not None and entry[1] == expiry:
+                    del self._tokens[token]
+                    purged += 1
+        return purged
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+# SQLite令牌存储 - 多个worker进程共享同一个数据库文件
+class SQLiteTokenStore(TokenStore):
+    blocking = True
+
+    def __init__(self, path: str, eviction_interval: float = 60):
+        super().__init__(eviction_interval)
+        self.path = path
+        # sqlite3连接不能跨线程使用，每个线程持有自己的连接
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "token TEXT PRIMARY KEY, user_id INTEGER NOT NULL, expiry REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_tokens_expiry ON tokens (expiry)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, token: str, user_id: int, expiry: float):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO tokens (token, user_id, expiry) VALUES (?, ?, ?)",
+            (token, user_id, expiry)
+        )
+        conn.commit()
+        self._ensure_eviction_thread()
+
+    def get(self, token: str) -> Optional[Tuple[int, float]]:
+        row = self._connection().execute(
+            "SELECT user_id, expiry FROM tokens WHERE token = ? AND expiry >= ?",
+            (token, time.time())
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def delete(self, token: str) -> bool:
+        conn = self._connection()
+        cursor = conn.execute("DELETE FROM tokens WHERE token = ?", (token,))
+        conn.commit()
+        return cursor.rowcount > 0
+
+    def purge_expired(self, now: float = None) -> int:
+        now = now if now is not None else time.time()
+        conn = self._connection()
+        # 过期时间上有索引，只扫描需要删除的范围
+        cursor = conn.execute("DELETE FROM tokens WHERE expiry < ?", (now,))
+        conn.commit()
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+# 根据配置创建令牌存储
+def create_token_store(backend: str = "memory", path: str = None, eviction_interval: float = 60) -> TokenStore:
+    if backend == "memory":
+        return MemoryTokenStore(eviction_interval=eviction_interval)
+    if backend == "sqlite":
+        return SQLiteTokenStore(path, eviction_interval=eviction_interval)
+    raise ValueError(f"不支持的令牌存储类型: {backend}")
@@ -2,4 +2,5 @@
 from .medication import Medication
 from .disease import Disease, MedicationRecommendation
 from .user import User
-from .reminder import Reminder
\ No newline at end of file
+from .reminder import Reminder
+from .cabinet_version import CabinetVersion
\ No newline at end of file
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from ..database import Base
+
+# 用户药物柜版本号
+# 药物柜内容每次变化（创建、更新、删除、批量导入）时加一，用于生成列表接口的ETag
+class CabinetVersion(Base):
+    __tablename__ = "cabinet_versions"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 from datetime import datetime, timedelta
@@ -20,6 +20,11 @@ class Medication(Base):
     
     user = relationship("User", back_populates="medications")
     
+    # 药物列表按 (过期日期, id) 游标分页
+    __table_args__ = (
+        Index("ix_medications_user_expiry", "user_id", "expiry_date"),
+    )
+    
     # 自动计算过期日期
     def calculate_expiry_date(self):
         if self.production_date and self.shelf_life_days:
@@ -38,5 +43,5 @@ class Medication(Base):
         if not self.expiry_date:
             return False
         days_until_expiry = (self.expiry_date - datetime.now().date()).days
-        from config import settings
+        from ..config import settings
         return 0 <= days_until_expiry <= settings.EXPIRY_REMINDER_DAYS
\ No newline at end of file
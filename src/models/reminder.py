@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 from datetime import datetime
@@ -10,8 +10,13 @@ class Reminder(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     medication_id = Column(Integer, ForeignKey("medications.id"))
     reminder_type = Column(String(20))  # "expiry", "usage"等
-    reminder_time = Column(DateTime)
+    reminder_time = Column(DateTime, index=True)
     sent = Column(Boolean, default=False)
     message = Column(String(500))
     
-    user = relationship("User", back_populates="reminders")
\ No newline at end of file
+    user = relationship("User", back_populates="reminders")
+    
+    # 用户提醒列表按 (提醒时间, id) 游标分页
+    __table_args__ = (
+        Index("ix_reminders_user_time", "user_id", "reminder_time"),
+    )
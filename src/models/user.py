@@ -7,10 +7,14 @@ class User(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True)
+    # 密码哈希（scrypt格式，见 services/password_service.py）
+    password_hash = Column(String(255), nullable=True)
     phone_number = Column(String(20), nullable=True)
     wechat_openid = Column(String(100), nullable=True)
     phone_verified = Column(Boolean, default=False)
     wechat_verified = Column(Boolean, default=False)
+    # 管理员标记，只能通过命令行授予（python -m src.services.user_service grant-admin <用户名>）
+    is_admin = Column(Boolean, default=False)
     
     # 与药物的关系
     medications = relationship("Medication", back_populates="user")
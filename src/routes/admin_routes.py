@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List
+import struct
+
+from ..models.user import User
+from ..middleware.auth_middleware import get_current_user
+from ..services.user_service import is_admin
+from ..utils.catalog import CatalogBusy
+from ..utils.catalog_file import CatalogFormatError
+from ..utils.medication_search import catalog
+from ..utils.profiling import (
+    ProfilerBusy,
+    collapsed_stacks,
+    profile_report,
+    profile_store,
+    sampling_profiler
+)
+from ..config import settings
+
+# 管理接口，只允许 users.is_admin 为真的用户访问
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限"
+        )
+    return current_user
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# 采样剖析整个进程若干秒，返回折叠栈文本（可用 flamegraph.pl 或 speedscope 生成火焰图）
+# 用法:
+#     curl -X POST -H "Authorization: Bearer <令牌>" \
+#         "http://localhost:8000/api/admin/profile/sample?seconds=10" > stacks.txt
+#     flamegraph.pl stacks.txt > flame.svg
+@router.post("/profile/sample", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = Query(5, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    include_idle: bool = False
+):
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"采样时间不能超过 {settings.PROFILER_MAX_SECONDS} 秒"
+        )
+    # 采样在线程池中进行，事件循环继续处理其他请求（这些请求正是要采样的对象）
+    try:
+        stacks = await run_in_threadpool(
+            sampling_profiler.sample, seconds, interval_ms / 1000, include_idle
+        )
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return PlainTextResponse(collapsed_stacks(stacks))
+
+# 最近的单请求剖析结果（请求头 X-Debug-Profile 触发）
+@router.get("/profile/requests", response_model=List[Dict[str, Any]])
+def list_request_profiles():
+    return profile_store.list()
+
+# 单请求剖析报告
+@router.get("/profile/requests/{profile_id}", response_class=PlainTextResponse)
+def get_request_profile(
+    profile_id: int,
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls|time)$"),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    entry = profile_store.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="剖析结果不存在或已过期")
+    description, profile = entry
+    return PlainTextResponse(f"{description}\n\n{profile_report(profile, sort, limit)}")
+
+# 当前药品目录的版本、来源和规模
+@router.get("/catalog", response_model=Dict[str, Any])
+def get_catalog_info():
+    return catalog.current.info()
+
+# 从 MEDICATION_CATALOG_PATH（或当前目录的来源文件）重新加载药品目录，不需要重启服务
+# 新目录在线程池中构建，构建期间和构建失败时继续使用旧目录；构建完成后原子替换
+# 用法（先用 python -m src.utils.catalog_file 重新编译目录文件）:
+#     curl -X POST -H "Authorization: Bearer <令牌>" http://localhost:8000/api/admin/catalog/reload
+# 注意：每个worker进程各自持有目录，多worker部署时需要对每个worker调用（或滚动重启）
+@router.post("/catalog/reload", response_model=Dict[str, Any])
+async def reload_catalog():
+    try:
+        snapshot, previous = await run_in_threadpool(catalog.reload)
+    except CatalogBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    # 文件不存在、JSON格式错误或编译后的文件损坏时继续使用旧目录
+    except (OSError, ValueError, CatalogFormatError, struct.error) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"重新加载药品目录失败: {e}")
+    return {
+        **snapshot.info(),
+        "previous_version": previous.version,
+        "previous_generation": previous.generation,
+        "changed": snapshot.version != previous.version,
+    }
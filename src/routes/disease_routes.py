@@ -1,21 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from ..database import get_db
 from ..models.disease import Disease, MedicationRecommendation
 from ..services.disease_service import (
     create_disease,
-    get_diseases,
+    get_disease_rows,
+    get_disease_page,
     get_disease,
     update_disease,
     delete_disease,
     add_medication_recommendation,
     remove_medication_recommendation
 )
+from ..utils.responses import FastJSONResponse, rows_to_dicts, paginated_response
+from ..utils.pagination import InvalidCursor
+from ..utils.projection import InvalidFields, parse_fields, trim_fields
+from ..schemas.disease import DiseaseOut, DiseaseDetailOut
 
 router = APIRouter()
 
+# 列表接口fields参数可选的字段
+DISEASE_FIELDS = list(DiseaseOut.model_fields)
+
 # 创建疾病
 @router.post("/", response_model=dict, status_code=status.HTTP_201_CREATED)
 def create_new_disease(
@@ -43,23 +51,38 @@ def create_new_disease(
     }
 
 # 获取所有疾病
-@router.get("/", response_model=List[dict])
+@router.get("/", response_model=List[DiseaseOut])
 def read_diseases(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    diseases = get_diseases(db, skip=skip, limit=limit)
-    return [
-        {
-            "id": disease.id,
-            "name": disease.name,
-            "description": disease.description
-        } for disease in diseases
-    ]
+    try:
+        selected_fields = parse_fields(fields, DISEASE_FIELDS)
+    except InvalidFields as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # 游标分页，按疾病名称排序
+    if cursor is not None:
+        try:
+            rows, next_cursor = get_disease_page(db, cursor=cursor, limit=limit, fields=selected_fields)
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        return paginated_response(trim_fields(rows_to_dicts(rows), selected_fields), next_cursor)
+    
+    rows = get_disease_rows(db, skip=skip, limit=limit, fields=selected_fields)
+    return FastJSONResponse(trim_fields(rows_to_dicts(rows), selected_fields))
 
 # 获取单个疾病
-@router.get("/{disease_id}", response_model=dict)
+@router.get("/{disease_id}", response_model=DiseaseDetailOut)
 def read_disease(
     disease_id: int,
     db: Session = Depends(get_db)
@@ -71,21 +94,8 @@ def read_disease(
             detail="Disease not found"
         )
     
-    # 获取推荐药物
-    recommendations = [
-        {
-            "medication_name": rec.medication_name,
-            "recommendation_strength": rec.recommendation_strength
-        }
-        for rec in db_disease.recommended_medications
-    ]
-    
-    return {
-        "id": db_disease.id,
-        "name": db_disease.name,
-        "description": db_disease.description,
-        "recommended_medications": recommendations
-    }
+    # 推荐药物通过关系加载，一并序列化
+    return FastJSONResponse(DiseaseDetailOut.model_validate(db_disease).model_dump())
 
 # 更新疾病
 @router.put("/{disease_id}", response_model=dict)
@@ -4,6 +4,7 @@ from .medication_routes import router as medication_router
 from .disease_routes import router as disease_router
 from .user_routes import router as user_router
 from .reminder_routes import router as reminder_router
+from .admin_routes import router as admin_router
 
 # 创建主路由器
 main_router = APIRouter()
@@ -40,6 +41,13 @@ main_router.include_router(
     responses={404: {"description": "Not found"}},
 )
 
+# 包含管理路由
+main_router.include_router(
+    admin_router,
+    prefix="/admin",
+    tags=["admin"],
+)
+
 # 添加认证相关路由
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
@@ -47,7 +55,15 @@ from sqlalchemy.orm import Session
 from typing import Dict
 
 from ..database import get_db
-from ..services.user_service import authenticate_user, get_user_by_username, create_user as create_user_service
+from starlette.concurrency import run_in_threadpool
+
+from ..services.user_service import (
+    authenticate_user_async,
+    get_user_by_username,
+    create_user_async,
+    is_reserved_username
+)
+from ..services.password_service import PasswordHasherBusy
 from ..middleware.auth_middleware import generate_token
 
 # 认证路由器
@@ -57,9 +73,18 @@ auth_router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# 密码哈希服务繁忙时返回503
+def _password_service_unavailable(e: PasswordHasherBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"},
+    )
+
 # 登录接口
+# 密码校验在进程池中进行，路由使用async def，等待期间不占用请求线程池
 @auth_router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ) -> Dict[str, str]:
@@ -68,7 +93,11 @@ def login(
     - **username**: 用户名
     - **password**: 密码
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user_async(db, form_data.username, form_data.password)
+    except PasswordHasherBusy as e:
+        raise _password_service_unavailable(e)
+    
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -83,7 +112,7 @@ def login(
 
 # 注册接口
 @auth_router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
     username: str,
     password: str,
     phone_number: str = None,
@@ -95,8 +124,13 @@ def register(
     - **password**: 密码
     - **phone_number**: 手机号码（可选）
     """
-    # 检查用户名是否已存在
-    existing_user = get_user_by_username(db, username)
+    # 检查用户名是否为保留用户名或已存在
+    if is_reserved_username(username):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户名为保留用户名"
+        )
+    existing_user = await run_in_threadpool(get_user_by_username, db, username)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -104,12 +138,15 @@ def register(
         )
     
     # 创建新用户
-    user = create_user_service(
-        db=db,
-        username=username,
-        password=password,
-        phone_number=phone_number
-    )
+    try:
+        user = await create_user_async(
+            db=db,
+            username=username,
+            password=password,
+            phone_number=phone_number
+        )
+    except PasswordHasherBusy as e:
+        raise _password_service_unavailable(e)
     
     return {"message": "用户注册成功"}
 
@@ -1,28 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, date
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models.medication import Medication
 from ..services.medication_service import (
-    create_medication,
-    get_medications,
-    get_medication,
-    update_medication,
-    delete_medication,
-    search_medication_info,
-    get_medications_by_disease
+    create_medication_async,
+    get_medication_rows_async,
+    get_medication_page_async,
+    get_medication_async,
+    get_cabinet_version_async,
+    update_medication_async,
+    delete_medication_async,
+    get_medications_by_disease_async
 )
-from ..utils.medication_search import search_medication_details
+from ..utils.medication_search import search_medication_details, get_catalog_version
+from ..utils.conditional import make_etag, check_not_modified
+from ..utils.responses import FastJSONResponse, paginated_response, streaming_download_response
+from ..services.export_service import export_medications, EXPORT_FORMATS
+from ..services.import_service import (
+    ImportTooLarge,
+    collect_records,
+    import_medications,
+    iter_csv_records,
+    iter_json_array_records,
+    iter_ndjson_records,
+    limit_body
+)
+from ..utils.pagination import InvalidCursor
+from ..utils.projection import InvalidFields, parse_fields
+from ..config import settings
+from ..schemas.medication import MedicationOut, serialize_medication_rows
 
 router = APIRouter()
 
+# 列表接口fields参数可选的字段
+MEDICATION_FIELDS = list(MedicationOut.model_fields)
+
+# 客户端可以缓存，但每次使用前必须用ETag向服务端确认
+CACHE_CONTROL = "private, no-cache"
+
+# 药物柜的ETag：药物柜版本号变化或跨天（过期状态随日期变化）时失效
+async def _cabinet_etag(db: AsyncSession, user_id: int, *parts) -> str:
+    version = await get_cabinet_version_async(db, user_id)
+    return make_etag("cabinet", user_id, version, date.today(), *parts)
+
 # 创建药物
 @router.post("/", response_model=dict, status_code=status.HTTP_201_CREATED)
-def create_new_medication(
+async def create_new_medication(
     medication_data: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = 1  # 这里简化处理，实际应该从认证中获取用户ID
 ):
     # 检查必填字段
@@ -54,7 +82,7 @@ def create_new_medication(
         })
     
     # 创建药物
-    medication = create_medication(
+    medication = await create_medication_async(
         db=db,
         name=medication_data["name"],
         production_date=production_date,
@@ -75,65 +103,145 @@ def create_new_medication(
     }
 
 # 获取所有药物
-@router.get("/", response_model=List[dict])
-def read_medications(
+@router.get("/", response_model=List[MedicationOut])
+async def read_medications(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = 1  # 简化处理
 ):
-    medications = get_medications(db, skip=skip, limit=limit, user_id=user_id)
-    return [
-        {
-            "id": med.id,
-            "name": med.name,
-            "production_date": med.production_date.isoformat() if med.production_date else None,
-            "shelf_life_days": med.shelf_life_days,
-            "expiry_date": med.expiry_date.isoformat() if med.expiry_date else None,
-            "功效": med.功效,
-            "usage": med.usage,
-            "image_url": med.image_url,
-            "quantity": med.quantity,
-            "unit": med.unit,
-            "is_expired": med.is_expired,
-            "is_near_expiry": med.is_near_expiry
-        } for med in medications
-    ]
+    # fields=name,expiry_date 只查询和返回指定字段
+    try:
+        selected_fields = parse_fields(fields, MEDICATION_FIELDS)
+    except InvalidFields as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # 药物柜未变化时直接返回304，不执行列表查询
+    etag = await _cabinet_etag(db, user_id, sorted(request.query_params.multi_items()))
+    not_modified = check_not_modified(request.headers.get("if-none-match"), etag, "medications.list")
+    if not_modified is not None:
+        return not_modified
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    
+    # 传入cursor参数时使用游标分页（第一页传空字符串），下一页游标通过 X-Next-Cursor 响应头返回
+    if cursor is not None:
+        try:
+            rows, next_cursor = await get_medication_page_async(
+                db, cursor=cursor, limit=limit, user_id=user_id, fields=selected_fields
+            )
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        return paginated_response(
+            serialize_medication_rows(rows, selected_fields), next_cursor, headers=headers
+        )
+    
+    # 直接由查询结果的元组序列化，不构造ORM实例，也不经过响应模型的二次校验
+    rows = await get_medication_rows_async(db, skip=skip, limit=limit, user_id=user_id, fields=selected_fields)
+    return FastJSONResponse(serialize_medication_rows(rows, selected_fields), headers=headers)
+
+# 导出药物柜（NDJSON或CSV流式下载）
+@router.get("/export")
+def export_user_medications(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    user_id: int = 1  # 简化处理
+):
+    chunks = export_medications(user_id, export_format=export_format, gzip=gzip)
+    return streaming_download_response(
+        chunks,
+        EXPORT_FORMATS[export_format],
+        f"medications.{export_format}",
+        gzip=gzip
+    )
+
+# 批量导入时按Content-Type选择解析器
+IMPORT_PARSERS = {
+    "text/csv": iter_csv_records,
+    "application/x-ndjson": iter_ndjson_records,
+    "application/json": iter_json_array_records,
+}
+
+# 批量导入药物（CSV、NDJSON或JSON数组）
+@router.post("/import", response_model=dict)
+async def import_user_medications(
+    request: Request,
+    atomic: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = 1  # 简化处理
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    parser = IMPORT_PARSERS.get(content_type)
+    if parser is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Content-Type must be text/csv, application/x-ndjson or application/json"
+        )
+    
+    # 声明的请求体长度超过上限时直接拒绝
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.IMPORT_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"请求体不能超过 {settings.IMPORT_MAX_BYTES} 字节"
+        )
+    
+    # 边接收边解析请求体，接收的字节数和解析出的行数都有上限
+    try:
+        records = await collect_records(parser(limit_body(request.stream())))
+    except ImportTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request body: {e}"
+        )
+    
+    # 批量插入沿用同步实现，在异步会话的连接上执行
+    result = await db.run_sync(lambda session: import_medications(session, records, user_id, atomic))
+    return FastJSONResponse(result)
 
 # 获取单个药物
-@router.get("/{medication_id}", response_model=dict)
-def read_medication(
+@router.get("/{medication_id}", response_model=MedicationOut)
+async def read_medication(
     medication_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = 1  # 简化处理
 ):
-    db_medication = get_medication(db, medication_id=medication_id, user_id=user_id)
+    etag = await _cabinet_etag(db, user_id, medication_id)
+    not_modified = check_not_modified(request.headers.get("if-none-match"), etag, "medications.detail")
+    if not_modified is not None:
+        return not_modified
+    
+    db_medication = await get_medication_async(db, medication_id=medication_id, user_id=user_id)
     if db_medication is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Medication not found"
         )
-    return {
-        "id": db_medication.id,
-        "name": db_medication.name,
-        "production_date": db_medication.production_date.isoformat() if db_medication.production_date else None,
-        "shelf_life_days": db_medication.shelf_life_days,
-        "expiry_date": db_medication.expiry_date.isoformat() if db_medication.expiry_date else None,
-        "功效": db_medication.功效,
-        "usage": db_medication.usage,
-        "image_url": db_medication.image_url,
-        "quantity": db_medication.quantity,
-        "unit": db_medication.unit,
-        "is_expired": db_medication.is_expired,
-        "is_near_expiry": db_medication.is_near_expiry
-    }
+    return FastJSONResponse(
+        MedicationOut.model_validate(db_medication).model_dump(),
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
 
 # 更新药物
 @router.put("/{medication_id}", response_model=dict)
-def update_existing_medication(
+async def update_existing_medication(
     medication_id: int,
     medication_data: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = 1  # 简化处理
 ):
     # 解析日期
@@ -147,8 +255,8 @@ def update_existing_medication(
                 detail="Invalid production_date format. Use YYYY-MM-DD."
             )
     
-    db_medication = update_medication(db, medication_id=medication_id, 
-                                     user_id=user_id, **medication_data)
+    db_medication = await update_medication_async(db, medication_id=medication_id,
+                                                  user_id=user_id, **medication_data)
     if db_medication is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -163,12 +271,12 @@ def update_existing_medication(
 
 # 删除药物
 @router.delete("/{medication_id}", response_model=dict)
-def delete_existing_medication(
+async def delete_existing_medication(
     medication_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = 1  # 简化处理
 ):
-    success = delete_medication(db, medication_id=medication_id, user_id=user_id)
+    success = await delete_medication_async(db, medication_id=medication_id, user_id=user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -178,21 +286,27 @@ def delete_existing_medication(
 
 # 搜索药物信息
 @router.get("/search/{medication_name}", response_model=dict)
-def search_medication(medication_name: str):
+def search_medication(medication_name: str, request: Request):
+    # 药品目录版本未变化时直接返回304
+    etag = make_etag("catalog", get_catalog_version(), medication_name)
+    not_modified = check_not_modified(request.headers.get("if-none-match"), etag, "medications.search")
+    if not_modified is not None:
+        return not_modified
+    
     result = search_medication_details(medication_name)
     if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No information found for medication: {medication_name}"
         )
-    return result
+    return FastJSONResponse(result, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
 
 # 根据疾病获取药物推荐
 @router.get("/disease/{disease_name}", response_model=dict)
-def get_medications_for_disease(
+async def get_medications_for_disease(
     disease_name: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = 1  # 简化处理
 ):
-    result = get_medications_by_disease(db, disease_name, user_id)
+    result = await get_medications_by_disease_async(db, disease_name, user_id)
     return result
\ No newline at end of file
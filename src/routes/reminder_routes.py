@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from ..database import get_db
-from ..models.reminder import Reminder
-from ..services.reminder_service import create_reminder, get_reminders, get_reminder, update_reminder, delete_reminder
+from ..database import get_async_db
+from ..services.reminder_service import (
+    create_reminder_async,
+    get_reminder_async,
+    update_reminder_async,
+    delete_reminder_async,
+    get_user_reminder_rows_async,
+    get_user_reminder_page_async
+)
+from ..services.medication_service import get_medication_async
+from ..utils.responses import FastJSONResponse, rows_to_dicts, paginated_response, streaming_download_response
+from ..services.export_service import export_reminders, EXPORT_FORMATS
+from ..utils.pagination import InvalidCursor
+from ..utils.projection import InvalidFields, parse_fields, trim_fields
+from ..schemas.reminder import ReminderOut
+from ..utils.message_templates import template_registry
+from ..config import settings
 
 router = APIRouter()
 
+# 列表接口fields参数可选的字段
+REMINDER_FIELDS = list(ReminderOut.model_fields)
+
 # 创建提醒
 @router.post("/", response_model=dict, status_code=status.HTTP_201_CREATED)
-def create_new_reminder(
+async def create_new_reminder(
     reminder_data: dict,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # 检查必填字段
     required_fields = ["user_id", "medication_id", "reminder_type", "reminder_time"]
@@ -33,16 +50,10 @@ def create_new_reminder(
             detail="Invalid reminder_time format. Use ISO format."
         )
     
-    # 创建提醒
-    # 这里调用服务层的方法，但为了简化，我们直接在路由层实现基本逻辑
-    # 实际应用中应该调用reminder_service的方法
-    from models.medication import Medication
-    
     # 检查药物是否存在
-    medication = db.query(Medication).filter(
-        Medication.id == reminder_data["medication_id"],
-        Medication.user_id == reminder_data["user_id"]
-    ).first()
+    medication = await get_medication_async(
+        db, medication_id=reminder_data["medication_id"], user_id=reminder_data["user_id"]
+    )
     
     if not medication:
         raise HTTPException(
@@ -53,12 +64,17 @@ def create_new_reminder(
     # 创建提醒消息
     if reminder_data["reminder_type"] == "expiry":
         days_until_expiry = (medication.expiry_date - datetime.now().date()).days
-        message = f"您的药物 '{medication.name}' 将在 {days_until_expiry} 天后过期，请及时处理。"
+        message = template_registry.get("expiry_reminder", settings.MESSAGE_LOCALE).render(
+            (medication.name, days_until_expiry)
+        )
     else:
-        message = reminder_data.get("message", "您有一个药物提醒")
+        message = reminder_data.get("message")
+        if message is None:
+            message = template_registry.get("default_reminder", settings.MESSAGE_LOCALE).render(())
     
     # 创建提醒记录
-    reminder = Reminder(
+    reminder = await create_reminder_async(
+        db,
         user_id=reminder_data["user_id"],
         medication_id=reminder_data["medication_id"],
         reminder_type=reminder_data["reminder_type"],
@@ -67,10 +83,6 @@ def create_new_reminder(
         sent=reminder_data.get("sent", False)
     )
     
-    db.add(reminder)
-    db.commit()
-    db.refresh(reminder)
-    
     return {
         "id": reminder.id,
         "user_id": reminder.user_id,
@@ -79,85 +91,95 @@ def create_new_reminder(
     }
 
 # 获取用户的所有提醒
-@router.get("/user/{user_id}", response_model=List[dict])
-def read_user_reminders(
+@router.get("/user/{user_id}", response_model=List[ReminderOut])
+async def read_user_reminders(
     user_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    reminders = db.query(Reminder).filter(
-        Reminder.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    try:
+        selected_fields = parse_fields(fields, REMINDER_FIELDS)
+    except InvalidFields as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    return [
-        {
-            "id": reminder.id,
-            "user_id": reminder.user_id,
-            "medication_id": reminder.medication_id,
-            "reminder_type": reminder.reminder_type,
-            "reminder_time": reminder.reminder_time.isoformat() if reminder.reminder_time else None,
-            "sent": reminder.sent,
-            "message": reminder.message
-        } for reminder in reminders
-    ]
+    # 游标分页，按提醒时间排序
+    if cursor is not None:
+        try:
+            rows, next_cursor = await get_user_reminder_page_async(db, user_id=user_id, cursor=cursor, limit=limit, fields=selected_fields)
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        return paginated_response(trim_fields(rows_to_dicts(rows), selected_fields), next_cursor)
+    
+    rows = await get_user_reminder_rows_async(db, user_id=user_id, skip=skip, limit=limit, fields=selected_fields)
+    return FastJSONResponse(trim_fields(rows_to_dicts(rows), selected_fields))
+
+# 导出用户的提醒历史（NDJSON或CSV流式下载）
+@router.get("/user/{user_id}/export")
+def export_user_reminders(
+    user_id: int,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = False
+):
+    chunks = export_reminders(user_id, export_format=export_format, gzip=gzip)
+    return streaming_download_response(
+        chunks,
+        EXPORT_FORMATS[export_format],
+        f"reminders.{export_format}",
+        gzip=gzip
+    )
 
 # 获取单个提醒
-@router.get("/{reminder_id}", response_model=dict)
-def read_reminder(
+@router.get("/{reminder_id}", response_model=ReminderOut)
+async def read_reminder(
     reminder_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_reminder = db.query(Reminder).filter(Reminder.id == reminder_id).first()
+    db_reminder = await get_reminder_async(db, reminder_id)
     if db_reminder is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Reminder not found"
         )
     
-    return {
-        "id": db_reminder.id,
-        "user_id": db_reminder.user_id,
-        "medication_id": db_reminder.medication_id,
-        "reminder_type": db_reminder.reminder_type,
-        "reminder_time": db_reminder.reminder_time.isoformat() if db_reminder.reminder_time else None,
-        "sent": db_reminder.sent,
-        "message": db_reminder.message
-    }
+    return FastJSONResponse(ReminderOut.model_validate(db_reminder).model_dump())
 
 # 更新提醒
 @router.put("/{reminder_id}", response_model=dict)
-def update_existing_reminder(
+async def update_existing_reminder(
     reminder_id: int,
     reminder_data: dict,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # 检查提醒是否存在
-    db_reminder = db.query(Reminder).filter(Reminder.id == reminder_id).first()
-    if db_reminder is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Reminder not found"
-        )
-    
     # 更新字段
-    if "reminder_type" in reminder_data:
-        db_reminder.reminder_type = reminder_data["reminder_type"]
+    updates = {
+        key: reminder_data[key]
+        for key in ("reminder_type", "sent", "message")
+        if key in reminder_data
+    }
     if "reminder_time" in reminder_data:
         try:
-            db_reminder.reminder_time = datetime.fromisoformat(reminder_data["reminder_time"])
+            updates["reminder_time"] = datetime.fromisoformat(reminder_data["reminder_time"])
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid reminder_time format. Use ISO format."
             )
-    if "sent" in reminder_data:
-        db_reminder.sent = reminder_data["sent"]
-    if "message" in reminder_data:
-        db_reminder.message = reminder_data["message"]
     
-    db.commit()
-    db.refresh(db_reminder)
+    db_reminder = await update_reminder_async(db, reminder_id, **updates)
+    if db_reminder is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reminder not found"
+        )
     
     return {
         "id": db_reminder.id,
@@ -166,18 +188,14 @@ def update_existing_reminder(
 
 # 删除提醒
 @router.delete("/{reminder_id}", response_model=dict)
-def delete_existing_reminder(
+async def delete_existing_reminder(
     reminder_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_reminder = db.query(Reminder).filter(Reminder.id == reminder_id).first()
-    if db_reminder is None:
+    if not await delete_reminder_async(db, reminder_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Reminder not found"
         )
     
-    db.delete(db_reminder)
-    db.commit()
-    
     return {"message": "Reminder deleted successfully"}
\ No newline at end of file
@@ -1,22 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from ..database import get_db
 from ..models.user import User
 from ..services.user_service import (
     create_user,
-    get_users,
+    get_user_rows,
+    get_user_page,
     get_user,
     update_user,
     delete_user,
     bind_phone_number,
     verify_phone_number,
-    bind_wechat_account
+    bind_wechat_account,
+    get_user_by_username,
+    is_admin,
+    USER_EDITABLE_FIELDS
 )
+from ..middleware.auth_middleware import get_current_user
+from ..utils.responses import FastJSONResponse, rows_to_dicts, paginated_response
+from ..utils.pagination import InvalidCursor
+from ..utils.projection import InvalidFields, parse_fields, trim_fields
+from ..schemas.user import UserOut
 
 router = APIRouter()
 
+# 列表接口fields参数可选的字段
+USER_FIELDS = list(UserOut.model_fields)
+
 # 创建用户
 @router.post("/", response_model=dict, status_code=status.HTTP_201_CREATED)
 def create_new_user(
@@ -43,26 +55,38 @@ def create_new_user(
     }
 
 # 获取所有用户
-@router.get("/", response_model=List[dict])
+@router.get("/", response_model=List[UserOut])
 def read_users(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    users = get_users(db, skip=skip, limit=limit)
-    return [
-        {
-            "id": user.id,
-            "username": user.username,
-            "phone_number": user.phone_number,
-            "wechat_openid": user.wechat_openid,
-            "phone_verified": user.phone_verified,
-            "wechat_verified": user.wechat_verified
-        } for user in users
-    ]
+    try:
+        selected_fields = parse_fields(fields, USER_FIELDS)
+    except InvalidFields as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # 游标分页，按用户名排序
+    if cursor is not None:
+        try:
+            rows, next_cursor = get_user_page(db, cursor=cursor, limit=limit, fields=selected_fields)
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        return paginated_response(trim_fields(rows_to_dicts(rows), selected_fields), next_cursor)
+    
+    rows = get_user_rows(db, skip=skip, limit=limit, fields=selected_fields)
+    return FastJSONResponse(trim_fields(rows_to_dicts(rows), selected_fields))
 
 # 获取单个用户
-@router.get("/{user_id}", response_model=dict)
+@router.get("/{user_id}", response_model=UserOut)
 def read_user(
     user_id: int,
     db: Session = Depends(get_db)
@@ -74,23 +98,46 @@ def read_user(
             detail="User not found"
         )
     
-    return {
-        "id": db_user.id,
-        "username": db_user.username,
-        "phone_number": db_user.phone_number,
-        "wechat_openid": db_user.wechat_openid,
-        "phone_verified": db_user.phone_verified,
-        "wechat_verified": db_user.wechat_verified
-    }
+    return FastJSONResponse(UserOut.model_validate(db_user).model_dump())
 
 # 更新用户
 @router.put("/{user_id}", response_model=dict)
 def update_existing_user(
     user_id: int,
     user_data: dict,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_user = update_user(db, user_id=user_id, **user_data)
+    # 只能修改自己的信息（管理员除外）
+    if current_user.id != user_id and not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to update this user"
+        )
+    
+    # 只允许修改 USER_EDITABLE_FIELDS 中的字段
+    unknown = sorted(set(user_data) - set(USER_EDITABLE_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Fields not editable: {', '.join(unknown)}"
+        )
+    
+    if "username" in user_data:
+        existing_user = get_user_by_username(db, user_data["username"])
+        if existing_user and existing_user.id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username already exists"
+            )
+    
+    try:
+        db_user = update_user(db, user_id=user_id, **user_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
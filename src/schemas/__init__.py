@@ -0,0 +1,5 @@
+# 响应模型包初始化文件
+from .medication import MedicationOut, serialize_medication_rows
+from .disease import DiseaseOut, DiseaseDetailOut, RecommendationOut
+from .user import UserOut
+from .reminder import ReminderOut
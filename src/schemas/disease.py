@@ -0,0 +1,21 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
+
+# 疾病响应模型
+class DiseaseOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+# 疾病推荐药物响应模型
+class RecommendationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    medication_name: Optional[str] = None
+    recommendation_strength: Optional[int] = None
+
+# 疾病详情响应模型
+class DiseaseDetailOut(DiseaseOut):
+    recommended_medications: List[RecommendationOut] = []
@@ -0,0 +1,47 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, List, Dict, Any
+from datetime import date
+
+from ..config import settings
+from ..utils.projection import trim_fields
+
+# 药物响应模型
+class MedicationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str] = None
+    production_date: Optional[date] = None
+    shelf_life_days: Optional[int] = None
+    expiry_date: Optional[date] = None
+    功效: Optional[str] = None
+    usage: Optional[str] = None
+    image_url: Optional[str] = None
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+    is_expired: bool = False
+    is_near_expiry: bool = False
+
+# 将药物查询结果的元组序列化为字典列表，字段与MedicationOut一致
+# fields不为None时只返回请求的字段（查询结果中可能包含额外的排序或计算所需的列）
+def serialize_medication_rows(rows, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    if not rows:
+        return []
+    
+    keys = rows[0]._fields
+    items = [dict(zip(keys, row)) for row in rows]
+    
+    if fields is None or "is_expired" in fields or "is_near_expiry" in fields:
+        today = date.today()
+        reminder_days = settings.EXPIRY_REMINDER_DAYS
+        for item in items:
+            expiry_date = item.get("expiry_date")
+            if expiry_date:
+                days_until_expiry = (expiry_date - today).days
+                item["is_expired"] = days_until_expiry < 0
+                item["is_near_expiry"] = 0 <= days_until_expiry <= reminder_days
+            else:
+                item["is_expired"] = False
+                item["is_near_expiry"] = False
+    
+    return trim_fields(items, fields)
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+from datetime import datetime
+
+# 提醒响应模型
+class ReminderOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: Optional[int] = None
+    medication_id: Optional[int] = None
+    reminder_type: Optional[str] = None
+    reminder_time: Optional[datetime] = None
+    sent: Optional[bool] = None
+    message: Optional[str] = None
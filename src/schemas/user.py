@@ -0,0 +1,13 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+
+# 用户响应模型
+class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: Optional[str] = None
+    phone_number: Optional[str] = None
+    wechat_openid: Optional[str] = None
+    phone_verified: Optional[bool] = None
+    wechat_verified: Optional[bool] = None
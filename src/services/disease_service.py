@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from sqlalchemy.engine import Row
+from typing import List, Optional, Dict, Any, Tuple
 
 from ..models.disease import Disease, MedicationRecommendation
+from ..utils.pagination import paginate_keyset
+from ..utils.projection import project_columns
 
 # 创建疾病
 def create_disease(
@@ -28,6 +31,33 @@ def get_diseases(
 ) -> List[Disease]:
     return db.query(Disease).offset(skip).limit(limit).all()
 
+# 疾病列表接口查询的字段
+DISEASE_LIST_COLUMNS = (
+    Disease.id,
+    Disease.name,
+    Disease.description,
+)
+
+# 获取疾病列表（返回元组，不构造ORM实例）
+def get_disease_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[List[str]] = None
+) -> List[Row]:
+    columns = project_columns(DISEASE_LIST_COLUMNS, fields)
+    return db.query(*columns).offset(skip).limit(limit).all()
+
+# 按游标获取一页疾病（按名称排序），返回 (本页数据, 下一页游标)
+def get_disease_page(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[Row], Optional[str]]:
+    query = db.query(*project_columns(DISEASE_LIST_COLUMNS, fields, required=("id", "name")))
+    return paginate_keyset(query, Disease.name, Disease.id, cursor, limit)
+
 # 获取单个疾病
 def get_disease(
     db: Session,
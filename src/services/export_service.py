@@ -0,0 +1,129 @@
+from sqlalchemy.orm import Session
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+from itertools import islice
+import csv
+import io
+import zlib
+
+from ..database import SessionLocal
+from ..models.medication import Medication
+from ..models.reminder import Reminder
+from ..schemas.medication import MedicationOut, serialize_medication_rows
+from ..schemas.reminder import ReminderOut
+from ..utils.responses import dumps_json, rows_to_dicts
+from .medication_service import MEDICATION_LIST_COLUMNS
+from .reminder_service import REMINDER_LIST_COLUMNS
+from ..config import settings
+
+# 流式导出
+# 使用服务端游标（yield_per）分批读取，每批序列化后立即发送，
+# 内存占用只与批大小有关，与导出的总行数无关
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+MEDICATION_EXPORT_FIELDS = list(MedicationOut.model_fields)
+REMINDER_EXPORT_FIELDS = list(ReminderOut.model_fields)
+
+def _batched(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+# 将字典批次编码为NDJSON，每批输出一个数据块
+def encode_ndjson(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(dumps_json(item) + b"\n" for item in batch)
+
+# 将字典批次编码为CSV，每批输出一个数据块
+# 第一块带UTF-8 BOM，使Excel能正确识别中文
+def encode_csv(batches: Iterable[List[dict]], fields: Sequence[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+# gzip流式压缩，每个输入块压缩后立即输出
+def gzip_stream(chunks: Iterable[bytes], level: int = None) -> Iterator[bytes]:
+    level = settings.EXPORT_GZIP_LEVEL if level is None else level
+    # wbits=31 生成带gzip头和校验的流
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _export(
+    build_query: Callable[[Session], object],
+    serialize: Callable[[list], List[dict]],
+    fields: Sequence[str],
+    export_format: str,
+    gzip: bool,
+    batch_size: Optional[int],
+    session_factory: Callable[[], Session]
+) -> Iterator[bytes]:
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {export_format}")
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+
+    def generate() -> Iterator[bytes]:
+        # 流式响应在路由函数返回之后才开始发送，因此在生成器内部使用独立的会话，
+        # 发送结束（或客户端断开连接）时关闭
+        db = session_factory()
+        try:
+            rows = build_query(db).yield_per(batch_size)
+            batches = (serialize(batch) for batch in _batched(rows, batch_size))
+            if export_format == "csv":
+                yield from encode_csv(batches, fields)
+            else:
+                yield from encode_ndjson(batches)
+        finally:
+            db.close()
+
+    return gzip_stream(generate()) if gzip else generate()
+
+# 导出用户的药物
+def export_medications(
+    user_id: int,
+    export_format: str = "ndjson",
+    gzip: bool = False,
+    batch_size: int = None,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Iterator[bytes]:
+    return _export(
+        lambda db: db.query(*MEDICATION_LIST_COLUMNS).filter(
+            Medication.user_id == user_id
+        ).order_by(Medication.id),
+        serialize_medication_rows,
+        MEDICATION_EXPORT_FIELDS,
+        export_format, gzip, batch_size, session_factory
+    )
+
+# 导出用户的提醒历史
+def export_reminders(
+    user_id: int,
+    export_format: str = "ndjson",
+    gzip: bool = False,
+    batch_size: int = None,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Iterator[bytes]:
+    return _export(
+        lambda db: db.query(*REMINDER_LIST_COLUMNS).filter(
+            Reminder.user_id == user_id
+        ).order_by(Reminder.reminder_time, Reminder.id),
+        rows_to_dicts,
+        REMINDER_EXPORT_FIELDS,
+        export_format, gzip, batch_size, session_factory
+    )
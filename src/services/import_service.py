@@ -0,0 +1,296 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime
+import codecs
+import csv
+import json
+
+from ..models.medication import Medication
+from ..utils.medication_search import batch_search_medication_details
+from .medication_service import bump_cabinet_version
+from ..config import settings
+
+# 批量导入药物
+# 流程：流式解析CSV/NDJSON -> 逐行校验 -> 整批计算过期日期 -> 一次批量查询药品目录 -> 单个事务批量插入
+# 校验失败的行不会中断导入，按行号返回错误信息
+
+# 导入行数或请求体字节数超过上限时抛出，路由层转换为413响应
+class ImportTooLarge(Exception):
+    pass
+
+# CSV表头别名（小票/药房导出的中文表头）
+CSV_HEADER_ALIASES = {
+    "名称": "name",
+    "药品名称": "name",
+    "药名": "name",
+    "生产日期": "production_date",
+    "保质期": "shelf_life_days",
+    "保质期(天)": "shelf_life_days",
+    "保质期（天）": "shelf_life_days",
+    "数量": "quantity",
+    "单位": "unit",
+}
+
+# date.fromordinal 能表示的最大序数
+_MAX_ORDINAL = date.max.toordinal()
+
+# 限制请求体字节数：边接收边计数，超过上限时抛出ImportTooLarge（不缓冲整个请求体）
+async def limit_body(chunks: AsyncIterable[bytes], max_bytes: int = None) -> AsyncIterator[bytes]:
+    max_bytes = max_bytes or settings.IMPORT_MAX_BYTES
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise ImportTooLarge(f"请求体不能超过 {max_bytes} 字节")
+        yield chunk
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """按行切分流式请求体，行尾保留换行符（csv模块需要据此处理引号内的换行）"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        # 最后一段可能是不完整的行，留到下一块
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+# 流式解析CSV请求体，逐行返回记录
+async def iter_csv_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    buffered: List[str] = []
+    header: Optional[List[str]] = None
+
+    async for line in _iter_lines(chunks):
+        buffered.append(line)
+        # 引号内包含换行时，一条记录跨越多行，等引号闭合后再解析
+        text = "".join(buffered)
+        if text.count('"') % 2:
+            continue
+        buffered.clear()
+
+        fields = next(csv.reader([text]), [])
+        if not any(field.strip() for field in fields):
+            continue
+        if header is None:
+            header = [CSV_HEADER_ALIASES.get(name.strip(), name.strip()) for name in fields]
+            continue
+        yield dict(zip(header, fields))
+
+    if buffered:
+        fields = next(csv.reader(["".join(buffered)]), [])
+        if header is not None and any(field.strip() for field in fields):
+            yield dict(zip(header, fields))
+
+# 流式解析NDJSON请求体，每行一个JSON对象；无法解析的行原样返回，由校验步骤报告错误
+async def iter_ndjson_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    async for line in _iter_lines(chunks):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+_JSON_WHITESPACE = " \t\r\n"
+_JSON_VALUE_END = _JSON_WHITESPACE + ",]"
+_decode_json_value = json.JSONDecoder().raw_decode
+
+def _parse_json_array_items(buffer: str, state: str, final: bool) -> Tuple[List[Any], str, str]:
+    """
+    从缓冲区中解析出尽可能多的数组元素，返回 (元素列表, 未解析的剩余部分, 新状态)
+    状态: start 等待"["，first 等待第一个元素或"]"，item 等待元素，separator 等待","或"]"，end 数组已结束
+    """
+    items = []
+    position = 0
+    length = len(buffer)
+    while True:
+        while position < length and buffer[position] in _JSON_WHITESPACE:
+            position += 1
+        if position == length:
+            break
+        char = buffer[position]
+        if state == "end":
+            raise ValueError("JSON数组之后有多余内容")
+        if state == "start":
+            if char != "[":
+                raise ValueError("请求体必须是JSON数组")
+            position += 1
+            state = "first"
+        elif state == "separator" or (state == "first" and char == "]"):
+            if char == "]":
+                state = "end"
+            elif char != ",":
+                raise ValueError("JSON数组元素之间应为 ','")
+            else:
+                state = "item"
+            position += 1
+        else:
+            try:
+                value, end = _decode_json_value(buffer, position)
+            except json.JSONDecodeError:
+                # 元素不完整，等待下一块数据
+                if final:
+                    raise
+                break
+            # 数字可能在下一块中继续（如 "1." 之后是 "5"），元素后面出现分隔符时才能确定已完整
+            if not final and (end == length or buffer[end] not in _JSON_VALUE_END):
+                break
+            items.append(value)
+            position = end
+            state = "separator"
+    return items, buffer[position:], state
+
+# 流式解析JSON数组请求体，每解析出一个元素就返回（不需要等待整个请求体）
+async def iter_json_array_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    state = "start"
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        items, buffer, state = _parse_json_array_items(buffer, state, final=False)
+        for item in items:
+            yield item
+    buffer += decoder.decode(b"", final=True)
+    items, buffer, state = _parse_json_array_items(buffer, state, final=True)
+    for item in items:
+        yield item
+    # 空请求体视为空数组
+    if state not in ("start", "end"):
+        raise ValueError("JSON数组不完整")
+
+# 收集记录，超过行数上限时抛出ImportTooLarge
+async def collect_records(records: AsyncIterable[Any], max_rows: int = None) -> List[Any]:
+    max_rows = max_rows or settings.IMPORT_MAX_ROWS
+    collected = []
+    async for record in records:
+        if len(collected) >= max_rows:
+            raise ImportTooLarge(f"单次最多导入 {max_rows} 行")
+        collected.append(record)
+    return collected
+
+def _validate_record(record: Any) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """校验并转换一行记录，返回 (转换后的数据, 错误列表)"""
+    if not isinstance(record, dict):
+        return None, ["无法解析的记录"]
+
+    errors = []
+    name = str(record.get("name") or "").strip()
+    if not name:
+        errors.append("缺少必填字段: name")
+
+    production_date = record.get("production_date")
+    try:
+        production_date = datetime.strptime(str(production_date).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        errors.append("production_date 格式错误，应为 YYYY-MM-DD")
+
+    try:
+        shelf_life_days = int(str(record.get("shelf_life_days")).strip())
+        if shelf_life_days <= 0:
+            errors.append("shelf_life_days 必须为正整数")
+    except ValueError:
+        errors.append("shelf_life_days 必须为正整数")
+
+    quantity = record.get("quantity")
+    if quantity in (None, ""):
+        quantity = 1.0
+    else:
+        try:
+            quantity = float(quantity)
+            if quantity < 0:
+                errors.append("quantity 不能为负数")
+        except (TypeError, ValueError):
+            errors.append("quantity 必须为数字")
+
+    if errors:
+        return None, errors
+    return {
+        "name": name,
+        "production_date": production_date,
+        "shelf_life_days": shelf_life_days,
+        "quantity": quantity,
+        "unit": str(record.get("unit") or "片").strip(),
+    }, []
+
+# 整批计算过期日期
+# 将日期转换为序数后逐元素相加，再一次性转换回日期，避免逐行构造timedelta；
+# 超出日期范围的结果为None
+def compute_expiry_dates(production_dates: List[date], shelf_life_days: List[int]) -> List[Optional[date]]:
+    ordinals = [d.toordinal() + days for d, days in zip(production_dates, shelf_life_days)]
+    return [date.fromordinal(o) if o <= _MAX_ORDINAL else None for o in ordinals]
+
+# 批量导入药物
+# atomic为True时只要有一行校验失败就不写入任何数据
+def import_medications(
+    db: Session,
+    records: Iterable[Any],
+    user_id: int = 1,
+    atomic: bool = False
+) -> Dict[str, Any]:
+    # 1. 逐行校验
+    valid_rows: List[Dict[str, Any]] = []
+    row_numbers: List[int] = []
+    errors: List[Dict[str, Any]] = []
+    for row_number, record in enumerate(records, start=1):
+        row, row_errors = _validate_record(record)
+        if row_errors:
+            errors.append({"row": row_number, "errors": row_errors})
+        else:
+            valid_rows.append(row)
+            row_numbers.append(row_number)
+
+    # 2. 整批计算过期日期
+    expiry_dates = compute_expiry_dates(
+        [row["production_date"] for row in valid_rows],
+        [row["shelf_life_days"] for row in valid_rows]
+    )
+    rows_to_insert = []
+    inserted_row_numbers = []
+    for row_number, row, expiry_date in zip(row_numbers, valid_rows, expiry_dates):
+        if expiry_date is None:
+            errors.append({"row": row_number, "errors": ["shelf_life_days 超出范围"]})
+            continue
+        row["expiry_date"] = expiry_date
+        rows_to_insert.append(row)
+        inserted_row_numbers.append(row_number)
+
+    errors.sort(key=lambda error: error["row"])
+    if not rows_to_insert or (atomic and errors):
+        return {"imported": 0, "failed": len(errors), "errors": errors, "items": []}
+
+    # 3. 一次批量查询药品目录，补充功效、用法和图片
+    catalog = batch_search_medication_details([row["name"] for row in rows_to_insert])
+    for row in rows_to_insert:
+        info = catalog.get(row["name"]) or {}
+        row["功效"] = info.get("功效")
+        row["usage"] = info.get("用法")
+        row["image_url"] = info.get("图片")
+        row["user_id"] = user_id
+
+    # 4. 单个事务批量插入
+    try:
+        ids = db.scalars(
+            insert(Medication).returning(Medication.id, sort_by_parameter_order=True),
+            rows_to_insert
+        ).all()
+        bump_cabinet_version(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "imported": len(ids),
+        "failed": len(errors),
+        "errors": errors,
+        "items": [
+            {"row": row_number, "id": medication_id, "name": row["name"], "expiry_date": row["expiry_date"].isoformat()}
+            for row_number, medication_id, row in zip(inserted_row_numbers, ids, rows_to_insert)
+        ]
+    }
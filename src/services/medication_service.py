@@ -1,24 +1,44 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import date
 
 from ..models.medication import Medication
 from ..models.disease import Disease, MedicationRecommendation
+from ..models.cabinet_version import CabinetVersion
 from ..utils.medication_search import search_medication_details, get_recommended_medications_for_disease
+from ..utils.pagination import paginate_keyset_async
+from ..utils.projection import project_columns
 
-# 创建药物
-def create_medication(
-    db: Session,
+def _cabinet_version_upsert(user_id: int):
+    return (
+        sqlite_insert(CabinetVersion)
+        .values(user_id=user_id, version=1)
+        .on_conflict_do_update(
+            index_elements=[CabinetVersion.user_id],
+            set_={"version": CabinetVersion.version + 1}
+        )
+    )
+
+# 药物柜版本号加一（同步会话，供批量导入在同一事务中提交）
+def bump_cabinet_version(db: Session, user_id: int):
+    db.execute(_cabinet_version_upsert(user_id))
+
+# 创建药物实例并计算过期日期
+def _new_medication(
     name: str,
-    production_date: str,
+    production_date,
     shelf_life_days: int,
-    功效: str = None,
-    usage: str = None,
-    image_url: str = None,
-    quantity: float = 1.0,
-    unit: str = "片",
-    user_id: int = 1
+    功效: str,
+    usage: str,
+    image_url: str,
+    quantity: float,
+    unit: str,
+    user_id: int
 ) -> Medication:
-    # 创建药物实例
     medication = Medication(
         name=name,
         production_date=production_date,
@@ -30,98 +50,178 @@ def create_medication(
         unit=unit,
         user_id=user_id
     )
-    
-    # 计算过期日期
     medication.calculate_expiry_date()
+    return medication
+
+# 药物列表接口查询的字段（计算字段在序列化时补充）
+MEDICATION_LIST_COLUMNS = (
+    Medication.id,
+    Medication.name,
+    Medication.production_date,
+    Medication.shelf_life_days,
+    Medication.expiry_date,
+    Medication.功效,
+    Medication.usage,
+    Medication.image_url,
+    Medication.quantity,
+    Medication.unit,
+)
+
+# 由过期日期计算得出的字段
+MEDICATION_COMPUTED_FIELDS = ("is_expired", "is_near_expiry")
+
+# 根据请求的字段确定需要查询的列
+def _medication_columns(fields: Optional[List[str]], required: Tuple[str, ...] = ("id",)) -> Tuple:
+    if fields is not None and any(field in MEDICATION_COMPUTED_FIELDS for field in fields):
+        required += ("expiry_date",)
+    return project_columns(MEDICATION_LIST_COLUMNS, fields, required)
+
+# 用户药物列表的查询语句
+def _medication_list_stmt(user_id: int, fields: Optional[List[str]], required: Tuple[str, ...] = ("id",)):
+    return select(*_medication_columns(fields, required)).where(Medication.user_id == user_id)
+
+# 按ID查询用户药物的语句
+def _medication_stmt(medication_id: int, user_id: int):
+    return select(Medication).where(
+        Medication.id == medication_id,
+        Medication.user_id == user_id
+    )
+
+# 更新药物字段，修改了生产日期或保存期限时重新计算过期日期
+def _apply_medication_update(medication: Medication, changes: Dict[str, Any]):
+    for key, value in changes.items():
+        if hasattr(medication, key):
+            setattr(medication, key, value)
+    
+    if "production_date" in changes or "shelf_life_days" in changes:
+        medication.calculate_expiry_date()
+
+# ---------------------------------------------------------------------------
+# 以下函数使用AsyncSession，供async路由使用，等待数据库时不占用线程池
+# ---------------------------------------------------------------------------
+
+# 未过期的药物（没有过期日期的视为未过期）
+def _not_expired():
+    return or_(Medication.expiry_date.is_(None), Medication.expiry_date >= date.today())
+
+# 药物柜版本号加一
+async def bump_cabinet_version_async(db: AsyncSession, user_id: int):
+    await db.execute(_cabinet_version_upsert(user_id))
+
+# 获取药物柜版本号
+async def get_cabinet_version_async(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(
+        select(CabinetVersion.version).where(CabinetVersion.user_id == user_id)
+    )
+    return result.scalar() or 0
+
+# 创建药物
+async def create_medication_async(
+    db: AsyncSession,
+    name: str,
+    production_date,
+    shelf_life_days: int,
+    功效: str = None,
+    usage: str = None,
+    image_url: str = None,
+    quantity: float = 1.0,
+    unit: str = "片",
+    user_id: int = 1
+) -> Medication:
+    medication = _new_medication(
+        name, production_date, shelf_life_days, 功效, usage, image_url, quantity, unit, user_id
+    )
     
-    # 保存到数据库
     db.add(medication)
-    db.commit()
-    db.refresh(medication)
+    await bump_cabinet_version_async(db, user_id)
+    await db.commit()
+    await db.refresh(medication)
     
     return medication
 
-# 获取所有药物
-def get_medications(
-    db: Session,
+# 获取药物列表（返回元组）
+async def get_medication_rows_async(
+    db: AsyncSession,
     skip: int = 0,
     limit: int = 100,
-    user_id: int = 1
-) -> List[Medication]:
-    return db.query(Medication).filter(
-        Medication.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    user_id: int = 1,
+    fields: Optional[List[str]] = None
+) -> List[Row]:
+    result = await db.execute(_medication_list_stmt(user_id, fields).offset(skip).limit(limit))
+    return result.all()
+
+# 按游标获取一页药物
+async def get_medication_page_async(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    user_id: int = 1,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[Row], Optional[str]]:
+    stmt = _medication_list_stmt(user_id, fields, required=("id", "expiry_date"))
+    return await paginate_keyset_async(db, stmt, Medication.expiry_date, Medication.id, cursor, limit)
 
 # 获取单个药物
-def get_medication(
-    db: Session,
+async def get_medication_async(
+    db: AsyncSession,
     medication_id: int,
     user_id: int = 1
 ) -> Optional[Medication]:
-    return db.query(Medication).filter(
-        Medication.id == medication_id,
-        Medication.user_id == user_id
-    ).first()
+    result = await db.execute(_medication_stmt(medication_id, user_id))
+    return result.scalar_one_or_none()
 
 # 更新药物
-def update_medication(
-    db: Session,
+async def update_medication_async(
+    db: AsyncSession,
     medication_id: int,
     user_id: int = 1,
     **kwargs
 ) -> Optional[Medication]:
-    # 查找药物
-    medication = db.query(Medication).filter(
-        Medication.id == medication_id,
-        Medication.user_id == user_id
-    ).first()
-    
+    medication = await get_medication_async(db, medication_id, user_id)
     if not medication:
         return None
     
-    # 更新字段
-    for key, value in kwargs.items():
-        if hasattr(medication, key):
-            setattr(medication, key, value)
+    _apply_medication_update(medication, kwargs)
     
-    # 如果更新了生产日期或保存期限，重新计算过期日期
-    if "production_date" in kwargs or "shelf_life_days" in kwargs:
-        medication.calculate_expiry_date()
-    
-    db.commit()
-    db.refresh(medication)
+    await bump_cabinet_version_async(db, user_id)
+    await db.commit()
+    await db.refresh(medication)
     
     return medication
 
 # 删除药物
-def delete_medication(
-    db: Session,
+async def delete_medication_async(
+    db: AsyncSession,
     medication_id: int,
     user_id: int = 1
 ) -> bool:
-    # 查找药物
-    medication = db.query(Medication).filter(
-        Medication.id == medication_id,
-        Medication.user_id == user_id
-    ).first()
-    
+    medication = await get_medication_async(db, medication_id, user_id)
     if not medication:
         return False
     
-    # 删除药物
-    db.delete(medication)
-    db.commit()
+    await db.delete(medication)
+    await bump_cabinet_version_async(db, user_id)
+    await db.commit()
     
     return True
 
-# 搜索药物信息
-def search_medication_info(medication_name: str) -> Optional[Dict[str, Any]]:
-    # 调用工具函数搜索药物信息
-    return search_medication_details(medication_name)
+def _available_medication(med: Medication) -> Dict[str, Any]:
+    return {
+        "id": med.id,
+        "name": med.name,
+        "功效": med.功效,
+        "usage": med.usage,
+        "image_url": med.image_url,
+        "quantity": med.quantity,
+        "unit": med.unit,
+        "expiry_date": med.expiry_date.isoformat() if med.expiry_date else None
+    }
 
 # 根据疾病获取药物推荐
-def get_medications_by_disease(
-    db: Session,
+# 推荐药物先从预定义的推荐表中查找，找不到时使用数据库中的疾病推荐记录；
+# 用户药物柜中的未过期药物用一次IN查询取出
+async def get_medications_by_disease_async(
+    db: AsyncSession,
     disease_name: str,
     user_id: int = 1
 ) -> Dict[str, Any]:
@@ -133,102 +233,48 @@ def get_medications_by_disease(
     
     # 1. 获取疾病推荐的药物列表
     recommended_med_names = get_recommended_medications_for_disease(disease_name)
+    strengths = None
+    if not recommended_med_names:
+        disease = (await db.execute(
+            select(Disease)
+            .options(selectinload(Disease.recommended_medications))
+            .where(Disease.name == disease_name)
+        )).scalar_one_or_none()
+        if disease:
+            strengths = {
+                recommendation.medication_name: recommendation.recommendation_strength
+                for recommendation in disease.recommended_medications
+            }
+            recommended_med_names = list(strengths)
+    
+    if not recommended_med_names:
+        return result
     
     # 2. 检查用户药物柜中是否有推荐的药物
-    if recommended_med_names:
-        # 查找用户药物柜中的药物
-        user_medications = db.query(Medication).filter(
+    user_medications = (await db.execute(
+        select(Medication).where(
             Medication.user_id == user_id,
             Medication.name.in_(recommended_med_names),
-            Medication.is_expired == False  # 只考虑未过期的药物
-        ).all()
-        
-        # 添加到可用药物列表
-        for med in user_medications:
-            result["available_medications"].append({
-                "id": med.id,
-                "name": med.name,
-                "功效": med.功效,
-                "usage": med.usage,
-                "image_url": med.image_url,
-                "quantity": med.quantity,
-                "unit": med.unit,
-                "expiry_date": med.expiry_date.isoformat() if med.expiry_date else None
-            })
-        
-        # 找出用户没有的推荐药物
-        user_med_names = [med.name for med in user_medications]
-        missing_med_names = [name for name in recommended_med_names if name not in user_med_names]
-        
-        # 为缺少的药物添加购买推荐
-        for med_name in missing_med_names:
-            # 搜索药物详细信息
-            med_info = search_medication_details(med_name)
-            if med_info:
-                result["recommended_medications"].append({
-                    "name": med_name,
-                    "功效": med_info.get("功效"),
-                    "用法": med_info.get("用法"),
-                    "image_url": med_info.get("图片")
-                })
+            _not_expired()
+        )
+    )).scalars().all()
+    result["available_medications"] = [_available_medication(med) for med in user_medications]
     
-    # 3. 如果没有预定义的推荐，尝试从数据库中查找
-    if not recommended_med_names:
-        # 查找疾病记录
-        disease = db.query(Disease).filter(Disease.name == disease_name).first()
-        
-        if disease:
-            # 获取推荐药物
-            for recommendation in disease.recommended_medications:
-                # 检查用户是否有该药物
-                user_med = db.query(Medication).filter(
-                    Medication.user_id == user_id,
-                    Medication.name == recommendation.medication_name,
-                    Medication.is_expired == False
-                ).first()
-                
-                if user_med:
-                    # 添加到可用药物
-                    result["available_medications"].append({
-                        "id": user_med.id,
-                        "name": user_med.name,
-                        "功效": user_med.功效,
-                        "usage": user_med.usage,
-                        "image_url": user_med.image_url,
-                        "quantity": user_med.quantity,
-                        "unit": user_med.unit,
-                        "expiry_date": user_med.expiry_date.isoformat() if user_med.expiry_date else None
-                    })
-                else:
-                    # 添加到购买推荐
-                    med_info = search_medication_details(recommendation.medication_name)
-                    if med_info:
-                        result["recommended_medications"].append({
-                            "name": recommendation.medication_name,
-                            "功效": med_info.get("功效"),
-                            "用法": med_info.get("用法"),
-                            "image_url": med_info.get("图片"),
-                            "recommendation_strength": recommendation.recommendation_strength
-                        })
+    # 3. 为缺少的药物添加购买推荐
+    user_med_names = {med.name for med in user_medications}
+    for med_name in recommended_med_names:
+        if med_name in user_med_names:
+            continue
+        med_info = search_medication_details(med_name)
+        if med_info:
+            recommendation = {
+                "name": med_name,
+                "功效": med_info.get("功效"),
+                "用法": med_info.get("用法"),
+                "image_url": med_info.get("图片")
+            }
+            if strengths is not None:
+                recommendation["recommendation_strength"] = strengths[med_name]
+            result["recommended_medications"].append(recommendation)
     
     return result
-
-# 获取即将过期的药物
-def get_near_expiry_medications(
-    db: Session,
-    user_id: int = 1
-) -> List[Medication]:
-    return db.query(Medication).filter(
-        Medication.user_id == user_id,
-        Medication.is_near_expiry == True
-    ).all()
-
-# 获取过期的药物
-def get_expired_medications(
-    db: Session,
-    user_id: int = 1
-) -> List[Medication]:
-    return db.query(Medication).filter(
-        Medication.user_id == user_id,
-        Medication.is_expired == True
-    ).all()
\ No newline at end of file
@@ -0,0 +1,113 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import threading
+
+from ..config import settings
+
+# 密码哈希格式: "scrypt$<N>$<r>$<p>$<盐>$<哈希>"
+# 旧版本使用无盐的SHA256十六进制字符串，登录成功时会自动升级为scrypt
+SCRYPT_PREFIX = "scrypt"
+
+# 哈希计算任务过多时抛出，路由层转换为503响应
+class PasswordHasherBusy(Exception):
+    pass
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # scrypt所需内存约为 128 * N * r * p 字节
+    maxmem = 128 * n * r * (p + 1) + 1024 * 1024
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=32)
+
+# 使用scrypt计算密码哈希
+def hash_password(password: str, n: int = None, r: int = None, p: int = None) -> str:
+    n = n or settings.PASSWORD_SCRYPT_N
+    r = r or settings.PASSWORD_SCRYPT_R
+    p = p or settings.PASSWORD_SCRYPT_P
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"{SCRYPT_PREFIX}${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+# 验证密码
+def verify_password(plain_password: str, hashed_password: Optional[str]) -> bool:
+    if not hashed_password:
+        return False
+
+    if not hashed_password.startswith(SCRYPT_PREFIX + "$"):
+        # 旧版本的SHA256哈希
+        legacy = hashlib.sha256(plain_password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, hashed_password)
+
+    try:
+        _, n, r, p, salt, expected = hashed_password.split("$")
+        n, r, p = int(n), int(r), int(p)
+        digest = _scrypt(plain_password, _b64decode(salt), n, r, p)
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, _b64decode(expected))
+
+# 检查哈希是否需要升级（旧格式或计算参数低于当前配置）
+def needs_rehash(hashed_password: Optional[str]) -> bool:
+    if not hashed_password or not hashed_password.startswith(SCRYPT_PREFIX + "$"):
+        return True
+    try:
+        _, n, r, p, _, _ = hashed_password.split("$")
+    except ValueError:
+        return True
+    return (int(n), int(r), int(p)) != (
+        settings.PASSWORD_SCRYPT_N, settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P
+    )
+
+# 密码哈希进程池
+# scrypt是CPU和内存密集型计算，放在独立进程中执行，避免占用事件循环和请求线程池；
+# 同时处理中的任务数有上限，超出时立即拒绝而不是无限排队
+class PasswordHasher:
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        self.max_workers = max_workers or settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING or self.max_workers * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("密码校验服务繁忙，请稍后再试")
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        """在进程池中计算密码哈希"""
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: Optional[str]) -> bool:
+        """在进程池中验证密码"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# 默认的密码哈希进程池实例
+password_hasher = PasswordHasher()
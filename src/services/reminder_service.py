@@ -1,11 +1,18 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import Row
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 from ..models.reminder import Reminder
 from ..models.medication import Medication
 from ..models.user import User
-from ..adapters.notification_adapters import SMSAdapter, WeChatAdapter
+from ..adapters.notification_adapters import NotificationAdapter, SMSAdapter, WeChatAdapter
+from ..utils.message_templates import template_registry, count_segments
+from ..utils.pagination import paginate_keyset_async
+from ..utils.projection import project_columns
+from ..utils.metrics import timed_send, reminder_dispatch_lag_seconds
 from ..config import settings
 
 # 创建提醒
@@ -23,7 +30,7 @@ def create_reminder(
         reminder_type=reminder_type,
         reminder_time=reminder_time,
         message=message,
-        is_sent=False
+        sent=False
     )
     
     db.add(reminder)
@@ -32,39 +39,82 @@ def create_reminder(
     
     return reminder
 
-# 获取所有提醒
-def get_reminders(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100
-) -> List[Reminder]:
-    return db.query(Reminder).offset(skip).limit(limit).all()
+# 提醒列表接口查询的字段
+REMINDER_LIST_COLUMNS = (
+    Reminder.id,
+    Reminder.user_id,
+    Reminder.medication_id,
+    Reminder.reminder_type,
+    Reminder.reminder_time,
+    Reminder.sent,
+    Reminder.message,
+)
 
-# 获取用户的提醒
-def get_user_reminders(
-    db: Session,
+# 创建提醒（异步）
+async def create_reminder_async(
+    db: AsyncSession,
+    user_id: int,
+    medication_id: int,
+    reminder_type: str,
+    reminder_time: datetime,
+    message: str = None,
+    sent: bool = False
+) -> Reminder:
+    reminder = Reminder(
+        user_id=user_id,
+        medication_id=medication_id,
+        reminder_type=reminder_type,
+        reminder_time=reminder_time,
+        message=message,
+        sent=sent
+    )
+    
+    db.add(reminder)
+    await db.commit()
+    await db.refresh(reminder)
+    
+    return reminder
+
+# 获取用户的提醒列表（异步）
+async def get_user_reminder_rows_async(
+    db: AsyncSession,
     user_id: int,
     skip: int = 0,
-    limit: int = 100
-) -> List[Reminder]:
-    return db.query(Reminder).filter(
-        Reminder.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    limit: int = 100,
+    fields: Optional[List[str]] = None
+) -> List[Row]:
+    columns = project_columns(REMINDER_LIST_COLUMNS, fields)
+    result = await db.execute(
+        select(*columns).where(Reminder.user_id == user_id).offset(skip).limit(limit)
+    )
+    return result.all()
 
-# 获取单个提醒
-def get_reminder(
-    db: Session,
+# 按游标获取用户的一页提醒（异步）
+async def get_user_reminder_page_async(
+    db: AsyncSession,
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[Row], Optional[str]]:
+    columns = project_columns(REMINDER_LIST_COLUMNS, fields, required=("id", "reminder_time"))
+    stmt = select(*columns).where(Reminder.user_id == user_id)
+    return await paginate_keyset_async(db, stmt, Reminder.reminder_time, Reminder.id, cursor, limit)
+
+# 获取单个提醒（异步）
+async def get_reminder_async(
+    db: AsyncSession,
     reminder_id: int
 ) -> Optional[Reminder]:
-    return db.query(Reminder).filter(Reminder.id == reminder_id).first()
+    return await db.get(Reminder, reminder_id)
 
-# 更新提醒
-def update_reminder(
-    db: Session,
+# 更新提醒（异步）
+async def update_reminder_async(
+    db: AsyncSession,
     reminder_id: int,
     **kwargs
 ) -> Optional[Reminder]:
-    reminder = db.query(Reminder).filter(Reminder.id == reminder_id).first()
+    reminder = await get_reminder_async(db, reminder_id)
     
     if not reminder:
         return None
@@ -73,86 +123,121 @@ def update_reminder(
         if hasattr(reminder, key):
             setattr(reminder, key, value)
     
-    db.commit()
-    db.refresh(reminder)
+    await db.commit()
+    await db.refresh(reminder)
     
     return reminder
 
-# 删除提醒
-def delete_reminder(
-    db: Session,
+# 删除提醒（异步）
+async def delete_reminder_async(
+    db: AsyncSession,
     reminder_id: int
 ) -> bool:
-    reminder = db.query(Reminder).filter(Reminder.id == reminder_id).first()
+    reminder = await get_reminder_async(db, reminder_id)
     
     if not reminder:
         return False
     
-    db.delete(reminder)
-    db.commit()
+    await db.delete(reminder)
+    await db.commit()
     
     return True
 
-# 检查并发送到期提醒
+# 按主键批量查询，返回 {id: 对象}（分批查询，避免超过SQLite的参数个数限制）
+def _load_by_ids(db: Session, model, ids) -> Dict[int, Any]:
+    ids = list(ids)
+    objects = {}
+    for start in range(0, len(ids), 500):
+        for obj in db.query(model).filter(model.id.in_(ids[start:start + 500])):
+            objects[obj.id] = obj
+    return objects
+
+# 用户是否绑定并验证了手机号
+def _has_sms(user: Optional[User]) -> bool:
+    return bool(user and user.phone_number and user.phone_verified)
+
+# 检查并发送到期提醒（可传入通知适配器替换默认的短信/微信适配器，如基准测试中的模拟适配器）
 def check_and_send_reminders(
-    db: Session
-) -> Dict[str, int]:
+    db: Session,
+    sms_adapter: Optional[NotificationAdapter] = None,
+    wechat_adapter: Optional[NotificationAdapter] = None
+) -> Dict[str, Any]:
     now = datetime.now()
     # 查找5分钟内需要发送的提醒
     reminders_to_send = db.query(Reminder).filter(
         Reminder.reminder_time <= now + timedelta(minutes=5),
         Reminder.reminder_time >= now - timedelta(minutes=5),  # 允许有一定的时间窗口
-        Reminder.is_sent == False
+        Reminder.sent == False
     ).all()
     
     results = {
         "total_reminders_to_send": len(reminders_to_send),
         "sms_reminders_sent": 0,
         "wechat_reminders_sent": 0,
-        "failed_reminders": 0
+        "failed_reminders": 0,
+        "sms_segments": 0
     }
     
+    # 一次查出本批提醒涉及的用户和药物
+    users = _load_by_ids(db, User, {reminder.user_id for reminder in reminders_to_send})
+    medications = _load_by_ids(db, Medication, {reminder.medication_id for reminder in reminders_to_send})
+    
+    # 发送前按短信渠道模板批量渲染消息（短信的长度限制最严格，微信发送同一条消息）
+    expiry_template = template_registry.get("scheduled_expiry_reminder", settings.MESSAGE_LOCALE, "sms")
+    usage_template = template_registry.get("usage_reminder", settings.MESSAGE_LOCALE, "sms")
+    for reminder_type, template, row in (
+        ("expiry", expiry_template, lambda medication: (medication.name, settings.EXPIRY_REMINDER_DAYS)),
+        ("usage", usage_template, lambda medication: (medication.name,)),
+    ):
+        pending = [
+            reminder for reminder in reminders_to_send
+            if not reminder.message and reminder.reminder_type == reminder_type
+            and reminder.medication_id in medications
+        ]
+        messages = template.render_many(row(medications[reminder.medication_id]) for reminder in pending)
+        for reminder, message in zip(pending, messages):
+            reminder.message = message
+    
+    # 发送前估算本批短信的条数和费用
+    results["sms_estimate"] = expiry_template.estimate_batch(
+        reminder.message for reminder in reminders_to_send
+        if reminder.message and reminder.medication_id in medications
+        and _has_sms(users.get(reminder.user_id))
+    )
+    
     # 初始化通知适配器
-    sms_adapter = SMSAdapter(settings.SMS_API_KEY)
-    wechat_adapter = WeChatAdapter(settings.WECHAT_APP_ID, settings.WECHAT_APP_SECRET)
+    sms_adapter = sms_adapter or SMSAdapter(settings.SMS_API_KEY)
+    wechat_adapter = wechat_adapter or WeChatAdapter(settings.WECHAT_APP_ID, settings.WECHAT_APP_SECRET)
     
     for reminder in reminders_to_send:
         try:
-            # 获取用户信息
-            user = db.query(User).filter(User.id == reminder.user_id).first()
-            if not user:
+            user = users.get(reminder.user_id)
+            medication = medications.get(reminder.medication_id)
+            if not user or not medication:
                 results["failed_reminders"] += 1
                 continue
             
-            # 获取药物信息
-            medication = db.query(Medication).filter(Medication.id == reminder.medication_id).first()
-            if not medication:
-                results["failed_reminders"] += 1
-                continue
-            
-            # 构建提醒消息
-            if not reminder.message:
-                if reminder.reminder_type == "expiry":
-                    reminder.message = f"您的药物 '{medication.name}' 将在{settings.EXPIRY_REMINDER_DAYS}天后过期，请及时处理！"
-                elif reminder.reminder_type == "usage":
-                    reminder.message = f"请按时服用药物 '{medication.name}'！"
-            
             # 根据用户设置发送通知
             sent = False
             
-            # 发送短信通知（如果用户开启了短信通知且绑定了手机号）
-            if user.sms_notification and user.phone_number and user.is_phone_verified:
-                sms_result = sms_adapter.send_message(
+            # 发送短信通知（如果用户绑定并验证了手机号）
+            if _has_sms(user):
+                sms_result = timed_send(
+                    "sms",
+                    sms_adapter.send_message,
                     user.phone_number,
                     reminder.message
                 )
                 if sms_result:
                     results["sms_reminders_sent"] += 1
+                    results["sms_segments"] += count_segments(reminder.message, "sms")
                     sent = True
             
-            # 发送微信通知（如果用户开启了微信通知且绑定了微信）
-            if user.wechat_notification and user.wechat_openid and user.is_wechat_verified:
-                wechat_result = wechat_adapter.send_message(
+            # 发送微信通知（如果用户绑定并验证了微信）
+            if user.wechat_openid and user.wechat_verified:
+                wechat_result = timed_send(
+                    "wechat",
+                    wechat_adapter.send_message,
                     user.wechat_openid,
                     reminder.message
                 )
@@ -162,9 +247,12 @@ def check_and_send_reminders(
             
             # 更新提醒状态
             if sent:
-                reminder.is_sent = True
-                reminder.sent_time = datetime.now()
+                reminder.sent = True
+                # 在提交前计算延迟（提交后实例过期，再读取属性会重新查询）
+                # 提醒窗口允许提前发送，提前发送的延迟记为0
+                lag = (datetime.now() - reminder.reminder_time).total_seconds()
                 db.commit()
+                reminder_dispatch_lag_seconds.observe(max(0.0, lag))
             else:
                 results["failed_reminders"] += 1
         except Exception as e:
@@ -200,7 +288,7 @@ def schedule_expiry_reminders(
             Reminder.user_id == medication.user_id,
             Reminder.medication_id == medication.id,
             Reminder.reminder_type == "expiry",
-            Reminder.is_sent == False
+            Reminder.sent == False
         ).first()
         
         if not existing_reminder:
@@ -345,5 +433,5 @@ def get_upcoming_reminders(
         Reminder.user_id == user_id,
         Reminder.reminder_time >= now,
         Reminder.reminder_time <= upcoming_time,
-        Reminder.is_sent == False
+        Reminder.sent == False
     ).order_by(Reminder.reminder_time.asc()).all()
\ No newline at end of file
@@ -1,15 +1,44 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-import hashlib
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy import inspect
+from sqlalchemy.engine import Row
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Dict, Any, Tuple
 import random
 import string
 
 from ..models.user import User
-from ..models.reminder import Reminder
-from ..models.medication import Medication
 from ..adapters.notification_adapters import SMSAdapter, WeChatAdapter
+from ..utils.ttl_cache import TTLCache
+from ..utils.pagination import paginate_keyset
+from ..utils.projection import project_columns
+from .password_service import (
+    hash_password as _hash_password,
+    verify_password as _verify_password,
+    needs_rehash,
+    password_hasher
+)
 from ..config import settings
 
+# 已认证用户的短期缓存 {用户ID: 用户表字段值}
+# 用户信息修改时由本模块主动失效，多worker部署时依赖较短的TTL保证最终一致
+user_cache = TTLCache(ttl=settings.USER_CACHE_TTL, maxsize=settings.USER_CACHE_SIZE)
+
+# 用户可以通过接口修改的字段
+USER_EDITABLE_FIELDS = ("username", "phone_number", "wechat_openid")
+
+# update_user 不会修改的字段（管理员标记只能通过 set_user_admin 修改）
+_PROTECTED_FIELDS = {"id", "is_admin"}
+
+# 是否为保留用户名（不区分大小写）
+def is_reserved_username(username: str) -> bool:
+    reserved = {name.lower() for name in settings.RESERVED_USERNAMES}
+    return username.strip().lower() in reserved
+
+# 检查用户名是否可用于注册或改名，保留用户名抛出ValueError
+def check_username_allowed(username: str) -> None:
+    if is_reserved_username(username):
+        raise ValueError(f"用户名 {username} 为保留用户名")
+
 # 创建用户
 def create_user(
     db: Session,
@@ -18,6 +47,8 @@ def create_user(
     phone_number: str = None,
     wechat_openid: str = None
 ) -> User:
+    check_username_allowed(username)
+    
     # 密码加密
     hashed_password = hash_password(password)
     
@@ -36,20 +67,42 @@ def create_user(
 
 # 密码加密
 def hash_password(password: str) -> str:
-    # 使用SHA256加密密码
-    return hashlib.sha256(password.encode()).hexdigest()
+    # 使用加盐的scrypt加密密码
+    return _hash_password(password)
 
 # 验证密码
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return hash_password(plain_password) == hashed_password
+    return _verify_password(plain_password, hashed_password)
+
+# 用户列表接口查询的字段
+USER_LIST_COLUMNS = (
+    User.id,
+    User.username,
+    User.phone_number,
+    User.wechat_openid,
+    User.phone_verified,
+    User.wechat_verified,
+)
 
-# 获取所有用户
-def get_users(
+# 获取用户列表（返回元组，不构造ORM实例）
+def get_user_rows(
     db: Session,
     skip: int = 0,
-    limit: int = 100
-) -> List[User]:
-    return db.query(User).offset(skip).limit(limit).all()
+    limit: int = 100,
+    fields: Optional[List[str]] = None
+) -> List[Row]:
+    columns = project_columns(USER_LIST_COLUMNS, fields)
+    return db.query(*columns).offset(skip).limit(limit).all()
+
+# 按游标获取一页用户（按用户名排序），返回 (本页数据, 下一页游标)
+def get_user_page(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[Row], Optional[str]]:
+    query = db.query(*project_columns(USER_LIST_COLUMNS, fields, required=("id", "username")))
+    return paginate_keyset(query, User.username, User.id, cursor, limit)
 
 # 获取单个用户
 def get_user(
@@ -58,6 +111,46 @@ def get_user(
 ) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
+# 获取单个用户（优先使用缓存）
+def get_cached_user(
+    db: Session,
+    user_id: int
+) -> Optional[User]:
+    values = user_cache.get(user_id)
+    if values is not None:
+        # 用缓存的字段值重建实例并挂载到当前会话，不会查询users表
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+    
+    user = get_user(db, user_id)
+    if user:
+        user_cache.set(user_id, {
+            attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs
+        })
+    return user
+
+# 是否为管理员（users.is_admin 列，用户无法通过接口修改）
+def is_admin(user: Optional[User]) -> bool:
+    return bool(user is not None and user.is_admin)
+
+# 授予或撤销管理员权限，用户不存在时返回None
+def set_user_admin(
+    db: Session,
+    username: str,
+    admin: bool = True
+) -> Optional[User]:
+    user = get_user_by_username(db, username)
+    if not user:
+        return None
+    
+    user.is_admin = admin
+    db.commit()
+    db.refresh(user)
+    user_cache.invalidate(user.id)
+    
+    return user
+
 # 根据用户名获取用户
 def get_user_by_username(
     db: Session,
@@ -90,16 +183,20 @@ def update_user(
     if not user:
         return None
     
+    if "username" in kwargs and kwargs["username"] != user.username:
+        check_username_allowed(kwargs["username"])
+    
     # 处理密码更新
     if "password" in kwargs:
         kwargs["password_hash"] = hash_password(kwargs.pop("password"))
     
     for key, value in kwargs.items():
-        if hasattr(user, key):
+        if key not in _PROTECTED_FIELDS and hasattr(user, key):
             setattr(user, key, value)
     
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user_id)
     
     return user
 
@@ -115,6 +212,7 @@ def delete_user(
     
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user_id)
     
     return True
 
@@ -145,6 +243,7 @@ def bind_phone_number(
         "verification_code": verification_code
     })
     db.commit()
+    user_cache.invalidate(user_id)
     
     return user
 
@@ -165,6 +264,7 @@ def verify_phone_number(
         "is_phone_verified": True
     })
     db.commit()
+    user_cache.invalidate(user_id)
     
     return True
 
@@ -189,28 +289,6 @@ def generate_verification_code(length: int = 6) -> str:
     # 生成指定长度的数字验证码
     return ''.join(random.choices(string.digits, k=length))
 
-# 获取用户的所有药物
-def get_user_medications(
-    db: Session,
-    user_id: int,
-    skip: int = 0,
-    limit: int = 100
-) -> List[Medication]:
-    return db.query(Medication).filter(
-        Medication.user_id == user_id
-    ).offset(skip).limit(limit).all()
-
-# 获取用户的所有提醒
-def get_user_reminders(
-    db: Session,
-    user_id: int,
-    skip: int = 0,
-    limit: int = 100
-) -> List[Reminder]:
-    return db.query(Reminder).filter(
-        Reminder.user_id == user_id
-    ).offset(skip).limit(limit).all()
-
 # 登录验证
 def authenticate_user(
     db: Session,
@@ -219,9 +297,54 @@ def authenticate_user(
 ) -> Optional[User]:
     user = get_user_by_username(db, username)
     if user and verify_password(password, user.password_hash):
+        # 旧格式的密码哈希在登录成功时升级
+        if needs_rehash(user.password_hash):
+            user = update_user(db, user.id, password=password)
         return user
     return None
 
+# 登录验证（在密码哈希进程池中计算，不阻塞事件循环）
+async def authenticate_user_async(
+    db: Session,
+    username: str,
+    password: str
+) -> Optional[User]:
+    user = await run_in_threadpool(get_user_by_username, db, username)
+    if not user or not await password_hasher.verify(password, user.password_hash):
+        return None
+    
+    # 旧格式的密码哈希在登录成功时升级
+    if needs_rehash(user.password_hash):
+        password_hash = await password_hasher.hash(password)
+        user = await run_in_threadpool(update_user, db, user.id, password_hash=password_hash)
+    return user
+
+# 创建用户（在密码哈希进程池中计算密码哈希）
+async def create_user_async(
+    db: Session,
+    username: str,
+    password: str,
+    phone_number: str = None,
+    wechat_openid: str = None
+) -> User:
+    check_username_allowed(username)
+    password_hash = await password_hasher.hash(password)
+    
+    user = User(
+        username=username,
+        password_hash=password_hash,
+        phone_number=phone_number,
+        wechat_openid=wechat_openid
+    )
+    
+    def _save():
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    
+    return await run_in_threadpool(_save)
+
 # 检查用户通知设置
 def get_user_notification_preferences(
     db: Session,
@@ -260,5 +383,27 @@ def update_user_notification_preferences(
     
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user_id)
     
-    return user
\ No newline at end of file
+    return user
+
+if __name__ == "__main__":
+    import argparse
+    from ..database import SessionLocal
+    from ..main import init_db
+
+    parser = argparse.ArgumentParser(description="授予或撤销用户的管理员权限")
+    parser.add_argument("action", choices=["grant-admin", "revoke-admin"])
+    parser.add_argument("username", help="用户名")
+    args = parser.parse_args()
+
+    # 旧数据库先补建 users.is_admin 列
+    init_db()
+    db = SessionLocal()
+    try:
+        user = set_user_admin(db, args.username, args.action == "grant-admin")
+    finally:
+        db.close()
+    if user is None:
+        raise SystemExit(f"用户不存在: {args.username}")
+    print(f"{user.username}: is_admin={user.is_admin}")
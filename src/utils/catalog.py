@@ -0,0 +1,154 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from bisect import bisect_right
+import threading
+import time
+
+from .catalog_file import catalog_version, load_catalog
+
+# 可热更新的药品目录
+# 目录内容、疾病推荐表、名称搜索索引和版本打包成不可变的快照，重新加载时在调用线程（路由中为线程池）中构建新快照，
+# 构建完成后用一次引用赋值替换当前快照。读取方在一次查询开始时取一次 current，
+# 整个查询都使用同一个快照：不会看到构建到一半的目录，也不会在查询中途切换到新目录；
+# 旧快照（包括mmap打开的旧文件）在最后一个读取方用完后由垃圾回收释放。
+
+# 已有重新加载正在进行时抛出，路由层转换为409响应
+class CatalogBusy(Exception):
+    pass
+
+# 名称的模糊匹配索引
+# 模糊匹配返回迭代顺序中第一个与查询互相包含（query in name 或 name in query）的名称。
+# 所有名称用 \x00 连接成一个字符串，query in name 用一次 str.find 在C层完成；
+# name in query 枚举查询的子串（长度不超过最长的名称）查名称表，名称较少或查询很长时逐个比较
+class NameIndex:
+    def __init__(self, names: Iterable[str]):
+        self.names = list(names)
+        # {名称: 第一次出现的位置}
+        self._positions: Dict[str, int] = {}
+        for position, name in enumerate(self.names):
+            self._positions.setdefault(name, position)
+        # 每个名称在连接字符串中的起始偏移
+        self._starts = []
+        offset = 0
+        for name in self.names:
+            self._starts.append(offset)
+            offset += len(name) + 1
+        self._joined = "\x00".join(self.names)
+        self._max_length = max(map(len, self.names), default=0)
+
+    def first_match(self, query: str) -> Optional[str]:
+        """返回第一个与query互相包含的名称，没有时返回None"""
+        if "\x00" in query:
+            return next((name for name in self.names if query in name or name in query), None)
+
+        # query in name：第一次出现的位置所在的名称就是最早的
+        best = None
+        found = self._joined.find(query) if self.names else -1
+        if found >= 0:
+            best = bisect_right(self._starts, found) - 1
+
+        # name in query：空名称包含在任何查询中；其他名称只需要查找排在best之前的
+        empty = self._positions.get("")
+        if empty is not None and (best is None or empty < best):
+            best = empty
+        length = len(query)
+        max_length = min(length, self._max_length)
+        # 每个子串要切片再查表，开销约为一次逐个比较的4倍
+        if 4 * length * max_length <= len(self.names):
+            positions = self._positions
+            for start in range(length):
+                for end in range(start + 1, min(length, start + max_length) + 1):
+                    position = positions.get(query[start:end])
+                    if position is not None and (best is None or position < best):
+                        best = position
+        else:
+            for position in range(len(self.names) if best is None else best):
+                if self.names[position] in query:
+                    best = position
+                    break
+        return None if best is None else self.names[best]
+
+# 目录快照（构建后不再修改）
+class CatalogSnapshot:
+    def __init__(
+        self,
+        medications: Mapping[str, Dict[str, Any]],
+        recommendations: Dict[str, List[str]],
+        version: str,
+        source: Optional[str] = None,
+        generation: int = 0,
+        build_seconds: float = 0.0
+    ):
+        self.medications = medications
+        self.recommendations = recommendations
+        # 搜索索引与目录在同一个快照中，一起替换
+        self.medication_index = NameIndex(medications)
+        self.disease_index = NameIndex(recommendations)
+        self.version = version
+        self.source = source
+        self.generation = generation
+        self.build_seconds = build_seconds
+        self.loaded_at = time.time()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "generation": self.generation,
+            "source": self.source,
+            "format": "compiled" if hasattr(self.medications, "path") else "json",
+            "medications": len(self.medications),
+            "diseases": len(self.recommendations),
+            "build_ms": round(self.build_seconds * 1000, 3),
+            "loaded_at": self.loaded_at,
+        }
+
+# 目录的版本哈希（目录内容变化时随之变化）；编译后的目录在文件头中保存了同样算法得到的版本
+def _catalog_version(medications: Mapping[str, Dict[str, Any]]) -> str:
+    version = getattr(medications, "version", None)
+    return version if version is not None else catalog_version(medications)
+
+# 构建快照（耗时操作：字典目录需要序列化全部记录来计算版本，编译后的目录需要解码全部名称来建立索引）
+def build_snapshot(
+    medications: Mapping[str, Dict[str, Any]],
+    recommendations: Dict[str, List[str]],
+    source: Optional[str] = None,
+    generation: int = 0
+) -> CatalogSnapshot:
+    start = time.perf_counter()
+    version = _catalog_version(medications)
+    snapshot = CatalogSnapshot(medications, recommendations, version, source, generation)
+    snapshot.build_seconds = time.perf_counter() - start
+    return snapshot
+
+# 当前目录快照的持有者
+class CatalogHolder:
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.current = snapshot
+        # 同一时间只允许一次重新加载（构建可能占用大量内存）
+        self._reload_lock = threading.Lock()
+
+    def swap(self, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+        """替换当前快照，返回旧快照"""
+        previous = self.current
+        self.current = snapshot
+        return previous
+
+    def reload(self, path: Optional[str] = None) -> Tuple[CatalogSnapshot, CatalogSnapshot]:
+        """从文件（JSON或编译后的目录文件）重新加载药品目录，返回 (新快照, 旧快照)
+        path为空时重新读取当前快照的来源文件；疾病推荐表沿用当前快照"""
+        if not self._reload_lock.acquire(blocking=False):
+            raise CatalogBusy("已有目录重新加载正在进行")
+        try:
+            previous = self.current
+            path = path or previous.source
+            if not path:
+                raise ValueError("未配置药品目录文件（MEDICATION_CATALOG_PATH）")
+            start = time.perf_counter()
+            snapshot = build_snapshot(
+                load_catalog(path), previous.recommendations, source=path, generation=previous.generation + 1
+            )
+            # 构建时间包含读取/打开文件
+            snapshot.build_seconds = time.perf_counter() - start
+            self.swap(snapshot)
+            return snapshot, previous
+        finally:
+            self._reload_lock.release()
@@ -0,0 +1,254 @@
+from typing import Any, Dict, Iterator, Mapping, Optional
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+# 编译后的药品目录文件（只读，用mmap打开）
+# 多个worker进程打开同一个文件时通过操作系统页缓存共享内存，每个进程只保留索引的少量对象；
+# 记录在访问时才从文件中解码，未访问的药物不占用Python对象。
+#
+# 文件布局（小端序）:
+#   文件头   magic(8) 记录数(u32) 字段数(u32) 目录版本(16字节ASCII)
+#            字段表偏移(u64) 哈希表偏移(u64) 索引偏移(u64) 字符串表偏移(u64) 文件总长度(u64)
+#   字段表   每个字段名一项 (偏移 u32, 长度 u32)
+#   哈希表   2的幂个槽位(u32)，槽位值为索引位置+1（0为空），按名称UTF-8字节的CRC32线性探测
+#   索引     每个药物一项，按名称的UTF-8字节排序:
+#            (名称偏移, 名称长度, 字段1偏移, 字段1长度, ...)，均为u32，缺少的字段长度为 MISSING
+#   字符串表 所有名称、字段名和字段值的UTF-8字节，相同的字符串只存一份
+# 字段表和索引中的偏移都是相对字符串表起始位置的字节数
+# 打开时按文件总长度检查各段的偏移，截断或损坏的文件在打开时报错，而不是在查找时才失败
+
+# magic的最后一个字节是格式版本，旧版本的文件需要重新编译
+MAGIC_PREFIX = b"MEDCAT\x00"
+MAGIC = MAGIC_PREFIX + b"\x02"
+MISSING = 0xFFFFFFFF
+_HEADER = struct.Struct("<8sII16sQQQQQ")
+_PAIR = struct.Struct("<II")
+_SLOT = struct.Struct("<I")
+
+# 文件格式错误
+class CatalogFormatError(ValueError):
+    pass
+
+# 目录版本：编译前后版本一致（字典目录在构建快照时用同样的方式计算）
+def catalog_version(catalog: Mapping[str, Dict[str, Any]]) -> str:
+    payload = json.dumps(dict(catalog), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+# 是否为编译后的目录文件（按文件头判断）
+def is_compiled_catalog(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC_PREFIX)) == MAGIC_PREFIX
+    except OSError:
+        return False
+
+# 把 {药物名称: {字段: 字符串}} 写成编译后的目录文件（先写临时文件再替换，已打开旧文件的进程不受影响）
+def compile_catalog(catalog: Mapping[str, Dict[str, Any]], path: str) -> int:
+    """返回写入的记录数"""
+    fields = sorted({field for record in catalog.values() for field in record})
+    strings = bytearray()
+    string_offsets: Dict[bytes, int] = {}
+
+    def add_string(value: Optional[str]):
+        if value is None:
+            return 0, MISSING
+        if not isinstance(value, str):
+            raise CatalogFormatError(f"字段值必须是字符串: {value!r}")
+        data = value.encode("utf-8")
+        offset = string_offsets.get(data)
+        if offset is None:
+            offset = string_offsets[data] = len(strings)
+            strings.extend(data)
+        if len(strings) > MISSING:
+            raise CatalogFormatError("字符串表超过4GB")
+        return offset, len(data)
+
+    field_table = b"".join(_PAIR.pack(*add_string(field)) for field in fields)
+    entry = struct.Struct("<" + "II" * (len(fields) + 1))
+    index = bytearray()
+    names = sorted(catalog, key=lambda name: name.encode("utf-8"))
+    for name in names:
+        record = catalog[name]
+        values = [add_string(name)] + [add_string(record.get(field)) for field in fields]
+        index.extend(entry.pack(*(number for pair in values for number in pair)))
+
+    # 哈希表装载因子不超过0.5
+    slot_count = 1
+    while slot_count < 2 * len(names):
+        slot_count *= 2
+    slots = [0] * slot_count
+    for position, name in enumerate(names):
+        slot = zlib.crc32(name.encode("utf-8")) & (slot_count - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = position + 1
+    hash_table = struct.pack(f"<{slot_count}I", *slots)
+
+    fields_offset = _HEADER.size
+    hash_offset = fields_offset + len(field_table)
+    index_offset = hash_offset + len(hash_table)
+    strings_offset = index_offset + len(index)
+    header = _HEADER.pack(
+        MAGIC, len(names), len(fields), catalog_version(catalog).encode("ascii"),
+        fields_offset, hash_offset, index_offset, strings_offset, strings_offset + len(strings)
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(field_table)
+            f.write(hash_table)
+            f.write(index)
+            f.write(strings)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(names)
+
+# 把 export_medication_database 导出的JSON文件转换为编译后的目录文件
+def compile_catalog_json(json_path: str, path: str) -> int:
+    with open(json_path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    if not isinstance(catalog, dict):
+        raise CatalogFormatError("导入的数据格式不正确")
+    return compile_catalog(catalog, path)
+
+# 编译后的目录（只读Mapping，可直接作为目录快照的 medications）
+# 注意：迭代顺序是名称UTF-8字节的顺序，不是JSON文件中的顺序
+class CompiledCatalog(Mapping):
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except (struct.error, UnicodeDecodeError) as e:
+            self._mm.close()
+            raise CatalogFormatError(f"药品目录文件已损坏: {path}: {e}") from e
+        except CatalogFormatError:
+            self._mm.close()
+            raise
+
+    def _open(self):
+        """解析并检查文件头和字段表"""
+        if len(self._mm) < _HEADER.size or self._mm[:len(MAGIC_PREFIX)] != MAGIC_PREFIX:
+            raise CatalogFormatError(f"不是编译后的药品目录文件: {self.path}")
+        magic, count, field_count, version, fields_offset, hash_offset, index_offset, strings_offset, size = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise CatalogFormatError(f"药品目录文件格式版本不支持，请重新编译: {self.path}")
+        if size != len(self._mm):
+            raise CatalogFormatError(
+                f"药品目录文件长度不正确（已截断或损坏）: {self.path}（应为 {size} 字节，实际 {len(self._mm)} 字节）"
+            )
+        entry = struct.Struct("<" + "II" * (field_count + 1))
+        slot_count, remainder = divmod(index_offset - hash_offset, _SLOT.size)
+        # 各段依次紧挨着，哈希表槽位数是2的幂
+        if (fields_offset != _HEADER.size
+                or hash_offset != fields_offset + field_count * _PAIR.size
+                or remainder or slot_count < 1 or slot_count & (slot_count - 1)
+                or strings_offset != index_offset + count * entry.size
+                or strings_offset > size):
+            raise CatalogFormatError(f"药品目录文件的段偏移不正确: {self.path}")
+        self.version = version.decode("ascii")
+        self._count = count
+        self._hash_offset = hash_offset
+        self._slot_mask = slot_count - 1
+        self._index_offset = index_offset
+        self._strings_offset = strings_offset
+        self._strings_size = size - strings_offset
+        self._entry = entry
+        self._fields = [
+            self._string(*_PAIR.unpack_from(self._mm, fields_offset + i * _PAIR.size))
+            for i in range(field_count)
+        ]
+
+    def _bytes(self, offset: int, length: int) -> bytes:
+        if offset + length > self._strings_size:
+            raise CatalogFormatError(f"药品目录文件的字符串偏移超出字符串表: {self.path}")
+        start = self._strings_offset + offset
+        return self._mm[start:start + length]
+
+    def _string(self, offset: int, length: int) -> str:
+        return self._bytes(offset, length).decode("utf-8")
+
+    def _name_bytes(self, position: int) -> bytes:
+        offset, length = _PAIR.unpack_from(self._mm, self._index_offset + position * self._entry.size)
+        return self._bytes(offset, length)
+
+    def _find(self, name: str) -> int:
+        """在哈希表中查找名称，返回索引位置，找不到时返回-1"""
+        key = name.encode("utf-8")
+        slot = zlib.crc32(key) & self._slot_mask
+        while True:
+            (value,) = _SLOT.unpack_from(self._mm, self._hash_offset + slot * _SLOT.size)
+            if not value:
+                return -1
+            if self._name_bytes(value - 1) == key:
+                return value - 1
+            slot = (slot + 1) & self._slot_mask
+
+    def _record(self, position: int) -> Dict[str, str]:
+        values = self._entry.unpack_from(self._mm, self._index_offset + position * self._entry.size)
+        return {
+            field: self._string(values[2 + 2 * i], values[3 + 2 * i])
+            for i, field in enumerate(self._fields)
+            if values[3 + 2 * i] != MISSING
+        }
+
+    def __getitem__(self, name: str) -> Dict[str, str]:
+        position = self._find(name) if isinstance(name, str) else -1
+        if position < 0:
+            raise KeyError(name)
+        return self._record(position)
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and self._find(name) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        index = memoryview(self._mm)[self._index_offset:self._strings_offset]
+        try:
+            for values in self._entry.iter_unpack(index):
+                yield self._string(values[0], values[1])
+        finally:
+            index.release()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self):
+        for position, name in enumerate(self):
+            yield name, self._record(position)
+
+    def close(self):
+        self._mm.close()
+
+# 打开药品目录文件：编译后的文件用mmap打开，其他文件按JSON读取
+def load_catalog(path: str) -> Mapping[str, Dict[str, Any]]:
+    if is_compiled_catalog(path):
+        return CompiledCatalog(path)
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    if not isinstance(catalog, dict):
+        raise CatalogFormatError("导入的数据格式不正确")
+    return catalog
+
+# 命令行转换:
+#     python -m src.utils.catalog_file medications.json medications.medcat
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="把导出的药品目录JSON转换为编译后的目录文件")
+    parser.add_argument("json_path", help="export_medication_database 导出的JSON文件")
+    parser.add_argument("output", help="输出的目录文件")
+    args = parser.parse_args()
+    print(f"已写入 {compile_catalog_json(args.json_path, args.output)} 条记录: {args.output}")
@@ -0,0 +1,71 @@
+from typing import Any, Dict, Optional
+from fastapi import Response
+import hashlib
+import threading
+
+# HTTP条件请求（ETag / If-None-Match）
+# 资源的ETag由版本号等少量数据计算得出，客户端缓存仍然有效时直接返回304，
+# 不执行列表查询，也不序列化响应体
+
+# 根据资源版本等信息生成强ETag（未压缩表示的ETag，压缩中间件为压缩后的表示加编码后缀）
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+# 判断请求的If-None-Match是否与当前ETag匹配
+# 按RFC 9110，If-None-Match使用弱比较，忽略W/前缀
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+# 304响应，只携带ETag
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+# 条件请求统计，按路由记录请求数和304响应数
+class ConditionalStats:
+    def __init__(self):
+        # {路由: [请求数, 304响应数]}
+        self._counts: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, not_modified: bool):
+        with self._lock:
+            counts = self._counts.get(route)
+            if counts is None:
+                counts = self._counts[route] = [0, 0]
+            counts[0] += 1
+            if not_modified:
+                counts[1] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                route: {
+                    "requests": requests,
+                    "not_modified": not_modified,
+                    "not_modified_ratio": not_modified / requests if requests else 0.0
+                } for route, (requests, not_modified) in self._counts.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+# 全局条件请求统计
+conditional_stats = ConditionalStats()
+
+# 检查条件请求：匹配时返回304响应，否则返回None，并记录统计
+def check_not_modified(if_none_match: Optional[str], etag: str, route: str) -> Optional[Response]:
+    matched = etag_matches(if_none_match, etag)
+    conditional_stats.record(route, matched)
+    return not_modified_response(etag) if matched else None
@@ -1,14 +1,17 @@
 from typing import Dict, Any, List, Optional
-import requests
 import logging
 import json
 
+from .catalog import CatalogHolder, build_snapshot
+from .catalog_file import load_catalog
+from ..config import settings
+
 # 设置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 模拟药物数据库（实际应用中可以从外部API获取）
-MOCK_MEDICATION_DATABASE = {
+# 内置的模拟药物目录（未配置 MEDICATION_CATALOG_PATH 时使用）
+# 只用于构建初始快照，调用方通过 catalog.current.medications 读取当前目录
+_BUILTIN_CATALOG = {
     "布洛芬": {
         "功效": "用于缓解轻至中度疼痛如头痛、关节痛、偏头痛、牙痛、肌肉痛、神经痛、痛经。也用于普通感冒或流行性感冒引起的发热。",
         "用法": "口服。成人一次0.4-0.6g，一日3-4次，饭后服用。",
@@ -81,8 +84,8 @@ MOCK_MEDICATION_DATABASE = {
     }
 }
 
-# 模拟疾病-药物推荐数据库
-MOCK_DISEASE_MEDICATION_RECOMMENDATIONS = {
+# 内置的疾病-药物推荐表，调用方通过 catalog.current.recommendations 读取
+_BUILTIN_RECOMMENDATIONS = {
     "头痛": ["布洛芬", "阿司匹林", "对乙酰氨基酚"],
     "发热": ["布洛芬", "对乙酰氨基酚", "阿司匹林"],
     "感冒": ["布洛芬", "对乙酰氨基酚", "盐酸氨溴索"],
@@ -106,6 +109,19 @@ MOCK_DISEASE_MEDICATION_RECOMMENDATIONS = {
     "喉咙痛": ["布洛芬", "阿司匹林"]
 }
 
+# 初始目录：配置了目录文件时使用该文件（编译后的文件用mmap打开，多个worker共享页缓存），否则使用内置的模拟数据
+def _initial_snapshot():
+    path = settings.MEDICATION_CATALOG_PATH
+    medications = load_catalog(path) if path else _BUILTIN_CATALOG
+    return build_snapshot(medications, _BUILTIN_RECOMMENDATIONS, source=path)
+
+# 当前药品目录（可热更新）：查询函数开始时取一次 catalog.current，整个查询使用同一个快照
+catalog = CatalogHolder(_initial_snapshot())
+
+# 药品目录的版本哈希（目录内容变化时随之变化），用于生成目录查询接口的ETag
+def get_catalog_version() -> str:
+    return catalog.current.version
+
 # 搜索药物详细信息
 def search_medication_details(medication_name: str) -> Optional[Dict[str, Any]]:
     """
@@ -116,15 +132,18 @@ def search_medication_details(medication_name: str) -> Optional[Dict[str, Any]]:
     try:
         # 转换为小写以实现不区分大小写的搜索
         medication_name = medication_name.strip()
+        snapshot = catalog.current
+        medications = snapshot.medications
         
-        # 首先尝试精确匹配
-        if medication_name in MOCK_MEDICATION_DATABASE:
-            return MOCK_MEDICATION_DATABASE[medication_name]
+        # 首先尝试精确匹配（只查找一次）
+        info = medications.get(medication_name)
+        if info is not None:
+            return info
         
-        # 尝试模糊匹配（包含关系）
-        for key, value in MOCK_MEDICATION_DATABASE.items():
-            if medication_name in key or key in medication_name:
-                return value
+        # 尝试模糊匹配（包含关系），在快照的名称索引中查找，匹配后才取出记录（编译后的目录按需解码）
+        key = snapshot.medication_index.first_match(medication_name)
+        if key is not None:
+            return medications[key]
         
         # 如果没有找到匹配的药物，尝试调用外部API
         # 注意：这只是一个示例，实际应用中需要替换为真实的API
@@ -148,15 +167,17 @@ def get_recommended_medications_for_disease(disease_name: str) -> List[str]:
     try:
         # 转换为小写以实现不区分大小写的搜索
         disease_name = disease_name.strip()
+        snapshot = catalog.current
+        recommendations = snapshot.recommendations
         
         # 首先尝试精确匹配
-        if disease_name in MOCK_DISEASE_MEDICATION_RECOMMENDATIONS:
-            return MOCK_DISEASE_MEDICATION_RECOMMENDATIONS[disease_name]
+        if disease_name in recommendations:
+            return recommendations[disease_name]
         
         # 尝试模糊匹配（包含关系）
-        for key, value in MOCK_DISEASE_MEDICATION_RECOMMENDATIONS.items():
-            if disease_name in key or key in disease_name:
-                return value
+        key = snapshot.disease_index.first_match(disease_name)
+        if key is not None:
+            return recommendations[key]
         
         # 如果没有找到匹配的疾病，尝试调用外部API
         # 注意：这只是一个示例，实际应用中需要替换为真实的API
@@ -181,7 +202,8 @@ def get_recommended_medications_for_disease(disease_name: str) -> List[str]:
 #         # import time
 #         # time.sleep(1)
 #         
-#         # 模拟API响应
+#         # 模拟API响应（requests只在调用外部API时导入，不影响应用启动时间）
+#         # import requests
 #         # response = requests.get(
 #         #     f"https://api.medication-info.com/search",
 #         #     params={"name": medication_name},
@@ -208,10 +230,20 @@ def get_recommended_medications_for_disease(disease_name: str) -> List[str]:
 def batch_search_medication_details(medication_names: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
     """
     批量搜索药物的详细信息
+    相同名称只查找一次，精确匹配直接查字典，只有未命中的名称才逐个模糊匹配
     """
     results = {}
+    missing = []
+    medications = catalog.current.medications
+    
+    for name in set(medication_names):
+        info = medications.get(name.strip())
+        if info is not None:
+            results[name] = info
+        else:
+            missing.append(name)
     
-    for name in medication_names:
+    for name in missing:
         results[name] = search_medication_details(name)
     
     return results
@@ -296,7 +328,7 @@ def export_medication_database(file_path: str) -> bool:
     """
     try:
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(MOCK_MEDICATION_DATABASE, f, ensure_ascii=False, indent=2)
+            json.dump(dict(catalog.current.medications.items()), f, ensure_ascii=False, indent=2)
         logger.info(f"药物数据库已导出到 {file_path}")
         return True
     except Exception as e:
@@ -306,21 +338,12 @@ def export_medication_database(file_path: str) -> bool:
 # 导入药物数据库（用于恢复或更新）
 def import_medication_database(file_path: str) -> bool:
     """
-    从文件导入药物数据库
+    从文件导入药物数据库（JSON文件或编译后的目录文件）
     """
     try:
-        global MOCK_MEDICATION_DATABASE
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            imported_data = json.load(f)
-        
-        # 验证导入的数据格式
-        if not isinstance(imported_data, dict):
-            raise ValueError("导入的数据格式不正确")
-        
-        # 更新数据库
-        MOCK_MEDICATION_DATABASE = imported_data
-        logger.info(f"药物数据库已从 {file_path} 导入")
+        # 编译后的目录文件用mmap打开，JSON文件整体读入并验证格式；构建完成后才替换当前目录
+        snapshot, _ = catalog.reload(file_path)
+        logger.info(f"药物数据库已从 {file_path} 导入（版本 {snapshot.version}）")
         return True
     except Exception as e:
         logger.error(f"导入药物数据库时发生错误: {str(e)}")
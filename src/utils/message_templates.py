@@ -0,0 +1,160 @@
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+from string import Formatter
+import math
+
+from ..config import settings
+
+# 默认语言
+DEFAULT_LOCALE = "zh_CN"
+# 未指定渠道时使用的通用模板
+DEFAULT_CHANNEL = "default"
+
+# 各渠道的长度限制: (单条消息最大长度, 拆分为多条时每段的最大长度)
+# 短信含中文时按UCS-2编码计算，纯ASCII时按GSM-7编码计算
+CHANNEL_LIMITS = {
+    "sms": (70, 67),
+    "sms_gsm7": (160, 153),
+    "wechat": (600, 600),
+    "email": None,
+}
+
+# 内置消息模板 {(模板名称, 语言, 渠道): 模板内容}
+DEFAULT_TEMPLATES = {
+    ("verification_code", "zh_CN", DEFAULT_CHANNEL): "您的验证码是：{code}，有效期5分钟，请不要泄露给他人。",
+    ("expiry_reminder", "zh_CN", DEFAULT_CHANNEL): "您的药物 '{medication_name}' 将在 {days} 天后过期，请及时处理。",
+    # 定时发送的过期提醒（措辞与手动创建的过期提醒不同）
+    ("scheduled_expiry_reminder", "zh_CN", DEFAULT_CHANNEL): "您的药物 '{medication_name}' 将在{days}天后过期，请及时处理！",
+    ("usage_reminder", "zh_CN", DEFAULT_CHANNEL): "请按时服用药物 '{medication_name}'！",
+    ("default_reminder", "zh_CN", DEFAULT_CHANNEL): "您有一个药物提醒",
+    ("verification_code", "en_US", DEFAULT_CHANNEL): "Your verification code is {code}. It expires in 5 minutes. Do not share it.",
+    ("expiry_reminder", "en_US", DEFAULT_CHANNEL): "Your medication '{medication_name}' expires in {days} days. Please take care of it.",
+    ("scheduled_expiry_reminder", "en_US", DEFAULT_CHANNEL): "Your medication '{medication_name}' expires in {days} days. Please take care of it!",
+    ("usage_reminder", "en_US", DEFAULT_CHANNEL): "Time to take your medication '{medication_name}'!",
+    ("default_reminder", "en_US", DEFAULT_CHANNEL): "You have a medication reminder",
+}
+
+# 计算一条消息在指定渠道上占用的条数
+def count_segments(message: str, channel: str) -> int:
+    """
+    计算消息在指定渠道上需要拆分的条数
+    没有长度限制的渠道始终返回1
+    """
+    if channel == "sms" and message.isascii():
+        channel = "sms_gsm7"
+
+    limits = CHANNEL_LIMITS.get(channel)
+    if not limits:
+        return 1
+
+    single_limit, segment_limit = limits
+    length = len(message)
+    if length <= single_limit:
+        return 1
+    return math.ceil(length / segment_limit)
+
+# 预编译的消息模板
+class CompiledTemplate:
+    def __init__(self, name: str, locale: str, channel: str, source: str):
+        self.name = name
+        self.locale = locale
+        self.channel = channel
+        self.source = source
+
+        # 解析模板，把命名占位符改写为位置占位符，渲染时直接按元组取值
+        field_names = []
+        parts = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(source):
+            if literal:
+                parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field_name is None:
+                continue
+            if field_name not in field_names:
+                field_names.append(field_name)
+            placeholder = str(field_names.index(field_name))
+            if conversion:
+                placeholder += "!" + conversion
+            if format_spec:
+                placeholder += ":" + format_spec
+            parts.append("{" + placeholder + "}")
+
+        self.field_names: Tuple[str, ...] = tuple(field_names)
+        self._format = "".join(parts).format
+
+    def render(self, values: Tuple[Any, ...]) -> str:
+        """按模板字段顺序的元组渲染一条消息"""
+        return self._format(*values)
+
+    def render_mapping(self, **kwargs) -> str:
+        """按字段名渲染一条消息"""
+        return self._format(*[kwargs[name] for name in self.field_names])
+
+    def render_many(self, rows: Iterable[Tuple[Any, ...]]) -> List[str]:
+        """批量渲染消息，每行是按模板字段顺序排列的元组"""
+        fmt = self._format
+        return [fmt(*row) for row in rows]
+
+    def estimate_batch(self, messages: Iterable[str]) -> Dict[str, Any]:
+        """
+        估算一批已渲染消息的发送条数和费用
+        """
+        channel = self.channel
+        total_messages = 0
+        total_segments = 0
+        for message in messages:
+            total_messages += 1
+            total_segments += count_segments(message, channel)
+
+        cost_per_segment = settings.SMS_COST_PER_SEGMENT if channel == "sms" else 0.0
+        return {
+            "messages": total_messages,
+            "segments": total_segments,
+            "cost": round(total_segments * cost_per_segment, 4)
+        }
+
+# 模板注册表 - 每个模板只编译一次，按语言和渠道缓存
+class TemplateRegistry:
+    def __init__(self, templates: Optional[Dict[Tuple[str, str, str], str]] = None):
+        self._sources: Dict[Tuple[str, str, str], str] = dict(templates or {})
+        self._compiled: Dict[Tuple[str, str, str], CompiledTemplate] = {}
+
+    def register(self, name: str, source: str, locale: str = DEFAULT_LOCALE, channel: str = DEFAULT_CHANNEL):
+        """注册或替换模板"""
+        self._sources[(name, locale, channel)] = source
+        # 替换模板后，清除所有由该模板编译出的缓存
+        for key in [key for key in self._compiled if key[0] == name]:
+            del self._compiled[key]
+
+    def get(self, name: str, locale: str = DEFAULT_LOCALE, channel: str = DEFAULT_CHANNEL) -> CompiledTemplate:
+        """获取编译后的模板，找不到对应语言或渠道时回退到默认值"""
+        key = (name, locale, channel)
+        template = self._compiled.get(key)
+        if template is not None:
+            return template
+
+        for candidate in (
+            key,
+            (name, locale, DEFAULT_CHANNEL),
+            (name, DEFAULT_LOCALE, channel),
+            (name, DEFAULT_LOCALE, DEFAULT_CHANNEL),
+        ):
+            source = self._sources.get(candidate)
+            if source is not None:
+                break
+        else:
+            raise KeyError(f"未找到消息模板: {name}")
+
+        template = CompiledTemplate(name, locale, channel, source)
+        self._compiled[key] = template
+        return template
+
+    def render(self, name: str, locale: str = DEFAULT_LOCALE, channel: str = DEFAULT_CHANNEL, **kwargs) -> str:
+        """获取模板并按字段名渲染一条消息"""
+        return self.get(name, locale, channel).render_mapping(**kwargs)
+
+# 默认的模板注册表实例
+template_registry = TemplateRegistry(DEFAULT_TEMPLATES)
+
+# 简化的消息渲染函数
+def render_message(name: str, locale: str = DEFAULT_LOCALE, channel: str = DEFAULT_CHANNEL, **kwargs) -> str:
+    """简化的消息渲染函数"""
+    return template_registry.render(name, locale, channel, **kwargs)
@@ -0,0 +1,238 @@
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+from bisect import bisect_left
+import math
+import threading
+import time
+
+# Prometheus指标（文本格式 0.0.4）
+# 计数器和直方图按线程分片：每个线程只写自己的分片，热路径上不加锁；
+# 抓取/metrics时再把所有分片相加。asyncio路由都在事件循环线程中执行，只有一个分片
+
+# 默认的延迟分桶（秒）
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Sharded:
+    """每个线程一个dict分片"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # 只有线程第一次写入时加锁
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshot(self) -> List[dict]:
+        with self._lock:
+            return [self._copy_shard(shard) for shard in self._shards]
+
+    def _copy_shard(self, shard: dict) -> dict:
+        return dict(shard)
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+# 计数器
+class Counter(_Sharded):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[Tuple, float]:
+        totals: Dict[Tuple, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def collect(self) -> Iterable[str]:
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+# 直方图
+class Histogram(_Sharded):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        # [各分桶的计数..., +Inf分桶的计数, 总和]
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [0] * (len(self.buckets) + 2)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _copy_shard(self, shard: dict) -> dict:
+        # 分片中的状态列表会被 observe 原地修改，逐个复制（list()在一次调用中完成复制），
+        # 合并和输出期间各分桶计数与总和来自同一时刻，不会因并发的 observe 而不一致
+        return {labels: list(state) for labels, state in list(shard.items())}
+
+    def values(self) -> Dict[Tuple, List[float]]:
+        totals: Dict[Tuple, List[float]] = {}
+        for shard in self._snapshot():
+            for labels, state in shard.items():
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = state
+                else:
+                    for i, value in enumerate(state):
+                        total[i] += value
+        return totals
+
+    def collect(self) -> Iterable[str]:
+        bounds = [*self.buckets, math.inf]
+        for labels, state in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(state[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+# 抓取时才计算的指标（如缓存命中率），callback返回 {标签值元组: 数值}
+class CallbackMetric:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Dict[Tuple, float]],
+        type: str = "gauge"
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.type = type
+
+    def collect(self) -> Iterable[str]:
+        for labels, value in sorted(self.callback().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+# 指标注册表
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指标已存在: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[Tuple, float]], type: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, labelnames, callback, type))
+
+    def render(self) -> str:
+        """生成Prometheus文本格式"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics.values():
+            if isinstance(metric, _Sharded):
+                metric.reset()
+
+# 全局注册表
+registry = MetricsRegistry()
+
+# HTTP请求
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP请求数", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP请求处理耗时（秒）", ("method", "route")
+)
+
+# 每个请求的数据库查询
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "每个请求执行的SQL语句数", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+http_request_db_duration_seconds = registry.histogram(
+    "http_request_db_duration_seconds", "每个请求的SQL执行总耗时（秒）", ("route",)
+)
+db_n_plus_one_total = registry.counter(
+    "db_n_plus_one_total", "检测到疑似N+1查询的请求数", ("route",)
+)
+
+# 提醒发送
+reminder_dispatch_lag_seconds = registry.histogram(
+    "reminder_dispatch_lag_seconds", "提醒实际发送时间与计划提醒时间之差（秒）", (),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+)
+notification_send_duration_seconds = registry.histogram(
+    "notification_send_duration_seconds", "通知发送耗时（秒）", ("channel", "result")
+)
+
+# 计时发送通知，按渠道和结果记录耗时
+def timed_send(channel: str, send: Callable[..., bool], *args) -> bool:
+    start = time.perf_counter()
+    result = False
+    try:
+        result = send(*args)
+        return result
+    finally:
+        notification_send_duration_seconds.observe(
+            time.perf_counter() - start, channel, "success" if result else "failure"
+        )
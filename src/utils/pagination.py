@@ -0,0 +1,98 @@
+from typing import Any, List, Optional, Tuple
+from datetime import date, datetime
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+# 游标分页（keyset分页）
+# 按 (排序字段, id) 排序，下一页的查询条件是"排在上一页最后一行之后"，
+# 可以直接利用索引定位，任意页的查询代价都与第一页相同；OFFSET则需要先扫描并丢弃前面所有行
+
+# 游标无效时抛出，路由层转换为400响应
+class InvalidCursor(ValueError):
+    pass
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _decode_value(value: Any, column) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+# 生成不透明的分页游标
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    payload = json.dumps([_encode_value(sort_value), row_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+# 解析分页游标，返回 (排序字段的值, id)
+def decode_cursor(cursor: str, sort_column) -> Tuple[Any, int]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(payload)
+        return _decode_value(sort_value, sort_column), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("无效的分页游标") from e
+
+# 在查询上添加游标条件、排序和行数限制（同时适用于Query和select()语句）
+def _keyset_query(query, sort_column, id_column, cursor: Optional[str], limit: int):
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_column)
+        if sort_value is None:
+            # SQLite升序排序时NULL排在最前面
+            query = query.filter(or_(
+                and_(sort_column.is_(None), id_column > last_id),
+                sort_column.isnot(None)
+            ))
+        else:
+            # 额外的 sort_column >= sort_value 条件使SQLite可以直接在索引上定位起点
+            query = query.filter(
+                sort_column >= sort_value,
+                or_(sort_column > sort_value, id_column > last_id)
+            )
+
+    # 多查询一行，用于判断是否还有下一页
+    return query.order_by(sort_column, id_column).limit(limit + 1)
+
+def _page_result(rows: List[Any], sort_column, id_column, limit: int) -> Tuple[List[Any], Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+# 按游标查询一页数据
+# cursor为空字符串或None时返回第一页；返回 (本页数据, 下一页游标)，没有下一页时游标为None
+def paginate_keyset(
+    query,
+    sort_column,
+    id_column,
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    rows = _keyset_query(query, sort_column, id_column, cursor, limit).all()
+    return _page_result(rows, sort_column, id_column, limit)
+
+# 按游标查询一页数据（异步会话，stmt为select()语句）
+async def paginate_keyset_async(
+    db,
+    stmt,
+    sort_column,
+    id_column,
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    result = await db.execute(_keyset_query(stmt, sort_column, id_column, cursor, limit))
+    return _page_result(result.all(), sort_column, id_column, limit)
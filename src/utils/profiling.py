@@ -0,0 +1,115 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+
+from ..config import settings
+
+# 性能剖析
+# - SamplingProfiler: 后台线程按固定间隔读取 sys._current_frames()，统计各线程的调用栈，
+#   输出折叠栈格式（"帧1;帧2;帧3 次数"），可直接交给 flamegraph.pl / speedscope 生成火焰图。
+#   采样只读取栈帧，不跟踪每次函数调用，对被采样的请求几乎没有额外开销
+# - ProfileStore: 保存最近几次单请求cProfile的结果，供管理接口查看
+
+# 采样时跳过的空闲栈（叶子帧所在文件和函数），如线程池等待任务、事件循环等待I/O
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+# 已有采样在进行时抛出，路由层转换为409响应
+class ProfilerBusy(Exception):
+    pass
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+# 采样剖析器（同一时间只允许一次采样）
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def sample(self, duration: float, interval: float = 0.005, include_idle: bool = False) -> Dict[str, int]:
+        """在当前线程中采样duration秒（调用方应在线程池中调用），返回 {折叠栈: 采样次数}"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("已有采样正在进行")
+        try:
+            return self._sample(duration, interval, include_idle)
+        finally:
+            self._lock.release()
+
+    def _sample(self, duration: float, interval: float, include_idle: bool) -> Dict[str, int]:
+        own_thread = threading.get_ident()
+        stacks: Dict[str, int] = {}
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread or (not include_idle and _is_idle(frame)):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(f"thread:{thread_names.get(thread_id, thread_id)}")
+                stack = ";".join(reversed(labels))
+                stacks[stack] = stacks.get(stack, 0) + 1
+            time.sleep(interval)
+        return stacks
+
+# 折叠栈文本，每行 "栈 次数"，按次数从多到少排列
+def collapsed_stacks(stacks: Dict[str, int]) -> str:
+    return "".join(
+        f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+    )
+
+# 全局采样剖析器
+sampling_profiler = SamplingProfiler()
+
+# 最近的单请求cProfile结果
+class ProfileStore:
+    def __init__(self, maxsize: int = 20):
+        self.maxsize = maxsize
+        self._ids = itertools.count(1)
+        # {剖析ID: (请求描述, 剖析结果)}
+        self._profiles: "OrderedDict[int, Tuple[str, cProfile.Profile]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def new_id(self) -> int:
+        """预先分配剖析ID（响应头在请求处理完成前就要发送）"""
+        return next(self._ids)
+
+    def add(self, profile_id: int, description: str, profile: cProfile.Profile):
+        with self._lock:
+            self._profiles[profile_id] = (description, profile)
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: int) -> Optional[Tuple[str, cProfile.Profile]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [{"id": profile_id, "request": description}
+                    for profile_id, (description, _) in self._profiles.items()]
+
+# 按累计耗时排序的cProfile文本报告
+def profile_report(profile: cProfile.Profile, sort: str = "cumulative", limit: int = 50) -> str:
+    output = io.StringIO()
+    pstats.Stats(profile, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+# 全局单请求剖析结果存储
+profile_store = ProfileStore(settings.PROFILE_HISTORY_SIZE)
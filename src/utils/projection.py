@@ -0,0 +1,37 @@
+from typing import List, Optional, Sequence, Tuple
+
+# 稀疏字段集（fields=name,expiry_date）
+# 只查询请求的列，列表界面不再读取和传输大段的文本字段
+
+# fields参数包含未知字段时抛出，路由层转换为400响应
+class InvalidFields(ValueError):
+    pass
+
+# 解析fields参数，未传入时返回None（返回全部字段）
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    requested = []
+    for field in fields.split(","):
+        field = field.strip()
+        if field and field not in requested:
+            requested.append(field)
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    if not requested:
+        raise InvalidFields("fields must not be empty")
+    return requested
+
+# 根据请求的字段选出需要查询的列，required中的列（如分页排序字段）总是查询
+def project_columns(columns: Sequence, fields: Optional[Sequence[str]], required: Sequence[str] = ()) -> Tuple:
+    if fields is None:
+        return tuple(columns)
+    wanted = set(fields) | set(required)
+    return tuple(column for column in columns if column.key in wanted)
+
+# 只保留请求的字段
+def trim_fields(items: List[dict], fields: Optional[Sequence[str]]) -> List[dict]:
+    if fields is None or not items or list(items[0]) == list(fields):
+        return items
+    return [{field: item[field] for field in fields} for item in items]
@@ -0,0 +1,58 @@
+from typing import Any, Iterable
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+# 快速JSON响应
+# 安装了orjson时直接序列化dict/list/date/datetime，不经过jsonable_encoder；
+# 未安装时退回标准库json
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+# 序列化为紧凑的UTF-8 JSON字节串
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+# 将查询结果的元组序列化为字典列表
+def rows_to_dicts(rows) -> list:
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+# 游标分页时下一页游标所在的响应头，响应体保持为列表，与偏移分页兼容
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 构造分页响应，没有下一页时不返回游标响应头
+def paginated_response(content: Any, next_cursor: str = None, headers: dict = None) -> FastJSONResponse:
+    headers = dict(headers or {})
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return FastJSONResponse(content, headers=headers)
+
+# 构造流式下载响应，gzip为True时数据块已经过gzip压缩
+def streaming_download_response(
+    chunks: Iterable[bytes],
+    media_type: str,
+    filename: str,
+    gzip: bool = False
+) -> StreamingResponse:
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
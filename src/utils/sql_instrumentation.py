@@ -0,0 +1,130 @@
+from typing import Dict, Iterator, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import re
+import time
+
+from ..config import settings
+
+# SQL执行监控
+# - 按请求统计语句数和耗时（MetricsMiddleware在请求开始时设置current_query_stats）
+# - 同一请求中相同形状的语句重复执行多次时判定为N+1查询
+# - 慢查询连同EXPLAIN输出写入结构化日志（每行一个JSON）
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("src.sql.slow")
+
+_WHITESPACE = re.compile(r"\s+")
+# IN (?, ?, ?) 的参数个数随数据变化，统一成 IN (?)
+_EXPANDED_IN = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+# 语句形状：去掉多余空白，合并展开的IN参数列表
+def statement_shape(statement: str) -> str:
+    return _EXPANDED_IN.sub("IN (?)", _WHITESPACE.sub(" ", statement).strip())
+
+# 一段时间（一个请求或一个测试块）内执行的SQL统计
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        # {语句形状: 执行次数}
+        self.shapes: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(self, threshold: int = None) -> Dict[str, int]:
+        """执行次数达到阈值的语句形状（疑似N+1查询）"""
+        threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+# 当前请求的SQL统计
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+# capture_queries() 打开的统计，不依赖上下文变量（TestClient在另一个线程中执行请求）
+_captures: List[QueryStats] = []
+
+def _explain(conn, statement: str, parameters) -> Optional[List[str]]:
+    """在同一连接上执行EXPLAIN，返回查询计划的每一行"""
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN失败: {e}"]
+    finally:
+        cursor.close()
+
+def _log_slow_query(conn, statement: str, parameters, elapsed: float, executemany: bool):
+    record = {
+        "event": "slow_query",
+        "duration_ms": round(elapsed * 1000, 3),
+        "statement": statement_shape(statement),
+        "parameters": None if executemany else repr(parameters)[:200],
+    }
+    if settings.SLOW_QUERY_EXPLAIN and not executemany:
+        record["plan"] = _explain(conn, statement, parameters)
+    slow_query_logger.warning(json.dumps(record, ensure_ascii=False))
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for capture in _captures:
+        capture.record(statement, elapsed)
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        _log_slow_query(conn, statement, parameters, elapsed, executemany)
+
+# 为引擎注册SQL执行监控（异步引擎传入 async_engine.sync_engine），重复调用不会重复注册
+def instrument_engine(engine):
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# 请求结束时检查N+1查询，写入结构化日志，返回疑似N+1的语句形状
+def report_n_plus_one(stats: QueryStats, route: str) -> Dict[str, int]:
+    repeated = stats.repeated()
+    for shape, count in repeated.items():
+        logger.warning(json.dumps({
+            "event": "n_plus_one",
+            "route": route,
+            "count": count,
+            "statement": shape,
+        }, ensure_ascii=False))
+    return repeated
+
+# 统计代码块中执行的所有SQL（不区分请求），用于测试和基准测试
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    stats = QueryStats()
+    _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        _captures.remove(stats)
+
+# 断言代码块中执行的SQL语句数不超过上限，超出时列出执行过的语句
+# 用法:
+#     with assert_max_queries(2):
+#         client.get("/api/medications/disease/感冒")
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    with capture_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        statements = "\n".join(f"  {count} x {shape}" for shape, count in stats.shapes.items())
+        raise AssertionError(f"执行了 {stats.count} 条SQL，超过上限 {max_queries}:\n{statements}")